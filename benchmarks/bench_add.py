@@ -0,0 +1,36 @@
+"""Масштабирование `add` по количеству процессов.
+
+Запуск из корня проекта: `python -m benchmarks.bench_add`
+"""
+
+import os
+import tempfile
+
+from benchmarks.bench_status import create_files, measure
+from cvs import commands
+from cvs.view import TestView
+
+FILE_COUNT = 2000
+
+
+def run(jobs: int) -> float:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            commands.InitCommand(TestView())()
+            create_files(FILE_COUNT)
+            return measure(commands.AddCommand(TestView()), ".", jobs)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    print(f"{'jobs':>6} {'add, s':>10} {'speedup':>8}")
+    serial = run(1)
+    print(f"{1:>6} {serial:>10.3f} {1:>8.2f}")
+    jobs = 2
+    while jobs <= os.cpu_count():
+        elapsed = run(jobs)
+        print(f"{jobs:>6} {elapsed:>10.3f} {serial / elapsed:>8.2f}")
+        jobs *= 2
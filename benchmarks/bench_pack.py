@@ -0,0 +1,85 @@
+"""Размер хранилища и задержка чтения: свободные объекты против пакета.
+
+Один файл правится в каждом коммите, поэтому пакет хранит
+его версии цепочками дельт.
+Запуск из корня проекта: `python -m benchmarks.bench_pack`
+"""
+
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from cvs import commands, config
+from cvs.utils import storage
+from cvs.view import TestView
+
+LINES = 20000
+COMMITS = 50
+
+
+def storage_size() -> int:
+    return sum(
+        path.stat().st_size
+        for path in config.OBJECTS_PATH.glob("**/*")
+        if path.is_file()
+    )
+
+
+def read_all_blobs(hashes: list) -> tuple:
+    """Среднее время чтения сжатого объекта и распаковки в файл"""
+    start = time.perf_counter()
+    for hashcode in hashes:
+        storage.store.read("blob", hashcode)
+    middle = time.perf_counter()
+    for hashcode in hashes:
+        storage.store.export_blob(hashcode, Path(os.devnull))
+    end = time.perf_counter()
+    return (middle - start) / len(hashes), (end - middle) / len(hashes)
+
+
+def run() -> None:
+    random.seed(0)
+    lines = [f"line {i} {random.random()}\n" for i in range(LINES)]
+    for _ in range(COMMITS):
+        for _ in range(10):
+            lines[random.randrange(LINES)] = f"edit {random.random()}\n"
+        Path("data.txt").write_text("".join(lines))
+        commands.AddCommand(TestView())("data.txt")
+        commands.CommitCommand(TestView())("edit")
+
+    hashes = [path.name for path in config.BLOBS_PATH.iterdir()]
+    loose_size = storage_size()
+    loose_latency = read_all_blobs(hashes)
+    commands.RepackCommand(TestView())()
+    storage.store.reload()
+    pack_size = storage_size()
+    cold_latency = read_all_blobs(hashes)
+    warm_latency = read_all_blobs(hashes)
+
+    print(
+        f"{'layout':>12} {'size, KiB':>10} {'read, ms':>10} {'export, ms':>10}"
+    )
+    rows = [
+        ("loose", loose_size, loose_latency),
+        ("pack", pack_size, cold_latency),
+        ("pack, warm", pack_size, warm_latency),
+    ]
+    for name, size, (read, export) in rows:
+        print(
+            f"{name:>12} {size / 1024:>10.1f}"
+            f" {read * 1e3:>10.3f} {export * 1e3:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            commands.InitCommand(TestView())()
+            run()
+        finally:
+            storage.store.reload()
+            os.chdir(cwd)
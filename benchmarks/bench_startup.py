@@ -0,0 +1,119 @@
+"""Время запуска `python -m cvs` для простых команд и его бюджет.
+
+Из медианы нескольких запусков вычитается запуск интерпретатора
+с argparse, logging и pathlib, без которых не обходится ни одна
+команда, остаток - импорт модулей cvs и работа команды.
+Отдельно по `-X importtime` проверяется, что команда не загружает
+модули, которые ей не нужны. Первый запуск каждой команды
+не учитывается: в нём пишется кэш байткода. При превышении бюджета или лишнем
+импорте скрипт завершается с кодом 1.
+Запуск из корня проекта: `python -m benchmarks.bench_startup`
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUDGET = 0.075
+BASELINE = ("-c", "import argparse, logging, pathlib")
+COMMANDS = (("status",), ("log", "-n", "5"), ("diff",))
+FORBIDDEN_MODULES = {
+    "status": ("anytree", "cvs.models.tree", "cvs.models.commit"),
+    "log": ("anytree", "cvs.models.tree", "cvs.models.index"),
+    "diff": ("anytree", "cvs.models.tree"),
+}
+
+
+def python(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": str(PROJECT_ROOT)}
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.run(
+        [sys.executable, *args],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+        **kwargs,
+    )
+
+
+def median_time(args: tuple, runs: int) -> float:
+    timings = []
+    python(*args)
+    for _ in range(runs):
+        start = time.perf_counter()
+        python(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def imported_modules(command: tuple) -> set:
+    """Модули, загруженные командой, по выводу `-X importtime`"""
+    stderr = python("-X", "importtime", "-m", "cvs", *command).stderr
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in stderr.splitlines()
+        if line.startswith("import time:") and "|" in line
+    }
+
+
+def prepare_repository() -> None:
+    python("-m", "cvs", "init")
+    for i in range(20):
+        directory = Path(f"dir{i % 4}")
+        directory.mkdir(exist_ok=True)
+        (directory / f"file{i}.txt").write_text(f"line {i}\n" * 100)
+    python("-m", "cvs", "add", ".")
+    python("-m", "cvs", "commit", "first")
+
+
+def run(runs: int, budget: float) -> bool:
+    baseline = median_time(BASELINE, runs)
+    print(f"{'command':>10} {'total, ms':>10} {'startup, ms':>12} {'ok':>4}")
+    passed = True
+    for command in COMMANDS:
+        total = median_time(("-m", "cvs", *command), runs)
+        overhead = total - baseline
+        extra = set(FORBIDDEN_MODULES[command[0]])
+        extra &= imported_modules(command)
+        is_ok = overhead <= budget and not extra
+        passed = passed and is_ok
+        print(
+            f"{command[0]:>10} {total * 1e3:>10.1f} {overhead * 1e3:>12.1f}"
+            f" {'yes' if is_ok else 'no':>4}"
+        )
+        if extra:
+            print(f"{'':>10} лишние импорты: {', '.join(sorted(extra))}")
+    print(f"Базовый запуск: {baseline * 1e3:.1f} мс")
+    print(f"Бюджет: {budget * 1e3:.0f} мс")
+    return passed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=BUDGET,
+        help="Допустимое время сверх запуска интерпретатора, с",
+    )
+    arguments = parser.parse_args()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            prepare_repository()
+            is_passed = run(arguments.runs, arguments.budget)
+        finally:
+            os.chdir(cwd)
+    sys.exit(0 if is_passed else 1)
@@ -0,0 +1,50 @@
+"""Зависимость времени `status` от количества файлов в репозитории.
+
+Запуск из корня проекта: `python -m benchmarks.bench_status`
+"""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from cvs import commands
+from cvs.view import TestView
+
+FILE_COUNTS = (100, 1000, 5000)
+FILE_SIZE = 4096
+
+
+def create_files(count: int) -> None:
+    for i in range(count):
+        directory = Path(f"dir{i % 20}")
+        directory.mkdir(exist_ok=True)
+        (directory / f"file{i}.txt").write_bytes(os.urandom(FILE_SIZE))
+
+
+def measure(command: commands.CvsCommand, *args) -> float:
+    start = time.perf_counter()
+    command(*args)
+    return time.perf_counter() - start
+
+
+def run(count: int) -> tuple:
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            commands.InitCommand(TestView())()
+            create_files(count)
+            add_time = measure(commands.AddCommand(TestView()), ".")
+            cold = measure(commands.StatusCommand(TestView()))
+            warm = measure(commands.StatusCommand(TestView()))
+        finally:
+            os.chdir(cwd)
+    return add_time, cold, warm
+
+
+if __name__ == "__main__":
+    print(f"{'files':>8} {'add, s':>10} {'status, s':>10} {'again, s':>10}")
+    for file_count in FILE_COUNTS:
+        results = run(file_count)
+        print(f"{file_count:>8}", *(f"{x:>10.3f}" for x in results))
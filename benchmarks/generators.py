@@ -0,0 +1,78 @@
+"""Генерация синтетических репозиториев для бенчмарков."""
+
+import random
+from pathlib import Path
+from typing import List, NamedTuple
+
+from cvs import commands
+from cvs.view import TestView
+
+LINE_WIDTH = 64
+
+
+class RepoSpec(NamedTuple):
+    files: int = 1000
+    depth: int = 3
+    fanout: int = 4
+    median_size: int = 4096
+    max_size: int = 1 << 20
+    commits: int = 10
+    changes: int = 10
+    seed: int = 0
+
+
+def file_sizes(spec: RepoSpec, rng: random.Random) -> List[int]:
+    """Размеры файлов по логнормальному распределению"""
+    sizes = []
+    for _ in range(spec.files):
+        size = int(rng.lognormvariate(0, 1) * spec.median_size)
+        sizes.append(max(1, min(size, spec.max_size)))
+    return sizes
+
+
+def file_paths(spec: RepoSpec, rng: random.Random) -> List[Path]:
+    """Пути файлов в дереве каталогов заданной глубины"""
+    paths = []
+    for i in range(spec.files):
+        depth = rng.randint(0, spec.depth)
+        parts = [f"dir{rng.randrange(spec.fanout)}" for _ in range(depth)]
+        paths.append(Path(*parts, f"file{i}.txt"))
+    return paths
+
+
+def text(size: int, rng: random.Random) -> bytes:
+    """Текст из строк случайных шестнадцатеричных символов"""
+    raw = rng.getrandbits(size * 4).to_bytes(size // 2 + 1, "big").hex()
+    bounds = range(0, size + LINE_WIDTH, LINE_WIDTH - 1)
+    lines = [raw[start:end] for start, end in zip(bounds, bounds[1:])]
+    return "\n".join(lines).encode("ascii")[:size]
+
+
+def generate_worktree(spec: RepoSpec) -> List[Path]:
+    """Создание файлов рабочей копии в текущем каталоге"""
+    rng = random.Random(spec.seed)
+    paths = file_paths(spec, rng)
+    for path, size in zip(paths, file_sizes(spec, rng)):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(text(size, rng))
+    return paths
+
+
+def modify_files(paths: List[Path], count: int, rng: random.Random) -> None:
+    """Дописывание строки в конец случайных файлов"""
+    for path in rng.sample(paths, min(count, len(paths))):
+        with open(path, "ab") as file:
+            file.write(b"\n" + text(LINE_WIDTH, rng))
+
+
+def generate_history(spec: RepoSpec, paths: List[Path]) -> List[str]:
+    """Коммиты с изменением `spec.changes` файлов в каждом"""
+    rng = random.Random(spec.seed + 1)
+    hashes = []
+    for number in range(spec.commits):
+        modify_files(paths, spec.changes, rng)
+        view = TestView()
+        commands.AddCommand(view)(".", 1)
+        commands.CommitCommand(view)(f"commit {number}")
+        hashes.append(view.buffer[-1].rsplit(" ", 1)[-1])
+    return hashes
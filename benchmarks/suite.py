@@ -0,0 +1,182 @@
+"""Набор бенчмарков команд на синтетическом репозитории.
+
+Каждая команда из `CvsCommand.REGISTRY`, для которой описан сценарий,
+выполняется с `TestView`. Время измеряется в отдельном прогоне без
+tracemalloc, пиковая память - во втором прогоне на таком же
+репозитории (без учёта памяти дочерних процессов `add`).
+Результаты выводятся в JSON, два файла результатов можно сравнить.
+
+Запуск из корня проекта:
+`python -m benchmarks.suite --files 5000 --output before.json`
+`python -m benchmarks.suite --compare before.json after.json`
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.generators import (
+    RepoSpec,
+    generate_history,
+    generate_worktree,
+    modify_files,
+)
+from cvs import commands
+from cvs.utils import storage
+from cvs.view import TestView
+
+
+class Scenario:
+    """Подготовка репозитория и аргументы команд в порядке запуска"""
+
+    def __init__(self, spec: RepoSpec, jobs: int):
+        self.spec = spec
+        self.jobs = jobs
+        self.paths = []
+        self.history = []
+
+    def steps(self) -> Dict[str, Callable[[], tuple]]:
+        return {
+            "init": lambda: (),
+            "add": self.prepare_add,
+            "commit": lambda: ("initial",),
+            "status": self.prepare_status,
+            "diff": lambda: (),
+            "log": lambda: (),
+            "checkout": lambda: (self.history[0],),
+            "repack": lambda: (),
+            "gc": lambda: (0,),
+        }
+
+    def prepare_add(self) -> tuple:
+        self.paths = generate_worktree(self.spec)
+        return ".", self.jobs
+
+    def prepare_status(self) -> tuple:
+        self.history = [commands.LogCommand(TestView()).head_commit]
+        self.history += generate_history(self.spec, self.paths)
+        rng = random.Random(self.spec.seed + 2)
+        modify_files(self.paths, self.spec.changes, rng)
+        return ()
+
+
+def run_scenario(spec: RepoSpec, jobs: int, trace: bool) -> Dict[str, float]:
+    """Прогон сценария во временном каталоге: команда -> секунды/байты"""
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for alias, prepare in Scenario(spec, jobs).steps().items():
+                command = commands.CvsCommand.resolve(alias)(TestView())
+                args = prepare()
+                if trace:
+                    tracemalloc.start()
+                    command(*args)
+                    results[alias] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    start = time.perf_counter()
+                    command(*args)
+                    results[alias] = time.perf_counter() - start
+        finally:
+            storage.store.reload()
+            os.chdir(cwd)
+    return results
+
+
+def revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(spec: RepoSpec, jobs: int) -> dict:
+    seconds = run_scenario(spec, jobs, trace=False)
+    peak_memory = run_scenario(spec, jobs, trace=True)
+    skipped = sorted(set(commands.CvsCommand.REGISTRY) - set(seconds))
+    return {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "spec": {**spec._asdict(), "jobs": jobs},
+        "results": {
+            alias: {
+                "seconds": seconds[alias],
+                "peak_bytes": peak_memory[alias],
+            }
+            for alias in seconds
+        },
+        "skipped": skipped,
+    }
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """Таблица отношений времени и памяти нового прогона к старому"""
+    lines = [
+        f"{old['revision']} -> {new['revision']}",
+        f"{'command':>10} {'old, s':>10} {'new, s':>10} {'ratio':>7}"
+        f" {'old, MiB':>9} {'new, MiB':>9}",
+    ]
+    for alias, result in new["results"].items():
+        before = old["results"].get(alias)
+        if before is None:
+            continue
+        ratio = result["seconds"] / max(before["seconds"], 1e-9)
+        lines.append(
+            f"{alias:>10} {before['seconds']:>10.3f}"
+            f" {result['seconds']:>10.3f} {ratio:>7.2f}"
+            f" {before['peak_bytes'] / 2 ** 20:>9.1f}"
+            f" {result['peak_bytes'] / 2 ** 20:>9.1f}"
+        )
+    return lines
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = RepoSpec()
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="Сравнить два файла с результатами",
+    )
+    for field in RepoSpec._fields:
+        parser.add_argument(
+            f"--{field.replace('_', '-')}",
+            type=int,
+            default=getattr(defaults, field),
+        )
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--output", help="Файл для JSON с результатами")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    if arguments.compare:
+        old_path, new_path = arguments.compare
+        with open(old_path) as old_file, open(new_path) as new_file:
+            table = compare(json.load(old_file), json.load(new_file))
+        print("\n".join(table))
+        sys.exit()
+
+    spec = RepoSpec(*(getattr(arguments, field) for field in RepoSpec._fields))
+    report = json.dumps(run(spec, arguments.jobs), indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output:
+            output.write(report + "\n")
+    print(report)
@@ -1,21 +1,75 @@
 import argparse
 import logging
+import os
+import shlex
+import sys
 
-from cvs import errors
-from cvs.commands import CvsCommand
+from cvs import config, errors
+from cvs.repository import Repository
+from cvs.utils import stats, storage
 from cvs.view import CliView
 
 
-def extract_arguments(command_name: str) -> tuple:
+def extract_arguments(raw_args: argparse.Namespace) -> tuple:
+    command_name = raw_args.command
     if command_name == "add":
-        return (raw_args.path,)
+        return raw_args.path, raw_args.jobs
     elif command_name == "commit":
         return (raw_args.comment,)
     elif command_name == "checkout":
-        return (raw_args.commit,)
+        return raw_args.commit, tuple(raw_args.paths)
+    elif command_name == "sparse":
+        return tuple(raw_args.patterns), raw_args.disable
+    elif command_name == "diff":
+        return tuple(raw_args.commits), raw_args.cached
+    elif command_name == "gc":
+        return raw_args.grace_period, not raw_args.no_repack, raw_args.jobs
+    elif command_name == "fsck":
+        return raw_args.incremental, raw_args.jobs
+    elif command_name == "log":
+        return (
+            raw_args.max_count,
+            raw_args.skip,
+            raw_args.oneline,
+            tuple(raw_args.paths),
+        )
+    elif command_name == "branch":
+        return raw_args.name, raw_args.commit, raw_args.delete
+    elif command_name == "blame":
+        return (raw_args.path,)
     return ()
 
 
+def run_batch(repository: Repository) -> None:
+    """Выполнение команд из stdin, по одной на строку, на общем состоянии"""
+    for line in sys.stdin:
+        argv = shlex.split(line, comments=True)
+        if not argv:
+            continue
+        try:
+            args = parser.parse_args(argv)
+        except SystemExit:
+            continue
+        if args.command == "batch":
+            logger.error("Nested batch mode is not supported")
+            continue
+        try:
+            repository.run(args.command, *extract_arguments(args))
+        except errors.APIError as e:
+            logger.error(f"API error occurred: {str(e)}")
+
+
+def print_stats() -> None:
+    report = stats.recorder.report()
+    if raw_args.stats == "json":
+        import json
+
+        report = {"phases": report, "caches": storage.store.cache_stats}
+        print(json.dumps(report, indent=2), file=sys.stderr)
+    else:
+        print(stats.format_report(report), file=sys.stderr)
+
+
 def set_up_arguments() -> None:
     subparsers = parser.add_subparsers(
         dest="command", required=True, metavar="<command>"
@@ -26,17 +80,147 @@ def set_up_arguments() -> None:
         "checkout", help="Переключиться на коммит"
     )
     parser_add = subparsers.add_parser("add", help="Индексировать файл(ы)")
-    subparsers.add_parser("log", help="Вывести историю коммитов")
+    parser_log = subparsers.add_parser("log", help="Вывести историю коммитов")
+    parser_branch = subparsers.add_parser(
+        "branch", help="Показать, создать или удалить ветки"
+    )
+    parser_blame = subparsers.add_parser(
+        "blame", help="Показать последний коммит каждой строки файла"
+    )
     subparsers.add_parser("status", help="Показать статус")
+    parser_diff = subparsers.add_parser(
+        "diff", help="Показать изменения между файлами и коммитами"
+    )
+    subparsers.add_parser("repack", help="Упаковать свободные объекты в пакет")
+    parser_sparse = subparsers.add_parser(
+        "sparse", help="Задать шаблоны частичной рабочей копии"
+    )
+    parser_gc = subparsers.add_parser(
+        "gc", help="Удалить недостижимые объекты и упаковать остальные"
+    )
+    parser_fsck = subparsers.add_parser(
+        "fsck", help="Проверить целостность хранилища объектов"
+    )
+    subparsers.add_parser(
+        "batch", help="Выполнить команды из stdin, по одной на строку"
+    )
 
     parser.add_argument(
         "-d", "--debug", action="store_true", help="Запуск в режиме отладки"
     )
+    parser.add_argument(
+        "--profile", metavar="FILE", help="Записать профиль cProfile в файл"
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_const",
+        const="text",
+        help="Вывести время и счётчики ввода-вывода по фазам",
+    )
+    parser.add_argument(
+        "--stats-json",
+        dest="stats",
+        action="store_const",
+        const="json",
+        help="Вывести показатели --stats в формате JSON",
+    )
     parser_add.add_argument("path", type=str, help="Путь к файлу/директории")
+    parser_add.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Количество процессов для сжатия и хэширования",
+    )
     parser_commit.add_argument(
         "comment", type=str, help="Комментарий к коммиту"
     )
     parser_checkout.add_argument("commit", type=str, help="Хэш коммита")
+    parser_checkout.add_argument(
+        "paths",
+        nargs="*",
+        help="Восстановить только эти пути, не переключая HEAD (после --)",
+    )
+    parser_sparse.add_argument(
+        "patterns", nargs="*", help="Каталоги частичной рабочей копии"
+    )
+    parser_sparse.add_argument(
+        "--disable",
+        action="store_true",
+        help="Вернуть полную рабочую копию",
+    )
+    parser_diff.add_argument(
+        "commits",
+        nargs="*",
+        help="Коммит для сравнения с индексом или два коммита",
+    )
+    parser_diff.add_argument(
+        "--cached",
+        action="store_true",
+        help="Сравнить индекс с HEAD вместо рабочей копии с индексом",
+    )
+    parser_gc.add_argument(
+        "--grace-period",
+        type=float,
+        default=config.GC_GRACE_PERIOD,
+        help="Удалять только объекты старше заданного числа секунд",
+    )
+    parser_gc.add_argument(
+        "--no-repack",
+        action="store_true",
+        help="Не упаковывать оставшиеся свободные объекты",
+    )
+    parser_gc.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Количество потоков для обхода деревьев",
+    )
+    parser_fsck.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Проверить только объекты, добавленные после прошлой проверки",
+    )
+    parser_fsck.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="Количество процессов для пересчёта хэшей",
+    )
+    parser_log.add_argument(
+        "-n",
+        "--max-count",
+        type=int,
+        default=None,
+        help="Вывести не больше заданного числа коммитов",
+    )
+    parser_log.add_argument(
+        "--skip", type=int, default=0, help="Пропустить первые коммиты"
+    )
+    parser_log.add_argument(
+        "--oneline",
+        action="store_true",
+        help="Выводить каждый коммит одной строкой",
+    )
+    parser_log.add_argument(
+        "paths",
+        nargs="*",
+        help="Только коммиты, изменившие эти пути (после --)",
+    )
+    parser_blame.add_argument("path", help="Путь к файлу в HEAD")
+    parser_branch.add_argument(
+        "name", nargs="?", help="Имя ветки, без него выводится список веток"
+    )
+    parser_branch.add_argument(
+        "commit",
+        nargs="?",
+        help="Коммит или ветка для новой ветки (по умолчанию HEAD)",
+    )
+    parser_branch.add_argument(
+        "-d", "--delete", action="store_true", help="Удалить ветку"
+    )
 
 
 if __name__ == "__main__":
@@ -50,13 +234,32 @@ if __name__ == "__main__":
         level=logging.DEBUG if raw_args.debug else logging.ERROR
     )
     logger = logging.getLogger(__name__)
+    stats.recorder.enabled = raw_args.stats is not None
+    profiler = None
+    if raw_args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    is_batch = raw_args.command == "batch"
+    repository = Repository(CliView(), defer_index_writes=is_batch)
     try:
-        command = CvsCommand.REGISTRY[raw_args.command](CliView())
-        command(*extract_arguments(raw_args.command))
+        if profiler:
+            profiler.enable()
+        if is_batch:
+            run_batch(repository)
+        else:
+            repository.run(raw_args.command, *extract_arguments(raw_args))
     except errors.APIError as e:
         logger.error(f"API error occurred: {str(e)}")
     except Exception as e:
         logger.exception("Exception caught: ", e)
     finally:
+        repository.close()
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(raw_args.profile)
+            logger.info(f"Profile written to {raw_args.profile}")
+        if raw_args.stats:
+            print_stats()
         logger.info("Closing application")
         exit()
@@ -0,0 +1,87 @@
+import abc
+import importlib
+from typing import TYPE_CHECKING, Dict, Type
+
+from cvs.view import BaseView
+
+if TYPE_CHECKING:
+    from cvs.models.index import FileIndex
+    from cvs.repository import Repository
+
+
+class CvsCommand(abc.ABC):
+    """Базовая команда.
+
+    Реестр хранит для каждой команды модуль и имя класса, модуль
+    импортируется только при первом обращении к команде, поэтому
+    запуск одной команды не загружает зависимости остальных.
+    Команды с `LOCKS_INDEX` выполняются под блокировкой индекса.
+    """
+
+    LOCKS_INDEX = False
+
+    REGISTRY: Dict[str, str] = {
+        "init": "workdir.InitCommand",
+        "add": "workdir.AddCommand",
+        "status": "workdir.StatusCommand",
+        "commit": "history.CommitCommand",
+        "log": "history.LogCommand",
+        "blame": "history.BlameCommand",
+        "branch": "branch.BranchCommand",
+        "checkout": "checkout.CheckoutCommand",
+        "sparse": "checkout.SparseCommand",
+        "diff": "diff.DiffCommand",
+        "repack": "maintenance.RepackCommand",
+        "gc": "maintenance.GcCommand",
+        "fsck": "maintenance.FsckCommand",
+    }
+
+    def __init__(self, view: BaseView, repository: "Repository" = None):
+        from cvs.repository import Repository
+
+        self.view = view
+        self.repository = repository or Repository(view)
+
+    @classmethod
+    def resolve(cls, alias: str) -> Type["CvsCommand"]:
+        """Класс команды по её имени с импортом её модуля"""
+        module, name = cls.REGISTRY[alias].split(".")
+        return getattr(importlib.import_module(f"{__name__}.{module}"), name)
+
+    @property
+    def index(self) -> "FileIndex":
+        return self.repository.index
+
+    @property
+    def head_pointer(self) -> str:
+        return self.repository.head_pointer
+
+    @property
+    def head_commit(self) -> str:
+        return self.repository.head_commit
+
+    @abc.abstractmethod
+    def _validate(self, *args) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _execute(self, *args):
+        pass
+
+    def __call__(self, *args):
+        if self.LOCKS_INDEX:
+            self.repository.lock_index()
+        try:
+            self._validate(*args)
+            self._execute(*args)
+        finally:
+            if not self.repository.defer_index_writes:
+                self.repository.unlock_index()
+
+
+def __getattr__(name: str) -> Type[CvsCommand]:
+    """Ленивый доступ к классам команд: `commands.AddCommand`"""
+    for alias, path in CvsCommand.REGISTRY.items():
+        if path.endswith(f".{name}"):
+            return CvsCommand.resolve(alias)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,62 @@
+import os
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.utils import refs, storage
+
+
+class BranchCommand(CvsCommand):
+    def _validate(
+        self, name: str = None, commit: str = None, delete: bool = False
+    ) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+        if name is not None:
+            refs.check_name(name)
+        elif delete or commit is not None:
+            raise errors.InvalidArgumentError("имя ветки не указано")
+
+    def _execute(
+        self, name: str = None, commit: str = None, delete: bool = False
+    ):
+        """Список веток, создание ветки на коммите или её удаление"""
+        if name is None:
+            self.show_branches()
+        elif delete:
+            self.delete_branch(name)
+        else:
+            self.create_branch(name, commit)
+
+    def show_branches(self) -> None:
+        """Список веток: одно чтение packed-refs и свободные ссылки"""
+        pointer = self.head_pointer
+        if refs.is_commit_hash(pointer):
+            self.view.display_text(f"* (HEAD на коммите {pointer[:7]})")
+        for name in sorted(self.repository.refs):
+            marker = "*" if name == pointer else " "
+            self.view.display_text(f"{marker} {name}")
+
+    def create_branch(self, name: str, commit: str = None) -> None:
+        branches = self.repository.refs
+        if name in branches:
+            raise errors.BranchAlreadyExistError(name)
+        for other in branches:
+            if other.startswith(f"{name}/") or name.startswith(f"{other}/"):
+                raise errors.InvalidArgumentError(f"{name} и {other}")
+        target = self.head_commit
+        if commit is not None:
+            target = commit
+            if not refs.is_commit_hash(commit):
+                target = self.repository.read_ref(commit) or commit
+            if not storage.store.exists("commit", target):
+                raise errors.CommitNotFoundError(commit)
+        self.repository.update_ref(name, target)
+        self.view.display_text(f"Создана ветка {name} на коммите {target}")
+
+    def delete_branch(self, name: str) -> None:
+        if name == self.head_pointer:
+            raise errors.InvalidArgumentError(f"{name} - текущая ветка")
+        commit = self.repository.read_ref(name)
+        if not self.repository.delete_ref(name):
+            raise errors.BranchNotFoundError(name)
+        self.view.display_text(f"Удалена ветка {name} ({commit[:7]})")
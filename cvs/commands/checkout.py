@@ -0,0 +1,280 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.models.commit import Commit
+from cvs.models.index import FileIndex, FileStat, IndexEntry
+from cvs.models.tree import TreeNode
+from cvs.utils import diff, history, refs, stats, storage
+from cvs.utils.sparse import SparseMatcher
+
+
+class CheckoutCommand(CvsCommand):
+    LOCKS_INDEX = True
+
+    def _validate(self, commit: str, paths: tuple = ()) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+        if not storage.store.exists("commit", self.resolve(commit)):
+            raise errors.CommitNotFoundError(commit)
+
+    def _execute(self, commit: str, paths: tuple = ()):
+        """Переключение на коммит или ветку, восстановление путей из коммита.
+
+        Каталоги вне шаблонов частичной рабочей копии не читаются
+        и хранятся в индексе одной записью с хэшем дерева.
+        """
+        target = self.resolve(commit)
+        if paths:
+            self.checkout_paths(target, paths)
+            return
+        current_commit = self.head_commit
+        if target == current_commit:
+            if target != commit and commit != self.head_pointer:
+                self.repository.set_head(commit)
+                self.view.display_text(f"Переключено на ветку {commit}")
+                return
+            self.view.display_text("Вы уже на данном коммите")
+            return
+        current_tree = None
+        if current_commit != "root":
+            current_tree = Commit.parse_file_content(current_commit)[0]
+        target_tree = Commit.parse_file_content(target)[0]
+        sparse = SparseMatcher.load(config.SPARSE_PATH)
+        skipped = {}
+        with stats.phase("tree diff"):
+            diffs = list(
+                diff.diff_trees(current_tree, target_tree, "", sparse, skipped)
+            )
+            self.check_clean(diffs)
+            changes = {path: new_hash for path, _, new_hash in diffs}
+
+        with stats.phase("checkout writes"):
+            removed = [path for path, x in changes.items() if not x]
+            for path in removed:
+                self.remove_file(path)
+            to_write = [
+                (path, hashcode)
+                for path, hashcode in changes.items()
+                if hashcode and not self.is_checked_out(path, hashcode)
+            ]
+            with ThreadPoolExecutor() as executor:
+                list(executor.map(lambda x: self.write_blob(*x), to_write))
+            written = [
+                IndexEntry(path, hashcode, FileStat.from_path(path))
+                for path, hashcode in to_write
+            ]
+            stats.count(bytes_written=sum(x.stat.size for x in written))
+
+        with stats.phase("index write"):
+            for path in removed:
+                self.index.remove_entry(path)
+            for entry in written:
+                self.index.set_entry(entry)
+            self.update_sparse_entries(skipped)
+            self.index.save()
+        self.repository.set_head(commit)
+
+    def check_clean(self, diffs: list) -> None:
+        """Изменяемые переключением файлы не должны содержать правок.
+
+        Неотслеживаемый файл на пути из коммита, запись индекса,
+        отличная от обоих коммитов, и изменённый в рабочей копии
+        файл прерывают переключение до записи на диск.
+        """
+        for path, old_hash, new_hash in diffs:
+            entry = self.index.indexed_files.get(path)
+            if entry is not None and entry.hashcode not in (
+                old_hash,
+                new_hash,
+            ):
+                raise errors.UncommittedChangesError(path)
+            if not os.path.lexists(path):
+                continue
+            if entry is None or self.index.is_modified(path):
+                raise errors.UncommittedChangesError(path)
+
+    def resolve(self, commit: str) -> str:
+        """Хэш коммита по хэшу или имени ветки"""
+        if refs.is_commit_hash(commit):
+            return commit
+        return self.repository.read_ref(commit) or commit
+
+    def update_sparse_entries(self, trees: dict) -> None:
+        for path, tree_hash in trees.items():
+            if tree_hash is None:
+                self.index.remove_entry(path)
+            else:
+                self.index.set_entry(
+                    IndexEntry(path, tree_hash, None, FileIndex.SPARSE_DIR)
+                )
+
+    def checkout_paths(self, commit: str, paths: tuple) -> None:
+        """Файлы путей из коммита в рабочую копию и индекс, HEAD не меняется.
+
+        Читаются только деревья на пути к указанным файлам и каталогам.
+        """
+        sparse = SparseMatcher.load(config.SPARSE_PATH)
+        tree = Commit.parse_file_content(commit)[0]
+        files = {}
+        for path in paths:
+            path = os.path.normpath(path)
+            obj_type, hashcode = self.find_object(tree, path) or (None, None)
+            is_included = (
+                sparse.may_contain(path)
+                if obj_type == "tree"
+                else sparse.includes(path)
+            )
+            if obj_type is None or not is_included:
+                raise errors.InvalidPathError(path)
+            if obj_type == "blob":
+                files[path] = hashcode
+            else:
+                for file, _, new in diff.diff_trees(None, hashcode, path):
+                    files[file] = new
+        to_write = [
+            (path, hashcode)
+            for path, hashcode in files.items()
+            if not self.is_checked_out(path, hashcode)
+        ]
+        if not to_write and not self.index.has_stale_stats:
+            return
+        with stats.phase("checkout writes"):
+            with ThreadPoolExecutor() as executor:
+                list(executor.map(lambda x: self.write_blob(*x), to_write))
+        with stats.phase("index write"):
+            for path, hashcode in to_write:
+                stat = FileStat.from_path(path)
+                self.index.set_entry(IndexEntry(path, hashcode, stat))
+            self.index.save()
+
+    @staticmethod
+    def find_object(tree: str, path: str):
+        """Тип и хэш объекта по пути в дереве"""
+        return history.path_object(tree, history.split_path(path))
+
+    def is_checked_out(self, path: str, hashcode: str) -> bool:
+        entry = self.index.get_entry(path)
+        return (
+            entry is not None
+            and entry.hashcode == hashcode
+            and os.path.isfile(path)
+            and not self.index.is_modified(path)
+        )
+
+    @staticmethod
+    def write_blob(path: str, hashcode: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        storage.store.export_blob(hashcode, Path(path))
+
+    @staticmethod
+    def remove_file(path: str) -> None:
+        if os.path.isfile(path):
+            os.remove(path)
+        parent = Path(path).parent
+        while parent != Path() and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
+
+
+class SparseCommand(CheckoutCommand):
+    def _validate(self, patterns: tuple = (), disable: bool = False) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(self, patterns: tuple = (), disable: bool = False):
+        """Задание шаблонов частичной рабочей копии и их применение к HEAD"""
+        sparse = SparseMatcher.load(config.SPARSE_PATH)
+        if patterns or disable:
+            sparse = SparseMatcher(patterns)
+            sparse.save(config.SPARSE_PATH)
+        commit = self.head_commit
+        tree = None if commit == "root" else self.commit_tree(commit)
+        files, trees = {}, {}
+        if tree:
+            self.collect(tree, "", sparse, files, trees)
+
+        under_sparse = {}
+        for entry in self.index.entries:
+            if entry.flags & FileIndex.SPARSE_DIR:
+                if entry.path not in trees:
+                    self.index.remove_entry(entry.path)
+                continue
+            directory = self.sparse_parent(entry.path, trees)
+            if directory is not None:
+                under_sparse.setdefault(directory, []).append(entry)
+        for directory, tree_hash in trees.items():
+            entries = under_sparse.get(directory, [])
+            if self.collapse(directory, tree_hash, entries):
+                self.update_sparse_entries({directory: tree_hash})
+
+        to_write = [
+            (path, hashcode)
+            for path, hashcode in files.items()
+            if path not in self.index.indexed_files
+        ]
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(lambda x: self.write_blob(*x), to_write))
+        for path, hashcode in to_write:
+            stat = FileStat.from_path(path)
+            self.index.set_entry(IndexEntry(path, hashcode, stat))
+        self.index.save()
+        for pattern in sparse.patterns:
+            self.view.display_text("/".join(pattern))
+
+    @staticmethod
+    def commit_tree(commit: str) -> str:
+        return Commit.parse_file_content(commit)[0]
+
+    def collect(
+        self, tree: str, directory: str, sparse, files: dict, trees: dict
+    ) -> None:
+        """Файлы рабочей копии и деревья вне её по дереву коммита"""
+        for name, (obj_type, hashcode) in TreeNode.parse_file_content(
+            tree
+        ).items():
+            path = os.path.join(directory, name)
+            if obj_type == "blob":
+                files[path] = hashcode
+            elif sparse.may_contain(path):
+                self.collect(hashcode, path, sparse, files, trees)
+            else:
+                trees[path] = hashcode
+
+    @staticmethod
+    def sparse_parent(path: str, trees: dict):
+        directory = os.path.dirname(path)
+        while directory:
+            if directory in trees:
+                return directory
+            directory = os.path.dirname(directory)
+        return None
+
+    def collapse(self, directory: str, tree_hash: str, entries: list) -> bool:
+        """Удаление файлов каталога, если они совпадают с деревом коммита"""
+        if self.index.indexed_files.get(directory):
+            return True
+        committed = (
+            {
+                path: new
+                for path, _, new in diff.diff_trees(None, tree_hash, directory)
+            }
+            if entries
+            else {}
+        )
+        current = {x.path: x.hashcode for x in entries}
+        if current != committed or any(
+            os.path.isfile(x.path) and self.index.is_modified(x.path)
+            for x in entries
+        ):
+            self.view.display_text(
+                f"Каталог {directory} содержит незакоммиченные изменения"
+                " и оставлен в рабочей копии"
+            )
+            return False
+        for entry in entries:
+            self.remove_file(entry.path)
+            self.index.remove_entry(entry.path)
+        return True
@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.models.commit import Commit
+from cvs.utils import diff, storage
+
+
+class DiffCommand(CvsCommand):
+    def _validate(self, commits: tuple = (), cached: bool = False) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+        if len(commits) > 2:
+            raise errors.InvalidArgumentError(" ".join(commits))
+        for commit in commits:
+            if not storage.store.exists("commit", commit):
+                raise errors.CommitNotFoundError(commit)
+
+    def _execute(self, commits: tuple = (), cached: bool = False):
+        """Рабочая копия с индексом, индекс с коммитом или два коммита"""
+        if len(commits) == 2:
+            old_tree, new_tree = (self.commit_tree(x) for x in commits)
+            for path, old, new in diff.diff_trees(old_tree, new_tree):
+                self.show(path, self.read_blob(old), self.read_blob(new))
+        elif cached or commits:
+            self.diff_index(commits[0] if commits else self.head_commit)
+        else:
+            self.diff_worktree()
+
+    def diff_index(self, commit: str) -> None:
+        hashes = {x.path: x.hashcode for x in self.index.file_entries}
+        changes = diff.diff_tree_with_index(
+            self.commit_tree(commit),
+            hashes,
+            self.index.tree_cache,
+            self.index.sparse_trees,
+        )
+        for path, old, new in changes:
+            self.show(path, self.read_blob(old), self.read_blob(new))
+
+    def diff_worktree(self) -> None:
+        """Изменённые файлы определяются по данным stat из индекса"""
+        for entry in self.index.file_entries:
+            if not os.path.isfile(entry.path):
+                self.show(entry.path, self.read_blob(entry.hashcode), None)
+            elif self.index.is_modified(entry.path):
+                self.show(
+                    entry.path,
+                    self.read_blob(entry.hashcode),
+                    Path(entry.path).read_bytes(),
+                )
+        if self.index.has_stale_stats:
+            self.index.save()
+
+    @staticmethod
+    def commit_tree(commit: str):
+        if commit == "root":
+            return None
+        return Commit.parse_file_content(commit)[0]
+
+    @staticmethod
+    def read_blob(hashcode: str):
+        return storage.store.read_blob(hashcode) if hashcode else None
+
+    def show(self, path: str, old, new) -> None:
+        for line in diff.unified_diff(path, old, new):
+            self.view.display_text(line)
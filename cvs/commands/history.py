@@ -0,0 +1,129 @@
+import os
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.models.commit import Commit
+from cvs.models.commit_graph import CommitGraph
+from cvs.utils import diff, history, refs, stats, storage
+from cvs.utils.factories import CommitFactory, TreeFactory
+
+
+def validate_path(path: str) -> None:
+    """Путь должен быть относительным и не выходить из репозитория"""
+    if os.path.isabs(path) or history.split_path(path)[:1] == [os.pardir]:
+        raise errors.InvalidPathError(path)
+
+
+class CommitCommand(CvsCommand):
+    LOCKS_INDEX = True
+
+    def _validate(self, message: str) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(self, message: str):
+        if self.index.is_empty:
+            self.view.display_text("Нечего коммитить - индекс пуст")
+            return
+
+        with stats.phase("tree build"):
+            blobs, cached = self.index.tree_sources()
+            root_tree = TreeFactory.create_new_tree(
+                blobs, self.index.tree_cache, self.index.sparse_trees, cached
+            )
+            commit = CommitFactory.create_new_commit(
+                root_tree, message, self.head_commit
+            )
+        if commit.is_same_with_parent():
+            self.view.display_text("Нечего коммитить - нет изменений")
+            return
+
+        with stats.phase("object writes"):
+            commit.create_file(config.COMMITS_PATH)
+            root_tree.create_file(config.TREES_PATH)
+            graph = CommitGraph(config.COMMIT_GRAPH_PATH)
+            graph.append(commit)
+            graph.close()
+        with stats.phase("index write"):
+            self.index.tree_cache.update(root_tree.tree_hashes())
+            self.index.save()
+        if refs.is_commit_hash(self.head_pointer):
+            self.repository.set_head(commit.content_hash)
+        else:
+            self.repository.update_ref(self.head_pointer, commit.content_hash)
+        self.view.display_text(f"Новый коммит: {commit.content_hash}")
+
+
+class LogCommand(CvsCommand):
+    def _validate(
+        self,
+        max_count: int = None,
+        skip: int = 0,
+        oneline: bool = False,
+        paths: tuple = (),
+    ) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+        for path in paths:
+            validate_path(path)
+
+    def _execute(
+        self,
+        max_count: int = None,
+        skip: int = 0,
+        oneline: bool = False,
+        paths: tuple = (),
+    ):
+        """История HEAD, с `paths` - только коммиты, менявшие эти пути"""
+        graph = CommitGraph(config.COMMIT_GRAPH_PATH)
+        records = graph.iter_history(self.head_commit)
+        if paths:
+            records = history.iter_path_history(records, paths)
+        shown = 0
+        for number, record in enumerate(records):
+            if max_count is not None and shown >= max_count:
+                break
+            if number < skip:
+                continue
+            message = Commit.read_message(record.commit, record.message_offset)
+            if oneline:
+                summary = message.split("\n", 1)[0]
+                self.view.display_text(f"{record.commit[:7]} {summary}")
+            else:
+                self.view.display_text(f"\nCommit - {record.commit}")
+                self.view.display_text(
+                    f"tree {record.tree} .\nparent {record.parent}"
+                    f"\ndate {record.date}\n\n{message}\n"
+                )
+            shown += 1
+        graph.close()
+
+
+class BlameCommand(CvsCommand):
+    def _validate(self, path: str) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+        validate_path(path)
+
+    def _execute(self, path: str):
+        """Коммит, последним изменивший каждую строку файла в HEAD"""
+        head = self.head_commit
+        obj = None
+        if head != "root":
+            tree = Commit.parse_file_content(head)[0]
+            obj = history.path_object(tree, history.split_path(path))
+        if obj is None or obj[0] != "blob":
+            raise errors.InvalidPathError(path)
+        if diff.is_binary(storage.store.read_blob(obj[1])):
+            raise errors.InvalidArgumentError(path)
+        graph = CommitGraph(config.COMMIT_GRAPH_PATH)
+        with stats.phase("blame"):
+            lines = history.blame(graph.iter_history(head), path)
+        graph.close()
+        width = len(str(len(lines)))
+        for number, (record, line) in enumerate(lines, 1):
+            text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            self.view.display_text(
+                f"{record.commit[:7]} ({record.date[:19]} {number:>{width}})"
+                f" {text}"
+            )
@@ -0,0 +1,116 @@
+import os
+import time
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.utils import fsck, reachability, stats, storage
+
+
+class RepackCommand(CvsCommand):
+    @property
+    def blob_names(self) -> dict:
+        return {
+            entry.hashcode: os.path.basename(entry.path)
+            for entry in self.index.entries
+        }
+
+    def _validate(self) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(self):
+        packed = storage.store.repack(self.blob_names)
+        if not packed:
+            self.view.display_text("Нет свободных объектов для упаковки")
+            return
+        self.view.display_text(f"Упаковано объектов: {packed}")
+
+
+class GcCommand(RepackCommand):
+    GRACE_PERIOD = config.GC_GRACE_PERIOD
+
+    def _validate(
+        self, grace_period: float = GRACE_PERIOD, repack: bool = True, jobs=1
+    ) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(
+        self, grace_period: float = GRACE_PERIOD, repack: bool = True, jobs=1
+    ):
+        """Удаление недостижимых свободных объектов и упаковка достижимых.
+
+        Свободные ссылки веток переносятся в packed-refs.
+        """
+        start = time.perf_counter()
+        heads = {self.head_commit}
+        heads.update(self.repository.refs.values())
+        heads.discard("root")
+        with stats.phase("reachability"):
+            reachable = reachability.mark_reachable(
+                heads,
+                (x.hashcode for x in self.index.file_entries),
+                self.index.sparse_trees.values(),
+                jobs or 1,
+            )
+        with stats.phase("prune"):
+            pruned = reachability.prune_loose(reachable, grace_period)
+        self.view.display_text(f"Достижимых объектов: {len(reachable)}")
+        self.view.display_text(
+            f"Удалено недостижимых объектов: {pruned.objects}"
+            f" ({pruned.size / 1024:.1f} КиБ)"
+        )
+        packed_refs = self.repository.ref_store.pack()
+        if packed_refs:
+            self.view.display_text(f"Упаковано ссылок: {packed_refs}")
+        if repack:
+            with stats.phase("repack"):
+                packed = storage.store.repack(self.blob_names, reachable)
+            self.view.display_text(f"Упаковано объектов: {packed}")
+        elapsed = time.perf_counter() - start
+        self.view.display_text(f"Время: {elapsed:.2f} с")
+
+
+class FsckCommand(CvsCommand):
+    def _validate(self, incremental: bool = False, jobs: int = 1) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(self, incremental: bool = False, jobs: int = 1):
+        """Проверка хэшей и связей объектов хранилища.
+
+        В инкрементальном режиме проверяются только свободные объекты
+        и пакеты, появившиеся после последней успешной проверки.
+        """
+        start = time.perf_counter()
+        started_at = time.time_ns()
+        state = fsck.FsckState(0, set())
+        if incremental:
+            state = fsck.FsckState.load(config.FSCK_STATE_PATH)
+        roots = fsck.roots_of(
+            self.repository.refs,
+            self.head_commit,
+            (x.hashcode for x in self.index.file_entries),
+            self.index.sparse_trees.values(),
+        )
+        with stats.phase("verify"):
+            result = fsck.check(roots, state, jobs or 1)
+        for kind, hashcode, error in result.corrupt:
+            self.view.display_text(f"повреждён {kind} {hashcode}: {error}")
+        for kind, hashcode, source in result.missing:
+            self.view.display_text(
+                f"отсутствует {kind} {hashcode} (ссылка из {source})"
+            )
+        for kind, hashcode in result.dangling:
+            self.view.display_text(f"висячий {kind} {hashcode}")
+        if result.legacy:
+            self.view.display_text(
+                f"Деревьев старого формата: {len(result.legacy)}"
+                " (хэш проверен по схеме первых версий)"
+            )
+        self.view.display_text(f"Проверено объектов: {result.checked}")
+        if not result.corrupt and not result.missing:
+            packs = {x.index_path.stem for x in storage.store.packs}
+            fsck.FsckState(started_at, packs).save(config.FSCK_STATE_PATH)
+        elapsed = time.perf_counter() - start
+        self.view.display_text(f"Время: {elapsed:.2f} с")
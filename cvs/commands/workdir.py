@@ -0,0 +1,84 @@
+import os
+
+from cvs import config, errors
+from cvs.commands import CvsCommand
+from cvs.utils import stats
+from cvs.utils.index_file import write_index
+from cvs.utils.walk import walk_files
+
+
+class InitCommand(CvsCommand):
+    def _validate(self) -> None:
+        if config.MAIN_PATH.exists():
+            raise errors.RepoAlreadyExistError(os.getcwd())
+
+    def _execute(self):
+        config.create_dirs()
+        write_index(config.INDEX_PATH, [])
+        self.repository.set_head("master")
+        self.repository.update_ref("master", "root")
+        self.view.display_text("Инициализирован новый репозиторий")
+
+
+class AddCommand(CvsCommand):
+    LOCKS_INDEX = True
+
+    def _validate(self, path_to_add: str, jobs: int = 1) -> None:
+        if not os.path.exists(path_to_add):
+            raise errors.InvalidPathError(path_to_add)
+        path = os.path.relpath(path_to_add)
+        path_to_add = os.path.realpath(path_to_add)
+        if (
+            os.getcwd() != os.path.commonpath([os.getcwd(), path_to_add])
+            or not config.MAIN_PATH.exists()
+        ):
+            raise errors.RepoNotFoundError(path_to_add)
+        if self.index.in_sparse_tree(path):
+            raise errors.InvalidPathError(path)
+
+    def _execute(self, path_to_index: str, jobs: int = 1):
+        path = os.path.relpath(path_to_index)
+        index = self.index
+        all_files = []
+        if os.path.isdir(path):
+            with stats.phase("walk"):
+                sparse = index.sparse_trees.keys()
+                all_files = list(
+                    walk_files(path, index.ignore_matcher, sparse)
+                )
+        with stats.phase("hashing"):
+            if os.path.isfile(path):
+                index.add_file(path)
+            present = index.add_files(all_files, jobs or os.cpu_count())
+        with stats.phase("index write"):
+            if os.path.isdir(path):
+                index.refresh_file(path, present)
+            else:
+                index.refresh_entry(path)
+
+
+class StatusCommand(CvsCommand):
+    def _validate(self) -> None:
+        if not config.MAIN_PATH.exists():
+            raise errors.RepoNotFoundError(os.getcwd())
+
+    def _execute(self):
+        self.view.display_text(f"HEAD -> {self.head_pointer}")
+        self.view.display_text("Неиндексированные файлы/изменения:\n")
+        index = self.index
+        with stats.phase("walk"):
+            sparse = index.sparse_trees.keys()
+            files = sorted(walk_files(os.curdir, index.ignore_matcher, sparse))
+        with stats.phase("hashing"):
+            for file in files:
+                entry = index.indexed_files.get(file)
+                if not entry:
+                    self.view.display_text(f"new file: {file}")
+
+                if entry and index.is_modified(file):
+                    self.view.display_text(f"modified: {file}")
+        if index.has_stale_stats:
+            with stats.phase("index write"):
+                index.save()
+        self.view.display_text("\nТекущее содержимое файла индекса:")
+        self.view.display_text("\n".join(self.index.indexed_files.keys()))
@@ -1,4 +1,3 @@
-import subprocess
 import sys
 from pathlib import Path
 
@@ -8,19 +7,32 @@ OBJECTS_PATH = MAIN_PATH / "objects"
 COMMITS_PATH = OBJECTS_PATH / "commits"
 BLOBS_PATH = OBJECTS_PATH / "blobs"
 TREES_PATH = OBJECTS_PATH / "trees"
+PACKS_PATH = OBJECTS_PATH / "packs"
 
 INDEX_PATH = MAIN_PATH / "index"
+COMMIT_GRAPH_PATH = MAIN_PATH / "commit-graph"
+SPARSE_PATH = MAIN_PATH / "sparse-checkout"
+FSCK_STATE_PATH = MAIN_PATH / "fsck-state"
+CONFIG_PATH = MAIN_PATH / "config"
 REFS_PATH = MAIN_PATH / "refs"
+PACKED_REFS_PATH = MAIN_PATH / "packed-refs"
 HEAD_PATH = MAIN_PATH / "HEAD"
 IGNORE_PATH = Path(".ignore")
 
+CHUNK_SIZE = 1 << 16
+GC_GRACE_PERIOD = 14 * 24 * 3600
+LOCK_TIMEOUT = 10.0
+
 
 def create_dirs():
     MAIN_PATH.mkdir()
     if sys.platform.startswith("win32"):
+        import subprocess
+
         subprocess.call(["attrib", "+h", str(MAIN_PATH)])
     OBJECTS_PATH.mkdir()
     COMMITS_PATH.mkdir()
     BLOBS_PATH.mkdir()
     TREES_PATH.mkdir()
+    PACKS_PATH.mkdir()
     REFS_PATH.mkdir()
@@ -34,9 +34,60 @@ class IndexFileNotFoundError(APIError):
         return f"Не удалось найти файл индекса в {self.arg}"
 
 
+class IndexCorruptedError(APIError):
+    def __init__(self, path: str):
+        self.arg = path
+
+    def __str__(self):
+        return f"Файл индекса {self.arg} повреждён"
+
+
 class CommitNotFoundError(APIError):
     def __init__(self, commit: str):
         self.arg = commit
 
     def __str__(self):
         return f"Не удалось найти коммит: {self.arg}"
+
+
+class InvalidArgumentError(APIError):
+    def __init__(self, argument: str):
+        self.arg = argument
+
+    def __str__(self):
+        return f"Недопустимые аргументы команды: {self.arg}"
+
+
+class UncommittedChangesError(APIError):
+    def __init__(self, path: str):
+        self.arg = path
+
+    def __str__(self):
+        return (
+            f"Файл {self.arg} содержит незакоммиченные изменения,"
+            " переключение прервано"
+        )
+
+
+class LockedError(APIError):
+    def __init__(self, path: str):
+        self.arg = path
+
+    def __str__(self):
+        return f"Файл {self.arg} изменяется другим процессом"
+
+
+class BranchNotFoundError(APIError):
+    def __init__(self, name: str):
+        self.arg = name
+
+    def __str__(self):
+        return f"Не удалось найти ветку: {self.arg}"
+
+
+class BranchAlreadyExistError(APIError):
+    def __init__(self, name: str):
+        self.arg = name
+
+    def __str__(self):
+        return f"Ветка {self.arg} уже существует"
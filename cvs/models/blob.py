@@ -1,31 +1,52 @@
 import hashlib
-import zlib
 from pathlib import Path
 
+from cvs.utils import storage, streams
+
 
 class Blob:
-    def __init__(self, filename: str, data: bytes):
+    def __init__(
+        self, filename: str, data: bytes = None, hashcode: str = None
+    ):
+        """Блоб создаётся либо по данным, либо только по хэшу.
+
+        Во втором случае сжатые данные читаются из хранилища
+        только при первом обращении к `compressed_data`.
+        """
+        if data is None and hashcode is None:
+            raise ValueError("Blob requires either data or hashcode")
         self._filename = filename
-        self.compressed_data = data
-        self._hash_obj = hashlib.sha1(data)
+        self._data = data
+        self._hash = hashcode or hashlib.sha1(data).hexdigest()
 
     @property
     def content_hash(self) -> str:
-        return self._hash_obj.hexdigest()
+        return self._hash
 
     @property
     def filename(self) -> str:
         return self._filename
 
+    @property
+    def is_loaded(self) -> bool:
+        return self._data is not None
+
+    @property
+    def compressed_data(self) -> bytes:
+        if self._data is None:
+            self._data = storage.store.read("blob", self._hash)
+        return self._data
+
     def is_same_with_file(self, path: Path):
-        file_content = path.read_bytes()
-        compressed_content = zlib.compress(file_content)
-        file_hash = hashlib.sha1(compressed_content).hexdigest()
-        return file_hash == self.content_hash
+        """Файл сжимается тем же кодеком, что и сохранённый блоб"""
+        codec = storage.store.blob_codec(self._hash)
+        return streams.hash_file(path, codec) == self.content_hash
 
     def create_file(self, destination: str) -> None:
-        path_to_blob = Path(destination) / self.content_hash
-        path_to_blob.write_bytes(self.compressed_data)
+        if not (Path(destination) / self.content_hash).exists():
+            streams.store_bytes(
+                self.compressed_data, self.content_hash, Path(destination)
+            )
 
     def __eq__(self, other: object) -> bool:
         if other is None or not isinstance(other, Blob):
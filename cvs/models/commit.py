@@ -1,13 +1,16 @@
 import hashlib
 from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from cvs import config
-from cvs.models.tree import TreeNode
+from cvs.utils import storage, streams
+
+if TYPE_CHECKING:
+    from cvs.models.tree import TreeNode
 
 
 class Commit:
-    def __init__(self, root: TreeNode, message: str, parent: str):
+    def __init__(self, root: "TreeNode", message: str, parent: str):
         self.tree = root
         self.message = message
         self.parent = parent
@@ -18,22 +21,36 @@ class Commit:
     def content_hash(self) -> str:
         return self._hash_obj.hexdigest()
 
-    def is_same_with_parent(self, path_to_storage: str) -> bool:
-        parent_path = Path(path_to_storage) / self.parent
+    @property
+    def message_offset(self) -> int:
+        """Смещение сообщения в байтах от начала содержимого коммита"""
+        return len(str(self).encode("utf-8")) - len(
+            self.message.encode("utf-8")
+        )
+
+    def is_same_with_parent(self) -> bool:
         if self.parent == "root":
             return False
 
-        commit_content = parent_path.read_text()
+        commit_content = self.read_file_content(self.parent)
         return commit_content.startswith(str(self.tree))
 
     def create_file(self, destination: Path):
-        commit_path = destination / self.content_hash
-        commit_path.write_text(str(self))
+        content = str(self).encode("utf-8")
+        streams.store_bytes(content, self.content_hash, destination)
+
+    @classmethod
+    def read_file_content(cls, commit_hash: str) -> str:
+        return storage.store.read_commit(commit_hash)
+
+    @classmethod
+    def read_message(cls, commit_hash: str, offset: int) -> str:
+        content = storage.store.read_commit(commit_hash).encode("utf-8")
+        return content[offset:].decode("utf-8")
 
     @classmethod
     def parse_file_content(cls, commit_hash: str) -> tuple:
-        commit_file = config.COMMITS_PATH / commit_hash
-        lines = commit_file.read_text().split("\n")
+        lines = cls.read_file_content(commit_hash).split("\n")
         return lines[0].split(" ")[1], lines[1].split(" ")[1]
 
     def __str__(self):
@@ -0,0 +1,131 @@
+import mmap
+import struct
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+from cvs.models.commit import Commit
+
+MAGIC = b"CVCG"
+VERSION = 1
+
+HEADER = struct.Struct(">4sI")
+RECORD = struct.Struct(">20s20s20sq26sI")
+ROOT = "root"
+NO_PARENT = b"\0" * 20
+
+
+class CommitRecord(NamedTuple):
+    commit: str
+    tree: str
+    parent: str
+    date: str
+    message_offset: int
+    parent_position: int = -1
+
+
+class CommitGraph:
+    """Кэш графа коммитов: записи фиксированной ширины в порядке создания.
+
+    Каждая запись хранит хэши коммита, дерева и родителя, дату,
+    смещение сообщения в объекте коммита и номер записи родителя,
+    поэтому история читается переходами по записям без разбора
+    объектов коммитов. Коммиты вне графа читаются из хранилища.
+    """
+
+    def __init__(self, location: Path):
+        self._location = location
+        self._data = None
+        if location.exists() and location.stat().st_size > HEADER.size:
+            with open(location, "rb") as file:
+                self._data = mmap.mmap(
+                    file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            magic, version = HEADER.unpack_from(self._data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Unsupported commit graph {location}")
+
+    @property
+    def count(self) -> int:
+        if self._data is None:
+            return 0
+        return (len(self._data) - HEADER.size) // RECORD.size
+
+    def record(self, position: int) -> CommitRecord:
+        offset = HEADER.size + position * RECORD.size
+        commit, tree, parent, parent_position, date, message_offset = (
+            RECORD.unpack_from(self._data, offset)
+        )
+        return CommitRecord(
+            commit.hex(),
+            tree.hex(),
+            parent.hex() if parent != NO_PARENT else ROOT,
+            date.rstrip(b"\0").decode("ascii"),
+            message_offset,
+            parent_position,
+        )
+
+    def find(self, commit_hash: str) -> Optional[int]:
+        """Номер записи коммита, поиск от последних записей к первым"""
+        if len(commit_hash) != 40:
+            return None
+        key = bytes.fromhex(commit_hash)
+        for position in range(self.count - 1, -1, -1):
+            offset = HEADER.size + position * RECORD.size
+            end = offset + 20
+            if self._data[offset:end] == key:
+                return position
+        return None
+
+    def append(self, commit: Commit) -> None:
+        parent_position = -1
+        if commit.parent != ROOT:
+            parent_position = self.find(commit.parent)
+            if parent_position is None:
+                parent_position = -1
+        record = RECORD.pack(
+            bytes.fromhex(commit.content_hash),
+            bytes.fromhex(commit.tree.content_hash),
+            (
+                bytes.fromhex(commit.parent)
+                if commit.parent != ROOT
+                else NO_PARENT
+            ),
+            parent_position,
+            commit.date.encode("ascii"),
+            commit.message_offset,
+        )
+        with open(self._location, "ab") as file:
+            if file.tell() == 0:
+                file.write(HEADER.pack(MAGIC, VERSION))
+            file.write(record)
+
+    @staticmethod
+    def read_record(commit_hash: str) -> CommitRecord:
+        """Запись коммита, построенная по его объекту в хранилище"""
+        content = Commit.read_file_content(commit_hash)
+        header, _ = content.split("\n\n", 1)
+        lines = header.split("\n")
+        return CommitRecord(
+            commit_hash,
+            lines[0].split(" ")[1],
+            lines[1].split(" ")[1],
+            lines[2].split(" ", 1)[1],
+            len(header.encode("utf-8")) + 2,
+        )
+
+    def iter_history(self, commit_hash: str) -> Iterator[CommitRecord]:
+        """История от коммита к корню"""
+        position = self.find(commit_hash)
+        while commit_hash != ROOT:
+            if position is None or position < 0:
+                record = self.read_record(commit_hash)
+                position = None
+            else:
+                record = self.record(position)
+                position = record.parent_position
+            yield record
+            commit_hash = record.parent
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
@@ -1,24 +1,137 @@
+import bisect
+import os
 import logging
-import fnmatch
 
 from cvs import errors, config
 from pathlib import Path
-from typing import List, Dict
+from itertools import repeat
+from typing import List, Dict, NamedTuple, Optional, Iterable, Set, Tuple
 from cvs.models.blob import Blob
+from cvs.utils import stats
 from cvs.utils.factories import BlobFactory
+from cvs.utils.ignore import IgnoreMatcher
+from cvs.utils.index_file import IndexFile, write_index
+from cvs.utils.lock import LockFile
 
 logger = logging.getLogger(__name__)
 
 
+class FileStat(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+    ctime_ns: int
+
+    @classmethod
+    def from_path(cls, path: str) -> "FileStat":
+        stat = os.stat(path)
+        stats.count(files_stated=1)
+        return cls(
+            stat.st_size, stat.st_mtime_ns, stat.st_ino, stat.st_ctime_ns
+        )
+
+    def __str__(self):
+        return f"{self.size} {self.mtime_ns} {self.inode} {self.ctime_ns}"
+
+
+class IndexEntry:
+    """Запись индекса: путь, хэш блоба и данные stat без содержимого"""
+
+    __slots__ = ("path", "hashcode", "stat", "flags")
+
+    def __init__(
+        self, path: str, hashcode: str, stat: FileStat = None, flags: int = 0
+    ):
+        self.path = path
+        self.hashcode = hashcode
+        self.stat = stat
+        self.flags = flags
+
+    @property
+    def blob(self) -> Blob:
+        return BlobFactory.get_existing_blob(self.path, self.hashcode)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, IndexEntry):
+            return False
+        return self.path == other.path and self.hashcode == other.hashcode
+
+    def __str__(self):
+        if self.stat:
+            return f"{self.path} {self.hashcode} {self.stat}"
+        return f"{self.path} {self.hashcode}"
+
+
 class FileIndex:
     BLOB_STORAGE = str(config.BLOBS_PATH)
+    PARALLEL_MIN_FILES = 64
+    TREE_EXTENSION = b"TREE"
+    SPARSE_DIR = 1
 
     def __init__(self, path_to_index: Path, path_to_ignore: Path):
         self._location = path_to_index
         if not self._location.exists():
             raise errors.IndexFileNotFoundError(str(path_to_index))
-        self.indexed_files = self.get_indexed_files()
+        self._timestamp = self._location.stat().st_mtime_ns
+        self.extensions: Dict[bytes, bytes] = {}
+        self.tree_cache: Dict[str, str] = {}
         self.ignored_files = self.get_ignored_files(path_to_ignore)
+        self.ignore_matcher = IgnoreMatcher(self.ignored_files)
+        self.has_stale_stats = False
+        self.defer_writes = False
+        self.is_dirty = False
+        self.is_locked = False
+        self._entries: Optional[Dict[str, IndexEntry]] = None
+        self._found: Dict[str, Optional[IndexEntry]] = {}
+        self._index_file: Optional[IndexFile] = None
+        if IndexFile.is_binary(self._location):
+            self._index_file = self.open_index_file()
+            self.extensions = self._index_file.extensions
+            self.tree_cache = self.get_tree_cache()
+        else:
+            logger.info(f"Migrating text index {path_to_index} to binary")
+            self.indexed_files = self.get_legacy_indexed_files()
+            self.save()
+
+    @property
+    def indexed_files(self) -> Dict[str, IndexEntry]:
+        """Все записи индекса, разбираются при первом обращении"""
+        if self._entries is None:
+            self._entries = self.get_indexed_files()
+            self._index_file = None
+            self._found.clear()
+        return self._entries
+
+    @indexed_files.setter
+    def indexed_files(self, entries: Dict[str, IndexEntry]) -> None:
+        self._entries = entries
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._entries is not None
+
+    def get_entry(self, path: str) -> Optional[IndexEntry]:
+        """Запись по пути без разбора всего индекса.
+
+        До первого обращения к `indexed_files` запись ищется бинарным
+        поиском в файле, найденные записи затем попадают в общий словарь.
+        """
+        if self._entries is not None:
+            return self._entries.get(path)
+        if path not in self._found:
+            raw = self._index_file.find(path)
+            self._found[path] = raw and self.make_entry(*raw)
+        return self._found[path]
+
+    def in_sparse_tree(self, path: str) -> bool:
+        """Путь совпадает с каталогом, хранящимся деревом, или лежит в нём"""
+        directory = path
+        while directory and directory != os.curdir:
+            entry = self.get_entry(directory)
+            if entry and entry.flags & self.SPARSE_DIR:
+                return True
+            directory = os.path.dirname(directory)
+        return False
 
     @property
     def is_empty(self) -> bool:
@@ -26,12 +139,85 @@ class FileIndex:
 
     @property
     def blobs(self) -> List[Blob]:
-        return sorted(self.indexed_files.values())
+        return [entry.blob for entry in self.file_entries]
+
+    def tree_sources(self) -> Tuple[List[Blob], List[str]]:
+        """Блобы файлов вне закэшированных каталогов и сами эти каталоги.
+
+        Пути перебираются по порядку, файлы закэшированного каталога
+        пропускаются бинарным поиском, поэтому после изменения одного
+        файла разбираются только каталоги на его пути.
+        """
+        if "" in self.tree_cache:
+            return [], []
+        paths = sorted(self.indexed_files)
+        blobs, directories, position = [], [], 0
+        while position < len(paths):
+            path = paths[position]
+            directory = self.cached_directory(path)
+            if directory is not None:
+                directories.append(directory)
+                end = directory + chr(ord(os.sep) + 1)
+                position = bisect.bisect_left(paths, end, position)
+                continue
+            entry = self.indexed_files[path]
+            if not entry.flags & self.SPARSE_DIR:
+                blobs.append(entry.blob)
+            position += 1
+        return blobs, directories
+
+    def cached_directory(self, path: str) -> Optional[str]:
+        """Внешний каталог пути с известным хэшем дерева или None"""
+        directory = ""
+        for name in path.split(os.sep)[:-1]:
+            directory = os.path.join(directory, name)
+            if directory in self.tree_cache:
+                return directory
+        return None
+
+    @property
+    def file_entries(self) -> List[IndexEntry]:
+        return [x for x in self.entries if not x.flags & self.SPARSE_DIR]
+
+    @property
+    def sparse_trees(self) -> Dict[str, str]:
+        """Каталоги вне частичной рабочей копии: путь -> хэш дерева"""
+        return {
+            x.path: x.hashcode
+            for x in self.indexed_files.values()
+            if x.flags & self.SPARSE_DIR
+        }
+
+    @property
+    def entries(self) -> List[IndexEntry]:
+        return [self.indexed_files[x] for x in sorted(self.indexed_files)]
 
     def is_ignored(self, filename: str) -> bool:
-        for pattern in self.ignored_files:
-            if fnmatch.fnmatch(filename, pattern):
-                return True
+        return self.ignore_matcher.is_ignored(filename)
+
+    def is_racily_clean(self, stat: FileStat) -> bool:
+        """Файл мог измениться в тот же квант времени, что и запись индекса"""
+        return stat.mtime_ns >= self._timestamp
+
+    def is_modified(self, path: str, stat: Optional[FileStat] = None) -> bool:
+        """Проверка изменения файла относительно индекса.
+
+        Содержимое файла перечитывается только если изменились
+        данные stat или запись индекса оказалась "racily clean".
+        Проверенная racily clean запись помечает индекс устаревшим,
+        чтобы после перезаписи она снова сравнивалась только по stat.
+        """
+        entry = self.get_entry(path)
+        if not entry:
+            return True
+        stat = stat or FileStat.from_path(path)
+        if entry.stat == stat and not self.is_racily_clean(stat):
+            return False
+        if not entry.blob.is_same_with_file(Path(path)):
+            return True
+        if entry.stat != stat or self.is_racily_clean(stat):
+            entry.stat = stat
+            self.has_stale_stats = True
         return False
 
     def add_file(self, path: str) -> None:
@@ -39,35 +225,221 @@ class FileIndex:
         if self.is_ignored(path):
             return
 
-        blob = BlobFactory.create_new_blob(file=path)
-        if self.indexed_files.get(path) == blob:
+        stat = FileStat.from_path(path)
+        if self.get_entry(path) and not self.is_modified(path, stat):
+            logger.info(f"File {path} is already indexed!")
+            return
+
+        blob = BlobFactory.create_new_blob(path, self.BLOB_STORAGE)
+        entry = IndexEntry(path, blob.content_hash, stat)
+        if self.get_entry(path) == entry:
             logger.info(f"File {path} is already indexed!" + blob.content_hash)
+            self.get_entry(path).stat = stat
+            self.has_stale_stats = True
             return
 
-        self.indexed_files[path] = blob
-        blob.create_file(self.BLOB_STORAGE)
+        self.set_entry(entry)
+
+    def set_entry(self, entry: IndexEntry) -> None:
+        """Запись в индекс со сбросом кэша деревьев по пути файла"""
+        if self.indexed_files.get(entry.path) != entry:
+            self.invalidate_tree(entry.path)
+        self.indexed_files[entry.path] = entry
+
+    def remove_entry(self, path: str) -> None:
+        if self.indexed_files.pop(path, None):
+            self.invalidate_tree(path)
+
+    def invalidate_tree(self, path: str) -> None:
+        """Сброс хэшей всех каталогов, содержащих файл"""
+        directory = path
+        while directory:
+            directory = os.path.dirname(directory)
+            self.tree_cache.pop(directory, None)
+
+    def add_files(self, paths: Iterable[str], jobs: int = 1) -> Set[str]:
+        """Добавление набора файлов в индекс.
+
+        Сжатие, хэширование и запись блобов выполняются в пуле
+        процессов, основной процесс только обновляет записи индекса.
+        Возвращает множество неигнорируемых файлов из `paths`.
+        """
+        changed, accepted = {}, set()
+        for path in paths:
+            if self.is_ignored(path):
+                continue
+            accepted.add(path)
+            stat = FileStat.from_path(path)
+            if path in self.indexed_files and not self.is_modified(path, stat):
+                continue
+            changed[path] = stat
+
+        if jobs > 1 and len(changed) >= self.PARALLEL_MIN_FILES:
+            stats.count(bytes_read=sum(x.size for x in changed.values()))
+            chunksize = max(1, len(changed) // (jobs * 4))
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                blobs = list(
+                    executor.map(
+                        BlobFactory.create_new_blob,
+                        changed,
+                        repeat(self.BLOB_STORAGE),
+                        chunksize=chunksize,
+                    )
+                )
+        else:
+            blobs = [
+                BlobFactory.create_new_blob(path, self.BLOB_STORAGE)
+                for path in changed
+            ]
+
+        for blob in blobs:
+            path = blob.filename
+            self.set_entry(IndexEntry(path, blob.content_hash, changed[path]))
+        return accepted
+
+    def open_index_file(self) -> IndexFile:
+        """Чтение файла индекса с проверкой SHA-1"""
+        data = self._location.read_bytes()
+        stats.count(bytes_read=len(data))
+        try:
+            index_file = IndexFile(self._location, data)
+        except ValueError:
+            raise errors.IndexCorruptedError(str(self._location))
+        if not index_file.verify():
+            raise errors.IndexCorruptedError(str(self._location))
+        return index_file
+
+    @staticmethod
+    def make_entry(
+        path: str, hashcode: str, stat: tuple, flags: int
+    ) -> IndexEntry:
+        stat = FileStat(*stat) if any(stat) else None
+        return IndexEntry(path, hashcode, stat, flags)
+
+    def get_indexed_files(self) -> Dict[str, IndexEntry]:
+        """Разбор всех записей прочитанного файла индекса.
+
+        Записи, уже найденные через `get_entry`, сохраняются как есть.
+        """
+        result = {x[0]: self.make_entry(*x) for x in self._index_file}
+        result.update((x, y) for x, y in self._found.items() if y)
+        return result
 
-    def get_indexed_files(self) -> Dict[str, Blob]:
-        """Извлечение содержимого файла индекса"""
+    def get_legacy_indexed_files(self) -> Dict[str, IndexEntry]:
+        """Извлечение содержимого текстового индекса старого формата"""
         result = {}
         file_content = self._location.read_text().splitlines()
         for line in file_content:
-            filename, hashcode = line.rsplit(" ", 1)
-            blob = BlobFactory.get_existing_blob(
-                file=filename, hashcode=hashcode
-            )
-            result[filename] = blob
+            entry = self.parse_line(line)
+            result[entry.path] = entry
         return result
 
-    def refresh_file(self) -> None:
-        """Запись содержимого индекса в файл"""
-        content_to_write = []
-        for blob in self.blobs:
-            if Path(blob.filename).exists() and not self.is_ignored(
-                blob.filename
-            ):
-                content_to_write.append(str(blob))
-        self._location.write_text("\n".join(content_to_write))
+    def refresh_file(
+        self, walked_dir: str = None, present: Set[str] = frozenset()
+    ) -> None:
+        """Запись содержимого индекса в файл.
+
+        Записи внутри только что обойдённой `walked_dir` сверяются
+        с множеством найденных неигнорируемых файлов `present`
+        без обращения к диску, остальные - проверкой существования.
+        """
+        for path, entry in list(self.indexed_files.items()):
+            if entry.flags & self.SPARSE_DIR:
+                continue
+            if walked_dir and self.is_inside(path, walked_dir):
+                if path not in present:
+                    self.remove_entry(path)
+            elif not Path(path).exists() or self.is_ignored(path):
+                self.remove_entry(path)
+        self.save()
+
+    def refresh_entry(self, path: str) -> None:
+        """Запись индекса после добавления одного файла.
+
+        Проверяется только запись этого файла: остальные записи
+        сверяются с рабочей копией лишь при обходе каталога.
+        Если индекс не разбирался целиком, он не менялся и не пишется.
+        """
+        if not os.path.isfile(path) or self.is_ignored(path):
+            self.remove_entry(path)
+        if self.is_loaded or self.has_stale_stats:
+            self.save()
+
+    @staticmethod
+    def is_inside(path: str, directory: str) -> bool:
+        if directory == os.curdir:
+            return True
+        return path == directory or path.startswith(directory + os.sep)
+
+    def get_tree_cache(self) -> Dict[str, str]:
+        """Хэши деревьев каталогов, не изменявшихся с последнего коммита"""
+        result = {}
+        content = os.fsdecode(self.extensions.get(self.TREE_EXTENSION, b""))
+        for line in content.splitlines():
+            hashcode, directory = line.split(" ", 1)
+            result[directory] = hashcode
+        return result
+
+    def save(self) -> None:
+        """Запись индекса или, при отложенной записи, пометка изменений"""
+        if self.defer_writes:
+            self.is_dirty = True
+            return
+        self.write()
+
+    def flush(self) -> None:
+        """Запись отложенных изменений"""
+        if self.is_dirty:
+            self.write()
+
+    def write(self) -> None:
+        """Запись индекса вместе с закэшированными данными stat.
+
+        Без блокировки всей команды (`is_locked`) индекс записывается,
+        только если `index.lock` свободен и файл не менялся после
+        чтения, иначе теряется лишь обновление кэша stat.
+        """
+        if self.is_locked:
+            self._write()
+            return
+        try:
+            with LockFile(self._location, timeout=0):
+                if self._location.stat().st_mtime_ns != self._timestamp:
+                    logger.info(f"Index {self._location} changed, not saved")
+                    return
+                self._write()
+        except errors.LockedError:
+            logger.info(f"Index {self._location} is locked, not saved")
+
+    def _write(self) -> None:
+        self.extensions[self.TREE_EXTENSION] = os.fsencode(
+            "\n".join(f"{x} {y}" for y, x in sorted(self.tree_cache.items()))
+        )
+        write_index(
+            self._location,
+            [
+                (x.path, x.hashcode, x.stat or (0, 0, 0, 0), x.flags)
+                for x in self.indexed_files.values()
+            ],
+            self.extensions,
+        )
+        index_stat = self._location.stat()
+        stats.count(bytes_written=index_stat.st_size)
+        self._timestamp = index_stat.st_mtime_ns
+        self.has_stale_stats = False
+        self.is_dirty = False
+
+    @staticmethod
+    def parse_line(line: str) -> IndexEntry:
+        """Разбор строки индекса: `path hash [size mtime inode ctime]`"""
+        parts = line.rsplit(" ", 5)
+        if len(parts) == 6 and all(x.isdigit() for x in parts[2:]):
+            stat = FileStat(*map(int, parts[2:]))
+            return IndexEntry(parts[0], parts[1], stat)
+        filename, hashcode = line.rsplit(" ", 1)
+        return IndexEntry(filename, hashcode)
 
     @staticmethod
     def get_ignored_files(ignore_file: Path) -> List[str]:
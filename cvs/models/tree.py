@@ -1,29 +1,63 @@
 import hashlib
+import os
 from pathlib import Path
+from typing import Dict
+
+from cvs.utils import storage, streams
 from anytree import NodeMixin, LevelOrderIter
 
 
 class TreeNode(NodeMixin):
-    def __init__(self, name: str, parent=None):
+    def __init__(
+        self,
+        name: str,
+        parent=None,
+        obj_type: str = "tree",
+        content_hash: str = None,
+    ):
+        """Узел дерева коммита.
+
+        Для блобов и переиспользуемых без изменений поддеревьев хэш
+        известен заранее, хэш остальных деревьев вычисляется по
+        отсортированным записям дочерних узлов (тип, хэш, имя).
+        """
         super(TreeNode, self).__init__()
         self.name = name
-        self._hash_obj = hashlib.sha1()
+        self.obj_type = obj_type
+        self.entries: Dict[str, TreeNode] = {}
+        self._hash = content_hash
+        self.is_stored = content_hash is not None
         self.parent = parent
+        if parent is not None:
+            parent.entries[name] = self
 
     @property
     def content_hash(self) -> str:
-        return self._hash_obj.hexdigest()
+        if self._hash is None:
+            self._hash = hashlib.sha1(self.content).hexdigest()
+        return self._hash
 
-    def update_hash(self, hash_code: bytes) -> None:
-        self._hash_obj.update(hash_code)
+    @property
+    def content(self) -> bytes:
+        lines = [str(self.entries[name]) for name in sorted(self.entries)]
+        return "\n".join(lines).encode("utf-8")
 
     def create_file(self, destination: Path) -> None:
-        for tree in LevelOrderIter(self, lambda node: not node.is_leaf):
-            curr_obj_path = destination / tree.content_hash
-            content = [str(child) for child in tree.children]
-            with curr_obj_path.open("w") as file:
-                file.write("\n".join(content))
+        for tree in LevelOrderIter(self, lambda node: not node.is_stored):
+            streams.store_bytes(tree.content, tree.content_hash, destination)
+
+    def tree_hashes(self, path: str = "") -> Dict[str, str]:
+        """Хэши всех поддеревьев: путь каталога -> хэш"""
+        result = {path: self.content_hash}
+        for name, child in self.entries.items():
+            if child.obj_type == "tree":
+                result.update(child.tree_hashes(os.path.join(path, name)))
+        return result
+
+    @classmethod
+    def parse_file_content(cls, tree_hash: str) -> Dict[str, tuple]:
+        """Чтение дерева: имя -> (тип объекта, хэш)"""
+        return storage.store.read_tree(tree_hash)
 
     def __str__(self):
-        obj_type = "blob" if self.is_leaf else "tree"
-        return f"{obj_type} {self.content_hash} {self.name}"
+        return f"{self.obj_type} {self.content_hash} {self.name}"
@@ -0,0 +1,127 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+from cvs import config
+from cvs.utils import refs, stats, storage
+from cvs.utils.lock import LockFile
+from cvs.view import BaseView
+
+if TYPE_CHECKING:
+    from cvs.models.index import FileIndex
+
+
+class Repository:
+    """Состояние репозитория, общее для последовательности команд.
+
+    Индекс читается с диска один раз, HEAD и ветки кэшируются,
+    объекты берутся из общего хранилища вместе с его кэшами.
+    При отложенной записи индекс сохраняется только в `close`.
+    """
+
+    def __init__(self, view: BaseView, defer_index_writes: bool = False):
+        self.view = view
+        self.store = storage.store
+        self.ref_store = refs.RefStore(
+            config.REFS_PATH, config.PACKED_REFS_PATH
+        )
+        self.defer_index_writes = defer_index_writes
+        self._index: Optional["FileIndex"] = None
+        self._index_lock: Optional[LockFile] = None
+        self._head: Optional[str] = None
+        self._refs: Dict[str, Optional[str]] = {}
+
+    @property
+    def index(self) -> "FileIndex":
+        if self._index is None:
+            from cvs.models.index import FileIndex
+
+            with stats.phase("index load"):
+                self._index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+            self._index.defer_writes = self.defer_index_writes
+            self._index.is_locked = self._index_lock is not None
+        return self._index
+
+    def lock_index(self) -> None:
+        """Блокировка `index.lock` от чтения индекса до `unlock_index`.
+
+        Индекс без изменений, прочитанный до блокировки, читается
+        заново, чтобы не затереть записи других процессов.
+        """
+        if self._index_lock is not None:
+            return
+        lock = LockFile(config.INDEX_PATH)
+        try:
+            lock.acquire()
+        except FileNotFoundError:
+            return
+        self._index_lock = lock
+        if self._index is not None and not self._index.is_dirty:
+            self._index = None
+        if self._index is not None:
+            self._index.is_locked = True
+
+    def unlock_index(self) -> None:
+        if self._index_lock is None:
+            return
+        self._index_lock.rollback()
+        self._index_lock = None
+        if self._index is not None:
+            self._index.is_locked = False
+
+    @property
+    def head_pointer(self) -> str:
+        if self._head is None:
+            self._head = config.HEAD_PATH.read_text()
+        return self._head
+
+    @property
+    def head_commit(self) -> str:
+        """Коммит HEAD: чтение HEAD и, для ветки, одной ссылки"""
+        pointer = self.head_pointer
+        if refs.is_commit_hash(pointer):
+            return pointer
+        return self.read_ref(pointer) or pointer
+
+    @property
+    def refs(self) -> Dict[str, str]:
+        """Все ветки: имя -> хэш коммита"""
+        self._refs = self.ref_store.all()
+        return dict(self._refs)
+
+    def read_ref(self, name: str) -> Optional[str]:
+        if name not in self._refs:
+            self._refs[name] = self.ref_store.read(name)
+        return self._refs[name]
+
+    def set_head(self, pointer: str) -> None:
+        with LockFile(config.HEAD_PATH) as lock:
+            lock.write(pointer.encode("utf-8"))
+            lock.commit()
+        self._head = pointer
+
+    def update_ref(self, name: str, commit: str) -> None:
+        self.ref_store.update(name, commit)
+        self._refs[name] = commit
+
+    def delete_ref(self, name: str) -> bool:
+        self._refs.pop(name, None)
+        return self.ref_store.delete(name)
+
+    def run(self, command: str, *args) -> None:
+        """Выполнение команды по её имени на общем состоянии"""
+        from cvs.commands import CvsCommand
+
+        CvsCommand.resolve(command)(self.view, self)(*args)
+
+    def close(self) -> None:
+        """Запись отложенных изменений индекса"""
+        try:
+            if self._index is not None:
+                self._index.flush()
+        finally:
+            self.unlock_index()
+
+    def __enter__(self) -> "Repository":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,80 @@
+import re
+import zlib
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from cvs.utils import compression
+from cvs.utils.compression import Codec
+
+MIN_SIZE = 1 << 14
+MAX_SIZE = 1 << 19
+WINDOW = 48
+ANCHORS = b"\n,;}" + bytes(range(0x87, 0x100, 0x20))
+ANCHOR = re.compile(b"[" + re.escape(ANCHORS) + b"]")
+NOT_ANCHOR = re.compile(b"[^" + re.escape(ANCHORS) + b"]")
+BOUNDARY_MASK = (1 << 6) - 1
+
+ChunkEntry = Tuple[str, int]
+
+
+def _find_cut(
+    data: bytearray, position: int, limit: int
+) -> Tuple[Optional[int], int]:
+    """Граница чанка в `data[position:limit]` и место продолжения поиска.
+
+    Кандидаты - вхождения байт из ANCHORS, найденные без цикла
+    по байтам: перевод строки и разделители для текста, несколько
+    старших байт для двоичных данных, где кандидат встречается в
+    среднем раз в 32 байта. Граница ставится, если хэш WINDOW
+    предшествующих байт попал под маску. Граница зависит только
+    от содержимого рядом с ней, поэтому вставка в начало файла
+    не сдвигает последующие. Серия подряд идущих кандидатов
+    проверяется только по первому из них, данные совсем без байт
+    из ANCHORS (например, нули) режутся по MAX_SIZE.
+    """
+    while True:
+        match = ANCHOR.search(data, position, limit)
+        if match is None:
+            return None, max(position, limit)
+        found = match.start()
+        start = found - WINDOW
+        if zlib.crc32(data[start:found]) & BOUNDARY_MASK == 0:
+            return found + 1, found + 1
+        position = found + 1
+        if position < limit and data[position] in ANCHORS:
+            match = NOT_ANCHOR.search(data, position, limit)
+            position = match.start() if match else limit
+
+
+def split(blocks: Iterable[bytes]) -> Iterator[bytes]:
+    """Деление потока на чанки от MIN_SIZE до MAX_SIZE байт"""
+    buffer = bytearray()
+    position = MIN_SIZE
+    for block in blocks:
+        buffer += block
+        while True:
+            limit = min(len(buffer), MAX_SIZE)
+            cut, position = _find_cut(buffer, position, limit)
+            if cut is None:
+                if len(buffer) < MAX_SIZE:
+                    break
+                cut = MAX_SIZE
+            yield bytes(buffer[:cut])
+            del buffer[:cut]
+            position = MIN_SIZE
+    if buffer:
+        yield bytes(buffer)
+
+
+def encode_manifest(codec: Codec, entries: List[ChunkEntry]) -> bytes:
+    """Содержимое блоба-списка чанков: заголовок и строки `хэш размер`"""
+    lines = "".join(f"{hashcode} {size}\n" for hashcode, size in entries)
+    return codec.header + lines.encode("ascii")
+
+
+def parse_manifest(content: bytes) -> List[ChunkEntry]:
+    result = []
+    start = compression.HEADER_SIZE
+    for line in content[start:].decode("ascii").splitlines():
+        hashcode, size = line.split(" ")
+        result.append((hashcode, int(size)))
+    return result
@@ -0,0 +1,251 @@
+import configparser
+import itertools
+import lzma
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from cvs import config
+
+HEADER_MARK = 0
+HEADER_SIZE = 3
+TAGS = {"stored": b"s", "zlib": b"z", "lzma": b"x"}
+CODEC_NAMES = {value[0]: key for key, value in TAGS.items()}
+
+DECODE_STEP = 1 << 24
+DECODE_ERRORS = (zlib.error, lzma.LZMAError, ValueError, EOFError)
+PROBE_SIZE = 1 << 16
+PROBE_MIN_SIZE = 1 << 12
+PROBE_RATIO = 0.95
+COMPRESSED_EXTENSIONS = (
+    "7z avi bz2 docx flac gif gz jar jpeg jpg lz4 mkv mov mp3 mp4 odt "
+    "ogg png pptx rar webm webp whl woff woff2 xlsx xz zip zst"
+).split()
+
+
+class Codec(NamedTuple):
+    """Способ хранения блоба: `stored`, `zlib` или `lzma` и уровень сжатия.
+
+    Блоб с `chunked` - список чанков, каждый из которых хранится
+    отдельным блобом с тем же кодеком.
+    """
+
+    name: str
+    level: int
+    chunked: bool = False
+
+    @classmethod
+    def parse(cls, spec: str) -> "Codec":
+        """Разбор записи вида `zlib:9`, `lzma` или `stored`.
+
+        Уровень `stored` не влияет на хранение и всегда равен 0.
+        """
+        name, _, level = spec.strip().partition(":")
+        if name not in TAGS:
+            raise ValueError(f"Unknown codec {spec}")
+        default = {"stored": 0, "zlib": 6, "lzma": 6}[name]
+        level = int(level) if level else default
+        if not 0 <= level <= 9:
+            raise ValueError(f"Invalid compression level {spec}")
+        if name == "stored":
+            level = 0
+        return cls(name, level)
+
+    @property
+    def header(self) -> bytes:
+        """Заголовок объекта, у zlib уровня 6 его нет ради старых объектов"""
+        if self == LEGACY:
+            return b""
+        tag = TAGS[self.name].upper() if self.chunked else TAGS[self.name]
+        return bytes([HEADER_MARK]) + tag + bytes([self.level])
+
+    def encoder(self):
+        if self.name == "zlib":
+            return zlib.compressobj(self.level)
+        if self.name == "lzma":
+            return lzma.LZMACompressor(preset=self.level)
+        return _Identity()
+
+    def decoder(self):
+        if self.name == "zlib":
+            return zlib.decompressobj()
+        if self.name == "lzma":
+            return lzma.LZMADecompressor()
+        raise ValueError(f"No decoder for codec {self.name}")
+
+
+LEGACY = Codec("zlib", 6)
+STORED = Codec("stored", 0)
+
+
+class _Identity:
+    @staticmethod
+    def compress(data: bytes) -> bytes:
+        return data
+
+    @staticmethod
+    def flush() -> bytes:
+        return b""
+
+
+def parse_header(head: bytes) -> Tuple[Codec, int]:
+    """Кодек объекта по первым байтам и длина заголовка.
+
+    Объекты без заголовка - потоки zlib, начинающиеся с 0x78.
+    """
+    if not head or head[0] != HEADER_MARK:
+        return LEGACY, 0
+    tag = head[1:2].lower()
+    if len(head) < HEADER_SIZE or tag[0] not in CODEC_NAMES:
+        raise ValueError("Corrupt blob header")
+    chunked = head[1:2] != tag
+    return Codec(CODEC_NAMES[tag[0]], head[2], chunked), HEADER_SIZE
+
+
+def iter_encoded(chunks: Iterable[bytes], codec: Codec) -> Iterator[bytes]:
+    """Потоковое сжатие, совпадающее по байтам с `encode`"""
+    yield codec.header
+    encoder = codec.encoder()
+    for chunk in chunks:
+        encoded = encoder.compress(chunk)
+        if encoded:
+            yield encoded
+    yield encoder.flush()
+
+
+def iter_decoded(
+    chunks: Iterable[bytes], max_length: int = None
+) -> Iterator[bytes]:
+    """Потоковая распаковка объекта любого кодека.
+
+    За один шаг распаковывается не больше `max_length` байт, поэтому
+    память не зависит от степени сжатия.
+    """
+    max_length = max_length or config.CHUNK_SIZE
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= HEADER_SIZE:
+            break
+    codec, offset = parse_header(head)
+    if codec.chunked:
+        raise ValueError("Chunked blob must be read from the object store")
+    rest = itertools.chain([head[offset:]], chunks)
+    if codec.name == "stored":
+        yield from filter(None, rest)
+        return
+    decoder = codec.decoder()
+    for chunk in rest:
+        yield from _drain(decoder, codec.name, chunk, max_length)
+    if codec.name == "zlib":
+        yield decoder.flush()
+    if not decoder.eof:
+        raise zlib.error("Incomplete compressed stream")
+
+
+def _drain(
+    decoder, name: str, data: bytes, max_length: int
+) -> Iterator[bytes]:
+    """Распаковка блока порциями до `max_length` байт"""
+    data = decoder.decompress(data, max_length)
+    while data:
+        yield data
+        if name == "zlib":
+            if not decoder.unconsumed_tail:
+                return
+            data = decoder.decompress(decoder.unconsumed_tail, max_length)
+        else:
+            if decoder.needs_input or decoder.eof:
+                return
+            data = decoder.decompress(b"", max_length)
+
+
+def encode(data: bytes, codec: Codec = LEGACY) -> bytes:
+    return b"".join(iter_encoded([data], codec))
+
+
+def decode(data: bytes) -> bytes:
+    return b"".join(iter_decoded([data], DECODE_STEP))
+
+
+class CompressionPolicy:
+    """Выбор кодека блоба по расширению, размеру и пробному сжатию.
+
+    Настраивается секциями `[compression]` и `[extensions]` файла
+    `.cvs/config`. Уже сжатые форматы хранятся как есть, файлы
+    от PROBE_MIN_SIZE байт сначала пробно сжимаются по первым
+    PROBE_SIZE байтам: если zlib уровня 1 почти не уменьшил их,
+    сжатие целиком тоже не окупится.
+    """
+
+    def __init__(
+        self,
+        default: Codec = LEGACY,
+        extensions: Dict[str, Codec] = None,
+        min_size: int = 0,
+        probe_ratio: float = PROBE_RATIO,
+        chunk_threshold: int = 0,
+    ):
+        self.default = default
+        self.extensions = {x: STORED for x in COMPRESSED_EXTENSIONS}
+        self.extensions.update(extensions or {})
+        self.min_size = min_size
+        self.probe_ratio = probe_ratio
+        self.chunk_threshold = chunk_threshold
+
+    @classmethod
+    def load(cls, location: Path) -> "CompressionPolicy":
+        parser = configparser.ConfigParser()
+        parser.read(location)
+        section = parser["compression"] if "compression" in parser else {}
+        extensions = {}
+        if "extensions" in parser:
+            extensions = {
+                name.lower().lstrip("."): Codec.parse(spec)
+                for name, spec in parser["extensions"].items()
+            }
+        return cls(
+            Codec.parse(section.get("codec", "zlib:6")),
+            extensions,
+            int(section.get("min_size", 0)),
+            float(section.get("probe_ratio", PROBE_RATIO)),
+            int(section.get("chunk_threshold", 0)),
+        )
+
+    def choose(self, path: str, size: int, sample: bytes) -> Codec:
+        """Кодек для файла размером `size` с началом `sample`.
+
+        Файлы от `chunk_threshold` байт (0 - никогда) делятся на чанки.
+        """
+        codec = self._choose_codec(path, size, sample)
+        if self.chunk_threshold and size >= self.chunk_threshold:
+            return codec._replace(chunked=True)
+        return codec
+
+    def _choose_codec(self, path: str, size: int, sample: bytes) -> Codec:
+        extension = os.path.splitext(path)[1].lower().lstrip(".")
+        if extension in self.extensions:
+            return self.extensions[extension]
+        if size < self.min_size:
+            return STORED
+        if size >= PROBE_MIN_SIZE and self.probe_ratio:
+            probe = zlib.compress(sample, 1)
+            if len(probe) >= len(sample) * self.probe_ratio:
+                return STORED
+        return self.default
+
+
+_policies: Dict[Tuple[str, Optional[tuple]], CompressionPolicy] = {}
+
+
+def policy() -> CompressionPolicy:
+    """Политика текущего репозитория, перечитывается при изменении файла"""
+    location = config.CONFIG_PATH
+    stat = location.stat() if location.exists() else None
+    key = (os.getcwd(), stat and (stat.st_mtime_ns, stat.st_size))
+    if key not in _policies:
+        _policies.clear()
+        _policies[key] = CompressionPolicy.load(location)
+    return _policies[key]
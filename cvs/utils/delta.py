@@ -0,0 +1,127 @@
+from typing import Optional, Tuple
+
+BLOCK_SIZE = 16
+COMPARE_STEP = 4096
+
+COPY = 0x01
+INSERT = 0x00
+
+
+def encode_varint(value: int) -> bytes:
+    result = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            result.append(byte | 0x80)
+        else:
+            result.append(byte)
+            return bytes(result)
+
+
+def decode_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def _match_length(base: bytes, base_pos: int, target: bytes, pos: int) -> int:
+    max_length = min(len(base) - base_pos, len(target) - pos)
+    length = 0
+    while length + COMPARE_STEP <= max_length:
+        base_start, target_start = base_pos + length, pos + length
+        base_end = base_start + COMPARE_STEP
+        target_end = target_start + COMPARE_STEP
+        if base[base_start:base_end] != target[target_start:target_end]:
+            break
+        length += COMPARE_STEP
+    while (
+        length < max_length and base[base_pos + length] == target[pos + length]
+    ):
+        length += 1
+    return length
+
+
+def _insert(result: bytearray, data: bytes) -> None:
+    if data:
+        result.append(INSERT)
+        result += encode_varint(len(data))
+        result += data
+
+
+def create_delta(
+    base: bytes, target: bytes, limit: int = None
+) -> Optional[bytes]:
+    """Построение дельты из команд копирования и вставки.
+
+    База индексируется блоками по BLOCK_SIZE байт, совпадения в цели
+    расширяются в обе стороны. Если дельта выходит больше `limit`,
+    построение прерывается и возвращается None.
+    """
+    limit = limit if limit is not None else len(target)
+    blocks = {}
+    for offset in range(0, len(base) - BLOCK_SIZE + 1, BLOCK_SIZE):
+        end = offset + BLOCK_SIZE
+        blocks.setdefault(base[offset:end], offset)
+
+    result = bytearray(encode_varint(len(base)) + encode_varint(len(target)))
+    insert_start = position = 0
+    last_block = len(target) - BLOCK_SIZE
+    while position <= last_block:
+        end = position + BLOCK_SIZE
+        base_pos = blocks.get(target[position:end])
+        if base_pos is None:
+            position += 1
+            if len(result) + position - insert_start > limit:
+                return None
+            continue
+        length = _match_length(base, base_pos, target, position)
+        while (
+            position > insert_start
+            and base_pos > 0
+            and base[base_pos - 1] == target[position - 1]
+        ):
+            position -= 1
+            base_pos -= 1
+            length += 1
+        _insert(result, target[insert_start:position])
+        result.append(COPY)
+        result += encode_varint(base_pos) + encode_varint(length)
+        position += length
+        insert_start = position
+        if len(result) > limit:
+            return None
+    _insert(result, target[insert_start:])
+    return bytes(result) if len(result) <= limit else None
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """Восстановление содержимого по базе и дельте"""
+    base_size, position = decode_varint(delta, 0)
+    target_size, position = decode_varint(delta, position)
+    if base_size != len(base):
+        raise ValueError("Delta base size mismatch")
+    result = bytearray()
+    while position < len(delta):
+        command = delta[position]
+        position += 1
+        if command == COPY:
+            offset, position = decode_varint(delta, position)
+            length, position = decode_varint(delta, position)
+            end = offset + length
+            result += base[offset:end]
+        elif command == INSERT:
+            length, position = decode_varint(delta, position)
+            end = position + length
+            result += delta[position:end]
+            position = end
+        else:
+            raise ValueError(f"Unknown delta command {command}")
+    if len(result) != target_size:
+        raise ValueError("Delta target size mismatch")
+    return bytes(result)
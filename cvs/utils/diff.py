@@ -0,0 +1,358 @@
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from cvs.utils import storage
+from cvs.utils.sparse import SparseMatcher
+
+BINARY_CHECK_SIZE = 8000
+CONTEXT_LINES = 3
+MAX_EDIT_COST = 1000
+
+Change = Tuple[str, Optional[str], Optional[str]]
+Opcode = Tuple[str, int, int, int, int]
+
+
+def diff_trees(
+    old_hash: Optional[str],
+    new_hash: Optional[str],
+    prefix: str = "",
+    sparse: SparseMatcher = None,
+    skipped: Dict[str, Optional[str]] = None,
+) -> Iterator[Change]:
+    """Изменённые файлы двух деревьев: (путь, старый хэш, новый хэш).
+
+    Поддеревья с равными хэшами пропускаются без чтения, хэш None
+    обозначает отсутствующий файл или пустое дерево. Изменённые
+    каталоги вне частичной рабочей копии не читаются, а попадают
+    в `skipped` с хэшем нового дерева.
+    """
+    if old_hash == new_hash:
+        return
+    old = storage.store.read_tree(old_hash) if old_hash else {}
+    new = storage.store.read_tree(new_hash) if new_hash else {}
+    for name in sorted(old.keys() | new.keys()):
+        old_type, old_obj = old.get(name, (None, None))
+        new_type, new_obj = new.get(name, (None, None))
+        if (old_type, old_obj) == (new_type, new_obj):
+            continue
+        path = os.path.join(prefix, name)
+        new_tree = new_obj if new_type == "tree" else None
+        if "tree" in (old_type, new_type):
+            if sparse is not None and not sparse.may_contain(path):
+                skipped[path] = new_tree
+            else:
+                yield from diff_trees(
+                    old_obj if old_type == "tree" else None,
+                    new_tree,
+                    path,
+                    sparse,
+                    skipped,
+                )
+        if old_type == "blob" or new_type == "blob":
+            yield (
+                path,
+                old_obj if old_type == "blob" else None,
+                new_obj if new_type == "blob" else None,
+            )
+
+
+def diff_tree_with_index(
+    tree_hash: Optional[str],
+    index_hashes: Dict[str, str],
+    tree_cache: Dict[str, str],
+    sparse_trees: Dict[str, str] = None,
+) -> Iterator[Change]:
+    """Изменения индекса относительно дерева коммита.
+
+    Каталоги, хэш которых в кэше деревьев индекса совпадает
+    с хэшем поддерева коммита, не читаются и не сравниваются.
+    Каталоги вне частичной рабочей копии сравниваются как деревья.
+    """
+    pruned, tree_files, sparse_changes = set(), {}, []
+    sparse_trees = sparse_trees or {}
+
+    def walk(current_hash: str, directory: str) -> None:
+        if directory in sparse_trees:
+            pruned.add(directory)
+            sparse_changes.extend(
+                diff_trees(current_hash, sparse_trees[directory], directory)
+            )
+            return
+        if tree_cache.get(directory) == current_hash:
+            pruned.add(directory)
+            return
+        for name, (obj_type, hashcode) in storage.store.read_tree(
+            current_hash
+        ).items():
+            path = os.path.join(directory, name)
+            if obj_type == "tree":
+                walk(hashcode, path)
+            else:
+                tree_files[path] = hashcode
+
+    if tree_hash:
+        walk(tree_hash, "")
+    if "" in pruned:
+        return
+    for directory in sparse_trees.keys() - pruned:
+        if _is_pruned(directory, pruned):
+            continue
+        sparse_changes.extend(
+            diff_trees(None, sparse_trees[directory], directory)
+        )
+    changes = sparse_changes
+    for path in index_hashes.keys() | tree_files.keys():
+        if _is_pruned(path, pruned):
+            continue
+        old, new = tree_files.get(path), index_hashes.get(path)
+        if old != new:
+            changes.append((path, old, new))
+    yield from sorted(changes)
+
+
+def _is_pruned(path: str, pruned: set) -> bool:
+    directory = os.path.dirname(path)
+    while directory:
+        if directory in pruned:
+            return True
+        directory = os.path.dirname(directory)
+    return False
+
+
+def is_binary(content: bytes) -> bool:
+    return b"\0" in content[:BINARY_CHECK_SIZE]
+
+
+def _middle_snake(a, b, a_lo, a_hi, b_lo, b_hi) -> Optional[tuple]:
+    """Средняя змейка кратчайшего пути правки (Майерс, 1986).
+
+    Поиск ведётся одновременно с начала и с конца, память линейна
+    по длине последовательностей. Возвращает отрезок диагонали
+    (x начала, y начала, x конца, y конца) в координатах `a` и `b`
+    или None, если путь длиннее MAX_EDIT_COST правок.
+    """
+    n, m = a_hi - a_lo, b_hi - b_lo
+    delta = n - m
+    is_odd = delta % 2 == 1
+    offset = n + m + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+    for d in range(min((n + m + 1) // 2, MAX_EDIT_COST) + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (
+                k != d and forward[offset + k - 1] < forward[offset + k + 1]
+            ):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            reverse_k = delta - k
+            if (
+                is_odd
+                and -(d - 1) <= reverse_k <= d - 1
+                and x + backward[offset + reverse_k] >= n
+            ):
+                return a_lo + x_start, b_lo + y_start, a_lo + x, b_lo + y
+        for k in range(-d, d + 1, 2):
+            if k == -d or (
+                k != d and backward[offset + k - 1] < backward[offset + k + 1]
+            ):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x_start, y_start = x, y
+            while x < n and y < m and a[a_hi - x - 1] == b[b_hi - y - 1]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            forward_k = delta - k
+            if (
+                not is_odd
+                and -d <= forward_k <= d
+                and x + forward[offset + forward_k] >= n
+            ):
+                return a_hi - x, b_hi - y, a_hi - x_start, b_hi - y_start
+    return None
+
+
+def matching_blocks(a: Sequence, b: Sequence) -> List[Tuple[int, int, int]]:
+    """Совпадающие отрезки (начало в `a`, начало в `b`, длина).
+
+    Элементы, которых нет в другой последовательности, не могут
+    совпасть и отбрасываются до поиска, что резко сокращает длину
+    пути правки при переписывании больших частей файла.
+    """
+    common = set(a) & set(b)
+    a_positions = [i for i, x in enumerate(a) if x in common]
+    b_positions = [j for j, x in enumerate(b) if x in common]
+    blocks = []
+    for a_start, b_start, length in _myers_blocks(
+        [a[i] for i in a_positions], [b[j] for j in b_positions]
+    ):
+        i, j = a_positions[a_start], b_positions[b_start]
+        last = length - 1
+        if (
+            a_positions[a_start + last] - i == last
+            and b_positions[b_start + last] - j == last
+        ):
+            # отрезок не разорван отброшенными элементами
+            if blocks and blocks[-1][0] + blocks[-1][2] == i:
+                if blocks[-1][1] + blocks[-1][2] == j:
+                    blocks[-1][2] += length
+                    continue
+            blocks.append([i, j, length])
+            continue
+        for offset in range(length):
+            i = a_positions[a_start + offset]
+            j = b_positions[b_start + offset]
+            if blocks and blocks[-1][0] + blocks[-1][2] == i:
+                if blocks[-1][1] + blocks[-1][2] == j:
+                    blocks[-1][2] += 1
+                    continue
+            blocks.append([i, j, 1])
+    return [tuple(block) for block in blocks]
+
+
+def _myers_blocks(a: Sequence, b: Sequence) -> List[Tuple[int, int, int]]:
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_lo, a_hi, b_lo, b_hi = stack.pop()
+        prefix = 0
+        while (
+            a_lo + prefix < a_hi
+            and b_lo + prefix < b_hi
+            and a[a_lo + prefix] == b[b_lo + prefix]
+        ):
+            prefix += 1
+        if prefix:
+            blocks.append((a_lo, b_lo, prefix))
+            a_lo += prefix
+            b_lo += prefix
+        suffix = 0
+        while (
+            a_hi - suffix > a_lo
+            and b_hi - suffix > b_lo
+            and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]
+        ):
+            suffix += 1
+        if suffix:
+            blocks.append((a_hi - suffix, b_hi - suffix, suffix))
+            a_hi -= suffix
+            b_hi -= suffix
+        if a_lo == a_hi or b_lo == b_hi:
+            continue
+        snake = _middle_snake(a, b, a_lo, a_hi, b_lo, b_hi)
+        if snake is None:
+            continue
+        x_start, y_start, x_end, y_end = snake
+        if x_end > x_start:
+            blocks.append((x_start, y_start, x_end - x_start))
+        stack.append((a_lo, x_start, b_lo, y_start))
+        stack.append((x_end, a_hi, y_end, b_hi))
+    blocks.sort()
+    return blocks
+
+
+def opcodes(a: Sequence, b: Sequence) -> List[Opcode]:
+    """Операции правки в формате `difflib.SequenceMatcher.get_opcodes`"""
+    result, i, j = [], 0, 0
+    for a_start, b_start, length in matching_blocks(a, b) + [
+        (len(a), len(b), 0)
+    ]:
+        if i < a_start and j < b_start:
+            result.append(("replace", i, a_start, j, b_start))
+        elif i < a_start:
+            result.append(("delete", i, a_start, j, b_start))
+        elif j < b_start:
+            result.append(("insert", i, a_start, j, b_start))
+        if length:
+            a_end, b_end = a_start + length, b_start + length
+            if result and result[-1][0] == "equal":
+                _, i1, _, j1, _ = result.pop()
+                result.append(("equal", i1, a_end, j1, b_end))
+            else:
+                result.append(("equal", a_start, a_end, b_start, b_end))
+        i, j = a_start + length, b_start + length
+    return result
+
+
+def _hunks(codes: List[Opcode], context: int) -> Iterator[List[Opcode]]:
+    """Группировка операций в блоки с `context` строками контекста"""
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag != "equal":
+            group.append((tag, i1, i2, j1, j2))
+            continue
+        if not group:
+            start = max(i1, i2 - context)
+            group.append((tag, start, i2, j1 + start - i1, j2))
+        elif i2 - i1 > 2 * context:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            yield group
+            start = i2 - context
+            group = [(tag, start, i2, j1 + start - i1, j2)]
+        else:
+            group.append((tag, i1, i2, j1, j2))
+    if any(tag != "equal" for tag, *_ in group):
+        if group[-1][0] == "equal":
+            tag, i1, i2, j1, _ = group.pop()
+            length = min(i2 - i1, context)
+            group.append((tag, i1, i1 + length, j1, j1 + length))
+        yield group
+
+
+def _range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def _decode(line: bytes) -> str:
+    return line.decode("utf-8", errors="replace").rstrip("\r\n")
+
+
+def unified_diff(
+    path: str,
+    old: Optional[bytes],
+    new: Optional[bytes],
+    context: int = CONTEXT_LINES,
+) -> Iterator[str]:
+    """Строки унифицированного diff для одного файла.
+
+    Содержимое None обозначает отсутствующий файл. Строки сравниваются
+    по целочисленным идентификаторам, для двоичных файлов выводится
+    только сообщение о различии.
+    """
+    old_name = f"a/{path}" if old is not None else "/dev/null"
+    new_name = f"b/{path}" if new is not None else "/dev/null"
+    yield f"diff --cvs a/{path} b/{path}"
+    if is_binary(old or b"") or is_binary(new or b""):
+        yield f"Двоичные файлы {old_name} и {new_name} различаются"
+        return
+    old_lines = (old or b"").splitlines(keepends=True)
+    new_lines = (new or b"").splitlines(keepends=True)
+    ids = {}
+    a = [ids.setdefault(line, len(ids)) for line in old_lines]
+    b = [ids.setdefault(line, len(ids)) for line in new_lines]
+    yield f"--- {old_name}"
+    yield f"+++ {new_name}"
+    for group in _hunks(opcodes(a, b), context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        yield f"@@ -{_range(i1, i2 - i1)} +{_range(j1, j2 - j1)} @@"
+        for tag, a_start, a_end, b_start, b_end in group:
+            if tag == "equal":
+                for line in old_lines[a_start:a_end]:
+                    yield f" {_decode(line)}"
+                continue
+            for line in old_lines[a_start:a_end]:
+                yield f"-{_decode(line)}"
+            for line in new_lines[b_start:b_end]:
+                yield f"+{_decode(line)}"
@@ -1,53 +1,100 @@
 import os
-import zlib
 
-from cvs import config
 from pathlib import Path
-from anytree import search
-from typing import Iterable
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
 from cvs.models.blob import Blob
-from cvs.models.commit import Commit
-from cvs.models.tree import TreeNode
+from cvs.utils import streams
+
+if TYPE_CHECKING:
+    from cvs.models.commit import Commit
+    from cvs.models.tree import TreeNode
 
 
 class TreeFactory:
     @classmethod
-    def create_new_tree(cls, blobs: Iterable[Blob]) -> TreeNode:
-        root = TreeNode(".")
+    def create_new_tree(
+        cls,
+        blobs: Iterable[Blob],
+        tree_cache: Dict[str, str] = None,
+        sparse_trees: Dict[str, str] = None,
+        cached_dirs: Iterable[str] = (),
+    ) -> "TreeNode":
+        """Построение дерева по блобам индекса.
+
+        Каталоги, хэш которых известен из `tree_cache` (путь -> хэш),
+        не разворачиваются: узел ссылается на уже записанное дерево,
+        а файлы внутри каталога пропускаются. Закэшированные каталоги
+        `cached_dirs`, файлы которых не переданы, добавляются такими же
+        узлами. Каталоги вне частичной рабочей копии (`sparse_trees`)
+        подставляются деревьями как есть.
+        Модуль деревьев с anytree импортируется только здесь.
+        """
+        from cvs.models.tree import TreeNode
+
+        tree_cache = tree_cache or {}
+        root = TreeNode(".", content_hash=tree_cache.get(""))
+        if root.is_stored:
+            return root
+        for path in cached_dirs:
+            cls._get_directory(root, path.split(os.sep), tree_cache)
         for blob in blobs:
-            file_content = blob.compressed_data
-            curr_node = root
-            for file in blob.filename.split(os.sep):
-                curr_node.update_hash(file_content)
-                child = search.find(curr_node, lambda node: node.name == file)
-                if child:
-                    curr_node = child
-                else:
-                    curr_node = TreeNode(file, parent=curr_node)
-            curr_node.update_hash(file_content)
+            *directories, filename = blob.filename.split(os.sep)
+            parent = cls._get_directory(root, directories, tree_cache)
+            if parent is not None:
+                TreeNode(filename, parent, "blob", blob.content_hash)
+        for path, hashcode in (sparse_trees or {}).items():
+            *directories, name = path.split(os.sep)
+            parent = cls._get_directory(root, directories, tree_cache)
+            if parent is not None and name not in parent.entries:
+                TreeNode(name, parent, "tree", hashcode)
         return root
 
+    @staticmethod
+    def _get_directory(
+        root: "TreeNode", directories: List[str], tree_cache: Dict[str, str]
+    ) -> Optional["TreeNode"]:
+        """Узел каталога или None, если каталог внутри готового дерева"""
+        from cvs.models.tree import TreeNode
+
+        curr_node, curr_path = root, ""
+        for directory in directories:
+            curr_path = os.path.join(curr_path, directory)
+            child = curr_node.entries.get(directory)
+            if child is None:
+                child = TreeNode(
+                    directory,
+                    parent=curr_node,
+                    content_hash=tree_cache.get(curr_path),
+                )
+            curr_node = child
+            if curr_node.is_stored:
+                return None
+        return curr_node
+
 
 class BlobFactory:
     @classmethod
     def get_existing_blob(cls, file: str, hashcode: str) -> Blob:
-        path_to_blob = config.BLOBS_PATH / hashcode
-        compressed_data = path_to_blob.read_bytes()
-        return Blob(file, compressed_data)
+        return Blob(file, hashcode=hashcode)
 
     @classmethod
-    def create_new_blob(cls, file: str) -> Blob:
-        file_content = Path(file).read_bytes()
-        compressed_data = zlib.compress(file_content)
-        return Blob(file, compressed_data)
+    def create_new_blob(cls, file: str, destination: str = None) -> Blob:
+        """Потоковое создание блоба без загрузки файла в память.
+
+        Если указано хранилище, объект сразу записывается в него.
+        """
+        if destination is None:
+            return Blob(file, hashcode=streams.hash_file(Path(file)))
+        hashcode = streams.store_file(Path(file), Path(destination))
+        return Blob(file, hashcode=hashcode)
 
 
 class CommitFactory:
     @classmethod
-    def create_new_commit(cls, tree: TreeNode, message: str) -> Commit:
-        current_branch = config.HEAD_PATH.read_text()
-        parent_path = config.REFS_PATH / current_branch
-        if not parent_path.exists():
-            parent = Commit.parse_file_content(current_branch)[1]
-            return Commit(tree, message, parent)
-        return Commit(tree, message, parent_path.read_text())
+    def create_new_commit(
+        cls, tree: "TreeNode", message: str, parent: str
+    ) -> "Commit":
+        """Коммит с уже разрешённым родителем - коммитом HEAD"""
+        from cvs.models.commit import Commit
+
+        return Commit(tree, message, parent)
@@ -0,0 +1,286 @@
+import hashlib
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from cvs.utils import chunking, compression, storage, streams
+
+ObjectKey = Tuple[str, str]
+Task = Tuple[str, str, Optional[Path]]
+
+PARALLEL_MIN_OBJECTS = 64
+MTIME_SLACK_NS = 10**9
+READ_ERRORS = (OSError, KeyError, *compression.DECODE_ERRORS)
+
+
+class VerifyResult(NamedTuple):
+    kind: str
+    hashcode: str
+    error: Optional[str]
+    references: List[ObjectKey]
+    legacy: bool = False
+
+
+class FsckResult(NamedTuple):
+    checked: int
+    corrupt: List[Tuple[str, str, str]]
+    missing: List[Tuple[str, str, str]]
+    dangling: List[ObjectKey]
+    legacy: List[str]
+
+
+class FsckState(NamedTuple):
+    """Время начала последней успешной проверки и проверенные пакеты"""
+
+    checked_at: int
+    packs: Set[str]
+
+    @classmethod
+    def load(cls, location: Path) -> "FsckState":
+        if not location.exists():
+            return cls(0, set())
+        lines = location.read_text().splitlines()
+        return cls(int(lines[0]), set(lines[1:]))
+
+    def save(self, location: Path) -> None:
+        location.write_text(
+            "\n".join([str(self.checked_at), *sorted(self.packs)])
+        )
+
+
+def verify_pack(index_path: Path) -> Optional[str]:
+    """Контрольная сумма файла пакета и её копия в индексе"""
+    pack_path = index_path.with_suffix(".pack")
+    try:
+        hash_obj = hashlib.sha1()
+        size = pack_path.stat().st_size - 20
+        with open(pack_path, "rb") as file:
+            while size > 0:
+                chunk = file.read(min(size, 1 << 20))
+                if not chunk:
+                    break
+                hash_obj.update(chunk)
+                size -= len(chunk)
+            pack_digest = file.read(20)
+        with open(index_path, "rb") as file:
+            file.seek(-20, os.SEEK_END)
+            index_digest = file.read(20)
+    except OSError as e:
+        return str(e)
+    if not hash_obj.digest() == pack_digest == index_digest:
+        return "контрольная сумма пакета не совпадает"
+    if index_path.stem != f"pack-{pack_digest.hex()}":
+        return "имя пакета не совпадает с контрольной суммой"
+    return None
+
+
+def verify_object(task: Task) -> VerifyResult:
+    """Пересчёт хэша объекта и извлечение ссылок на другие объекты.
+
+    Свободный файл задаётся путём и читается напрямую, упакованный
+    объект читается из хранилища с разворачиванием дельт.
+    """
+    kind, hashcode, path = task
+    references = []
+    try:
+        if kind == "blob":
+            chunks = (
+                streams.iter_chunks(path)
+                if path is not None
+                else [storage.store.read(kind, hashcode)]
+            )
+            actual, references = _verify_blob(chunks)
+        else:
+            content = (
+                path.read_bytes()
+                if path is not None
+                else storage.store.read(kind, hashcode)
+            )
+            actual = hashlib.sha1(content).hexdigest()
+    except READ_ERRORS as e:
+        return VerifyResult(kind, hashcode, f"ошибка чтения: {e}", [])
+    if actual != hashcode:
+        if kind == "tree" and _is_legacy_tree(content, hashcode):
+            references = _references(kind, content)
+            return VerifyResult(kind, hashcode, None, references, True)
+        return VerifyResult(kind, hashcode, "хэш не совпадает", [])
+    if kind == "blob":
+        return VerifyResult(kind, hashcode, None, references)
+    try:
+        references = _references(kind, content)
+    except (UnicodeDecodeError, ValueError, IndexError):
+        return VerifyResult(kind, hashcode, "ошибка разбора", [])
+    return VerifyResult(kind, hashcode, None, references)
+
+
+def legacy_tree_hash(content: bytes) -> str:
+    """Хэш дерева в схеме первых версий.
+
+    Тогда хэш дерева был SHA-1 сжатых данных всех блобов поддерева
+    в порядке строк индекса `путь хэш`. Пересчёт читает все блобы
+    поддерева, поэтому выполняется только при несовпадении хэша.
+    """
+    lines = sorted(f"{path} {x}" for path, x in _legacy_blobs(content, ""))
+    hash_obj = hashlib.sha1()
+    for line in lines:
+        hash_obj.update(storage.store.read("blob", line.rsplit(" ", 1)[1]))
+    return hash_obj.hexdigest()
+
+
+def _legacy_blobs(content: bytes, directory: str) -> Iterator[ObjectKey]:
+    for name, (kind, hashcode) in storage.parse_tree(content).items():
+        path = os.path.join(directory, name)
+        if kind == "blob":
+            yield path, hashcode
+        else:
+            subtree = storage.store.read("tree", hashcode)
+            yield from _legacy_blobs(subtree, path)
+
+
+def _is_legacy_tree(content: bytes, hashcode: str) -> bool:
+    try:
+        return legacy_tree_hash(content) == hashcode
+    except READ_ERRORS:
+        return False
+
+
+def _verify_blob(chunks: Iterable[bytes]) -> Tuple[str, List[ObjectKey]]:
+    """Хэш блоба с проверкой распаковки и ссылки списка чанков.
+
+    Обычный блоб распаковывается потоком, память не растёт.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    end = compression.HEADER_SIZE
+    codec = compression.parse_header(first[:end])[0]
+    if codec.chunked:
+        content = first + b"".join(chunks)
+        references = [("blob", x) for x, _ in chunking.parse_manifest(content)]
+        return hashlib.sha1(content).hexdigest(), references
+    hash_obj = hashlib.sha1()
+
+    def hashed() -> Iterator[bytes]:
+        for chunk in itertools.chain([first], chunks):
+            hash_obj.update(chunk)
+            yield chunk
+
+    for _ in compression.iter_decoded(hashed()):
+        pass
+    return hash_obj.hexdigest(), []
+
+
+def _references(kind: str, content: Optional[bytes]) -> List[ObjectKey]:
+    if kind == "tree":
+        return list(storage.parse_tree(content).values())
+    if kind == "commit":
+        lines = content.decode("utf-8").split("\n")
+        tree = lines[0].split(" ")[1]
+        parent = lines[1].split(" ")[1]
+        if parent == "root":
+            return [("tree", tree)]
+        return [("tree", tree), ("commit", parent)]
+    return []
+
+
+def collect_objects(state: FsckState) -> tuple:
+    """Все объекты хранилища, задачи проверки и пакеты, новые с `state`.
+
+    Время изменения файлов файловая система округляет по своим часам,
+    поэтому свободные объекты берутся с запасом в MTIME_SLACK_NS.
+    """
+    existing, tasks, new_packs = set(), [], []
+    since = state.checked_at - MTIME_SLACK_NS
+    for kind, hashcode, path in storage.store.iter_loose():
+        existing.add((kind, hashcode))
+        if path.stat().st_mtime_ns >= since:
+            tasks.append((kind, hashcode, path))
+    for pack in storage.store.packs:
+        is_new = pack.index_path.stem not in state.packs
+        if is_new:
+            new_packs.append(pack.index_path)
+        for key in pack:
+            existing.add(key)
+            if is_new:
+                tasks.append((*key, None))
+    return existing, tasks, new_packs
+
+
+def check(
+    roots: Dict[ObjectKey, str],
+    state: FsckState = None,
+    jobs: int = 1,
+) -> FsckResult:
+    """Проверка целостности объектов, добавленных после `state`.
+
+    Хэши пересчитываются в пуле процессов. Ссылки проверенных
+    объектов и корней `roots` (ветки, индекс) должны указывать
+    на существующие объекты. Висячими считаются проверенные
+    объекты, на которые не ссылается ни один проверенный объект
+    и ни один корень. Деревья старого формата не считаются
+    повреждёнными, их ссылки проверяются как у остальных.
+    """
+    state = state or FsckState(0, set())
+    existing, tasks, new_packs = collect_objects(state)
+    corrupt, missing, legacy = [], [], []
+    if jobs > 1 and len(tasks) >= PARALLEL_MIN_OBJECTS:
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pack_errors = list(executor.map(verify_pack, new_packs))
+            results = list(
+                executor.map(verify_object, tasks, chunksize=chunksize)
+            )
+    else:
+        pack_errors = [verify_pack(x) for x in new_packs]
+        results = [verify_object(x) for x in tasks]
+
+    for index_path, error in zip(new_packs, pack_errors):
+        if error:
+            corrupt.append(("pack", index_path.stem, error))
+    referenced = set(roots)
+    for result in results:
+        if result.error:
+            corrupt.append((result.kind, result.hashcode, result.error))
+            continue
+        if result.legacy:
+            legacy.append(result.hashcode)
+        for key in result.references:
+            referenced.add(key)
+            if key not in existing:
+                source = f"{result.kind} {result.hashcode}"
+                missing.append((*key, source))
+    for key, source in roots.items():
+        if key not in existing:
+            missing.append((*key, source))
+    checked = {(x.kind, x.hashcode) for x in results}
+    return FsckResult(
+        len(results),
+        sorted(corrupt),
+        sorted(set(missing)),
+        sorted(checked - referenced),
+        sorted(legacy),
+    )
+
+
+def roots_of(
+    refs: Dict[str, str], head: str, blobs: Iterable[str], trees: Iterable[str]
+) -> Dict[ObjectKey, str]:
+    """Корни проверки: коммиты веток и HEAD, блобы и деревья индекса"""
+    roots = {("blob", x): "index" for x in blobs}
+    roots.update({("tree", x): "index" for x in trees})
+    for name, commit in refs.items():
+        if commit and commit != "root":
+            roots[("commit", commit)] = f"refs/{name}"
+    if head != "root":
+        roots.setdefault(("commit", head), "HEAD")
+    return roots
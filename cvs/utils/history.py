@@ -0,0 +1,146 @@
+import itertools
+import os
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+
+from cvs.utils import diff, storage
+
+if TYPE_CHECKING:
+    from cvs.models.commit_graph import CommitRecord
+
+TreeObject = Tuple[str, str]
+
+
+def split_path(path: str) -> List[str]:
+    """Имена на пути от корня дерева, `.` - само корневое дерево"""
+    return [x for x in os.path.normpath(path).split(os.sep) if x != "."]
+
+
+def _child(obj: Optional[TreeObject], name: str) -> Optional[TreeObject]:
+    if obj is None or obj[0] != "tree":
+        return None
+    return storage.store.read_tree(obj[1]).get(name)
+
+
+def path_object(tree: Optional[str], parts: List[str]) -> Optional[TreeObject]:
+    """Тип и хэш объекта по пути в дереве или None"""
+    obj = ("tree", tree) if tree else None
+    for name in parts:
+        obj = _child(obj, name)
+    return obj
+
+
+def is_path_changed(
+    tree: str, parent_tree: Optional[str], parts: List[str]
+) -> bool:
+    """Изменился ли объект по пути относительно дерева родителя.
+
+    Деревья читаются только вдоль пути и только пока их хэши
+    различаются: совпавшее поддерево означает, что путь не менялся.
+    """
+    new = ("tree", tree)
+    old = ("tree", parent_tree) if parent_tree else None
+    for name in parts:
+        if new == old:
+            return False
+        new, old = _child(new, name), _child(old, name)
+    return new != old
+
+
+def _with_parent_trees(
+    records: Iterable["CommitRecord"],
+) -> Iterator[Tuple["CommitRecord", Optional[str]]]:
+    """Коммиты истории вместе с деревом родителя (None у корневого)"""
+    records = iter(records)
+    record = next(records, None)
+    while record is not None:
+        parent = next(records, None)
+        yield record, parent.tree if parent else None
+        record = parent
+
+
+def iter_path_history(
+    records: Iterable["CommitRecord"], paths: Iterable[str]
+) -> Iterator["CommitRecord"]:
+    """Коммиты истории, изменившие хотя бы один из путей"""
+    paths = [split_path(x) for x in paths]
+    for record, parent_tree in _with_parent_trees(records):
+        if any(is_path_changed(record.tree, parent_tree, x) for x in paths):
+            yield record
+
+
+def _read_lines(obj: Optional[TreeObject]) -> List[bytes]:
+    if obj is None or obj[0] != "blob":
+        return []
+    return storage.store.read_blob(obj[1]).splitlines(keepends=True)
+
+
+def _common_affixes(a: List[int], b: List[int]) -> Tuple[int, int]:
+    """Длины общего начала и общего конца двух версий"""
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _line_blocks(a: List[int], b: List[int]) -> List[Tuple[int, int, int]]:
+    """Совпадающие отрезки версий, общие начало и конец - без поиска"""
+    prefix, suffix = _common_affixes(a, b)
+    a_end, b_end = len(a) - suffix, len(b) - suffix
+    blocks = [(0, 0, prefix)] if prefix else []
+    for a_start, b_start, length in diff.matching_blocks(
+        a[prefix:a_end], b[prefix:b_end]
+    ):
+        blocks.append((a_start + prefix, b_start + prefix, length))
+    if suffix:
+        blocks.append((a_end, b_end, suffix))
+    return blocks
+
+
+def blame(
+    records: Iterable["CommitRecord"], path: str
+) -> List[Tuple["CommitRecord", bytes]]:
+    """Коммит, последним изменивший каждую строку файла первого коммита.
+
+    Сравниваются только соседние версии файла: строки, не совпавшие
+    с версией родителя, приписываются коммиту, остальные переходят
+    к родительской версии с новыми номерами. Разбитые на строки
+    версии и идентификаторы строк переиспользуются между шагами,
+    обход останавливается, когда неприписанных строк не осталось.
+    """
+    parts = split_path(path)
+    history = _with_parent_trees(records)
+    first = next(history, None)
+    if first is None:
+        return []
+    lines = _read_lines(path_object(first[0].tree, parts))
+    owners: List[Optional["CommitRecord"]] = [None] * len(lines)
+    ids, counter = {}, itertools.count()
+    current = list(map(ids.setdefault, lines, counter))
+    # pending[i] - номер строки итогового файла для строки i версии или -1
+    pending = list(range(len(lines)))
+    remaining = len(lines)
+    for record, parent_tree in itertools.chain([first], history):
+        if not is_path_changed(record.tree, parent_tree, parts):
+            continue
+        parent_lines = _read_lines(path_object(parent_tree, parts))
+        parent = list(map(ids.setdefault, parent_lines, counter))
+        next_pending = [-1] * len(parent)
+        matched_end = 0
+        for a_start, b_start, length in [
+            *_line_blocks(parent, current),
+            (len(parent), len(current), 0),
+        ]:
+            for final in pending[matched_end:b_start]:
+                if final >= 0:
+                    owners[final] = record
+                    remaining -= 1
+            a_end, matched_end = a_start + length, b_start + length
+            next_pending[a_start:a_end] = pending[b_start:matched_end]
+        pending, current = next_pending, parent
+        if not remaining:
+            break
+    return list(zip(owners, lines))
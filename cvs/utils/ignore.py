@@ -0,0 +1,79 @@
+import fnmatch
+import os
+import re
+from typing import Iterable
+
+MAGIC_CHARS = re.compile(r"[*?[]")
+
+
+class IgnoreMatcher:
+    """Скомпилированный набор масок игнорирования.
+
+    Маски вида `<каталог>/*` без спецсимволов в имени каталога
+    складываются в префиксное дерево по компонентам пути, остальные
+    объединяются в одно регулярное выражение с семантикой `fnmatch`.
+    Для обхода рабочей копии отдельно собирается выражение для
+    каталогов, все файлы внутри которых заведомо игнорируются.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._prefixes = {}
+        self._literals = set()
+        file_patterns, dir_patterns = [], []
+        for pattern in patterns:
+            if not pattern:
+                continue
+            if not MAGIC_CHARS.search(pattern):
+                self._literals.add(os.path.normcase(pattern))
+                continue
+            is_dir_pattern = pattern.endswith("/*")
+            if is_dir_pattern and not MAGIC_CHARS.search(pattern[:-2]):
+                self._add_prefix(pattern[:-2])
+                continue
+            file_patterns.append(fnmatch.translate(os.path.normcase(pattern)))
+            if is_dir_pattern:
+                directory = os.path.normcase(pattern[:-2])
+                dir_patterns.append(fnmatch.translate(directory))
+        self._file_regex = self._compile(file_patterns)
+        self._dir_regex = self._compile(dir_patterns)
+
+    @staticmethod
+    def _compile(patterns: list):
+        if not patterns:
+            return None
+        return re.compile("|".join(patterns)).match
+
+    def _add_prefix(self, directory: str) -> None:
+        node = self._prefixes
+        directory = os.path.normcase(directory).replace(os.sep, "/")
+        for component in directory.split("/"):
+            node = node.setdefault(component, {})
+        node[None] = True
+
+    def _has_ignored_prefix(self, path: str, include_self: bool) -> bool:
+        node = self._prefixes
+        components = path.split("/")
+        if not include_self:
+            components.pop()
+        for component in components:
+            node = node.get(component)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+    def is_ignored(self, path: str) -> bool:
+        path = os.path.normcase(path)
+        if path in self._literals:
+            return True
+        if self._has_ignored_prefix(path.replace(os.sep, "/"), False):
+            return True
+        return bool(self._file_regex and self._file_regex(path))
+
+    def is_dir_ignored(self, path: str) -> bool:
+        """Все файлы внутри каталога игнорируются, обходить его не нужно"""
+        path = os.path.normcase(path)
+        if self._has_ignored_prefix(path.replace(os.sep, "/"), True):
+            return True
+        return bool(self._dir_regex and self._dir_regex(path))
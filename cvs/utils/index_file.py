@@ -0,0 +1,149 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"CVIX"
+VERSION = 1
+
+HEADER = struct.Struct(">4sII")
+ENTRY = struct.Struct(">20sQqQqIII")
+EXTENSION = struct.Struct(">4sI")
+TRAILER_SIZE = 20
+
+RawEntry = Tuple[str, str, Tuple[int, int, int, int], int]
+
+
+class IndexFile:
+    """Двоичный файл индекса.
+
+    Заголовок, отсортированные по пути записи фиксированной ширины
+    (хэш, size, mtime_ns, inode, ctime_ns, флаги, смещение и длина пути),
+    таблица путей, расширения и SHA-1 всего предшествующего содержимого.
+    Файл отображается в память или читается из уже прочитанного
+    содержимого `data`, запись ищется бинарным поиском по пути.
+    """
+
+    def __init__(self, location: Path, data: bytes = None):
+        self._file = None
+        if data is None:
+            self._file = open(location, "rb")
+            size = os.fstat(self._file.fileno()).st_size
+        else:
+            size = len(data)
+        if size < HEADER.size + TRAILER_SIZE:
+            if self._file is not None:
+                self._file.close()
+            raise ValueError(f"Truncated index file {location}")
+        if data is None:
+            data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = data
+        magic, version, self.count = HEADER.unpack_from(self._data)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported index format in {location}")
+        self._paths_start = HEADER.size + self.count * ENTRY.size
+
+    @staticmethod
+    def is_binary(location: Path) -> bool:
+        with open(location, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+
+    def verify(self) -> bool:
+        end = len(self._data) - TRAILER_SIZE
+        checksum = hashlib.sha1(self._data[:end]).digest()
+        return checksum == self._data[end:]
+
+    def _path(self, offset: int, length: int) -> bytes:
+        start = self._paths_start + offset
+        end = start + length
+        return self._data[start:end]
+
+    def _raw_entry(self, position: int) -> tuple:
+        offset = HEADER.size + position * ENTRY.size
+        return ENTRY.unpack_from(self._data, offset)
+
+    def entry(self, position: int) -> RawEntry:
+        raw_hash, *stat, flags, offset, length = self._raw_entry(position)
+        path = os.fsdecode(self._path(offset, length))
+        return path, raw_hash.hex(), tuple(stat), flags
+
+    def __iter__(self) -> Iterator[RawEntry]:
+        for position in range(self.count):
+            yield self.entry(position)
+
+    def find(self, path: str) -> Optional[RawEntry]:
+        """Бинарный поиск записи по пути"""
+        key = os.fsencode(path)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            *_, offset, length = self._raw_entry(middle)
+            current = self._path(offset, length)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self.entry(middle)
+        return None
+
+    @property
+    def extensions(self) -> Dict[bytes, bytes]:
+        result = {}
+        if self.count:
+            *_, offset, length = self._raw_entry(self.count - 1)
+            position = self._paths_start + offset + length
+        else:
+            position = self._paths_start
+        end = len(self._data) - TRAILER_SIZE
+        while position < end:
+            signature, length = EXTENSION.unpack_from(self._data, position)
+            position += EXTENSION.size
+            data_end = position + length
+            result[signature] = self._data[position:data_end]
+            position = data_end
+        return result
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._data.close()
+            self._file.close()
+
+
+def write_index(
+    location: Path,
+    entries: List[RawEntry],
+    extensions: Dict[bytes, bytes] = None,
+) -> None:
+    """Запись индекса во временный файл с переименованием"""
+    entries = sorted(entries, key=lambda x: os.fsencode(x[0]))
+    header = HEADER.pack(MAGIC, VERSION, len(entries))
+    records, paths = [], bytearray()
+    for path, hashcode, stat, flags in entries:
+        encoded = os.fsencode(path)
+        records.append(
+            ENTRY.pack(
+                bytes.fromhex(hashcode),
+                *stat,
+                flags,
+                len(paths),
+                len(encoded),
+            )
+        )
+        paths += encoded
+    content = bytearray(header)
+    for record in records:
+        content += record
+    content += paths
+    for signature, data in sorted((extensions or {}).items()):
+        content += EXTENSION.pack(signature, len(data)) + data
+    content += hashlib.sha1(content).digest()
+
+    fd, temp_name = tempfile.mkstemp(dir=Path(location).parent, prefix="tmp_")
+    with os.fdopen(fd, "wb") as file:
+        file.write(content)
+    os.replace(temp_name, location)
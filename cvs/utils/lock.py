@@ -0,0 +1,64 @@
+import os
+import time
+from pathlib import Path
+
+from cvs import config, errors
+
+LOCK_SUFFIX = ".lock"
+RETRY_DELAY = 0.005
+MAX_RETRY_DELAY = 0.1
+
+
+class LockFile:
+    """Изменение файла через `<имя>.lock` с атомарной заменой.
+
+    Файл блокировки создаётся эксклюзивно, поэтому файл в каждый
+    момент меняет только один процесс. Занятая блокировка ожидается
+    не дольше `timeout` секунд (по умолчанию `config.LOCK_TIMEOUT`).
+    Новое содержимое пишется в файл блокировки, `commit` переименовывает
+    его поверх целевого, без `commit` блокировка при выходе удаляется.
+    """
+
+    def __init__(self, target: Path, timeout: float = None):
+        self.target = Path(target)
+        self.path = self.target.with_name(self.target.name + LOCK_SUFFIX)
+        self.timeout = config.LOCK_TIMEOUT if timeout is None else timeout
+        self._file = None
+
+    def acquire(self) -> None:
+        flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY
+        deadline = time.monotonic() + self.timeout
+        delay = RETRY_DELAY
+        while True:
+            try:
+                fd = os.open(self.path, flags, 0o644)
+                break
+            except FileExistsError:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise errors.LockedError(str(self.target))
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def commit(self) -> None:
+        """Замена целевого файла записанным содержимым"""
+        self._file.close()
+        os.replace(self.path, self.target)
+        self._file = None
+
+    def rollback(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            os.remove(self.path)
+
+    def __enter__(self) -> "LockFile":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.rollback()
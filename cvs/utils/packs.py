@@ -0,0 +1,263 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import AbstractSet, Iterable, Iterator, Optional, Tuple
+
+from cvs.utils import compression, delta
+from cvs.utils.cache import LRUCache
+
+PACK_MAGIC = b"CVSP"
+INDEX_MAGIC = b"CVPI"
+VERSION = 2
+
+PACK_HEADER = struct.Struct(">4sI")
+INDEX_HEADER = struct.Struct(">4sII")
+FANOUT = struct.Struct(">256I")
+ENTRIES = {1: struct.Struct(">20sBQQ"), 2: struct.Struct(">20sBBQQ")}
+KEY_SIZE = 21
+
+KINDS = {"blob": ord("b"), "tree": ord("t"), "commit": ord("c")}
+KIND_NAMES = {value: key for key, value in KINDS.items()}
+
+FULL = 0
+DELTA = 1
+
+DELTA_WINDOW = 10
+MAX_DELTA_DEPTH = 10
+DELTA_MAX_SIZE = 1 << 24
+BASE_CACHE_SIZE = 1 << 24
+
+
+def make_key(kind: str, hashcode: str) -> bytes:
+    return bytes.fromhex(hashcode) + bytes([KINDS[kind]])
+
+
+class Pack:
+    """Пакет объектов: файл данных `.pack` и отсортированный индекс `.idx`.
+
+    Индекс отображается в память целиком, поиск объекта - бинарный
+    по ключу (хэш, тип) с предварительным сужением по таблице fanout.
+    Блоб может храниться дельтой относительно другого блоба пакета,
+    восстановленные базы кэшируются в пределах BASE_CACHE_SIZE байт.
+    """
+
+    def __init__(self, index_path: Path):
+        self.index_path = index_path
+        self.data_path = index_path.with_suffix(".pack")
+        with open(index_path, "rb") as file:
+            self._index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = INDEX_HEADER.unpack_from(self._index)
+        if magic != INDEX_MAGIC or version not in ENTRIES:
+            raise ValueError(f"Unsupported pack index {index_path}")
+        self._entry_struct = ENTRIES[version]
+        self._fanout = FANOUT.unpack_from(self._index, INDEX_HEADER.size)
+        self._entries_start = INDEX_HEADER.size + FANOUT.size
+        self._data = None
+        self._data_lock = threading.Lock()
+        self._base_cache = LRUCache(BASE_CACHE_SIZE)
+
+    @property
+    def data(self) -> mmap.mmap:
+        if self._data is None:
+            with self._data_lock:
+                if self._data is None:
+                    with open(self.data_path, "rb") as file:
+                        self._data = mmap.mmap(
+                            file.fileno(), 0, access=mmap.ACCESS_READ
+                        )
+        return self._data
+
+    def _entry(self, position: int) -> tuple:
+        """Хэш, тип, способ хранения, смещение и длина записи"""
+        offset = self._entries_start + position * self._entry_struct.size
+        entry = self._entry_struct.unpack_from(self._index, offset)
+        if len(entry) == 4:
+            raw_hash, kind, offset, length = entry
+            return raw_hash, kind, FULL, offset, length
+        return entry
+
+    def _key(self, position: int) -> bytes:
+        start = self._entries_start + position * self._entry_struct.size
+        end = start + KEY_SIZE
+        return self._index[start:end]
+
+    def _lookup(self, kind: str, hashcode: str) -> Optional[tuple]:
+        key = make_key(kind, hashcode)
+        first_byte = key[0]
+        low = self._fanout[first_byte - 1] if first_byte else 0
+        high = self._fanout[first_byte]
+        while low < high:
+            middle = (low + high) // 2
+            current = self._key(middle)
+            if current < key:
+                low = middle + 1
+            elif current > key:
+                high = middle
+            else:
+                return self._entry(middle)[2:]
+        return None
+
+    def find(self, kind: str, hashcode: str) -> Optional[Tuple[int, int]]:
+        """Смещение и длина объекта в файле данных"""
+        entry = self._lookup(kind, hashcode)
+        return entry[1:] if entry else None
+
+    def is_delta(self, kind: str, hashcode: str) -> bool:
+        entry = self._lookup(kind, hashcode)
+        return entry is not None and entry[0] == DELTA
+
+    def __contains__(self, item: tuple) -> bool:
+        return self._lookup(*item) is not None
+
+    def read_raw(self, kind: str, hashcode: str) -> Optional[bytes]:
+        """Объект в том виде, в котором он лежит в пакете"""
+        location = self.find(kind, hashcode)
+        if location is None:
+            return None
+        start, length = location
+        end = start + length
+        return self.data[start:end]
+
+    def read(self, kind: str, hashcode: str) -> Optional[bytes]:
+        """Объект в том же виде, что и одноимённый свободный файл"""
+        if self.is_delta(kind, hashcode):
+            return zlib.compress(self.read_content(hashcode))
+        raw = self.read_raw(kind, hashcode)
+        if raw is None or kind == "blob":
+            return raw
+        return zlib.decompress(raw)
+
+    def read_content(self, hashcode: str) -> bytes:
+        """Распакованное содержимое блоба с разворачиванием цепочки дельт"""
+        content = self._base_cache.get(hashcode)
+        if content is not None:
+            return content
+        raw = self.read_raw("blob", hashcode)
+        if raw is None:
+            raise KeyError(hashcode)
+        if self.is_delta("blob", hashcode):
+            base = self.read_content(raw[:20].hex())
+            content = delta.apply_delta(base, zlib.decompress(raw[20:]))
+        else:
+            content = compression.decode(raw)
+        self._base_cache.put(hashcode, content, len(content))
+        return content
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for position in range(self.count):
+            raw_hash, kind = self._entry(position)[:2]
+            yield KIND_NAMES[kind], raw_hash.hex()
+
+    def close(self) -> None:
+        self._index.close()
+        if self._data is not None:
+            self._data.close()
+
+
+def _find_delta(stored: bytes, content: bytes, window: deque) -> tuple:
+    """Выбор лучшей базы из окна последних блобов.
+
+    Дельтой хранится только блоб без заголовка кодека, который
+    `zlib.compress` восстанавливает байт в байт, иначе при чтении
+    изменился бы его хэш. Базой может быть блоб любого кодека.
+    """
+    if zlib.compress(content) != stored:
+        return None, 0
+    best, best_depth = None, 0
+    for base_hash, base_content, base_depth in window:
+        if base_depth >= MAX_DELTA_DEPTH:
+            continue
+        diff = delta.create_delta(base_content, content, len(content) // 2)
+        if diff is None:
+            continue
+        payload = bytes.fromhex(base_hash) + zlib.compress(diff)
+        if len(payload) < len(stored) and (
+            best is None or len(payload) < len(best)
+        ):
+            best, best_depth = payload, base_depth + 1
+    return best, best_depth
+
+
+def write_pack(
+    objects: Iterable[Tuple[str, str, bytes]],
+    destination: Path,
+    use_deltas: bool = True,
+    no_delta: AbstractSet[str] = frozenset(),
+) -> Path:
+    """Запись пакета из объектов (тип, хэш, содержимое свободного файла).
+
+    Блобы уже сжаты и копируются как есть, деревья и коммиты сжимаются.
+    Каждый блоб пробуется как дельта к DELTA_WINDOW предыдущим блобам,
+    поэтому версии одного файла стоит передавать подряд, от старых к новым.
+    Блобы из `no_delta` пишутся целиком и в окно не попадают.
+    Оба файла пишутся во временные и переименовываются, индекс - последним,
+    поэтому читатели никогда не увидят недописанный пакет.
+    """
+    entries = {}
+    window = deque(maxlen=DELTA_WINDOW)
+    pack_hash = hashlib.sha1()
+    fd, temp_pack = tempfile.mkstemp(dir=destination, prefix="tmp_")
+    with os.fdopen(fd, "wb") as pack_file:
+        header = PACK_HEADER.pack(PACK_MAGIC, VERSION)
+        pack_file.write(header)
+        pack_hash.update(header)
+        offset = len(header)
+        for kind, hashcode, content in objects:
+            key = make_key(kind, hashcode)
+            if key in entries:
+                continue
+            storage_type, payload = FULL, content
+            if kind != "blob":
+                payload = zlib.compress(content)
+            elif (
+                use_deltas
+                and hashcode not in no_delta
+                and len(content) <= DELTA_MAX_SIZE
+            ):
+                try:
+                    raw_content = compression.decode(content)
+                except compression.DECODE_ERRORS:
+                    raw_content = None
+                if raw_content is not None:
+                    diff, depth = _find_delta(content, raw_content, window)
+                    if diff is not None:
+                        storage_type, payload = DELTA, diff
+                    window.append((hashcode, raw_content, depth))
+            pack_file.write(payload)
+            pack_hash.update(payload)
+            entries[key] = (storage_type, offset, len(payload))
+            offset += len(payload)
+        pack_file.write(pack_hash.digest())
+
+    name = f"pack-{pack_hash.hexdigest()}"
+    pack_path = Path(destination) / f"{name}.pack"
+    os.replace(temp_pack, pack_path)
+
+    keys = sorted(entries)
+    fanout = [0] * 256
+    for key in keys:
+        fanout[key[0]] += 1
+    for i in range(1, 256):
+        fanout[i] += fanout[i - 1]
+    fd, temp_index = tempfile.mkstemp(dir=destination, prefix="tmp_")
+    with os.fdopen(fd, "wb") as index_file:
+        index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION, len(keys)))
+        index_file.write(FANOUT.pack(*fanout))
+        entry_struct = ENTRIES[VERSION]
+        for key in keys:
+            storage_type, offset, length = entries[key]
+            index_file.write(
+                entry_struct.pack(
+                    key[:20], key[20], storage_type, offset, length
+                )
+            )
+        index_file.write(pack_hash.digest())
+    index_path = Path(destination) / f"{name}.idx"
+    os.replace(temp_index, index_path)
+    return index_path
@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Set, Tuple
+
+from cvs import config
+from cvs.models.commit_graph import CommitGraph
+from cvs.utils import storage
+
+ObjectKey = Tuple[str, str]
+
+
+class PruneResult(NamedTuple):
+    objects: int
+    size: int
+
+
+def _read_tree(hashcode: str) -> dict:
+    """Чтение дерева в обход общего кэша, безопасное для потоков"""
+    return storage.parse_tree(storage.store.read("tree", hashcode))
+
+
+def _blob_chunks(hashcode: str) -> List[str]:
+    try:
+        return storage.store.blob_chunks(hashcode)
+    except FileNotFoundError:
+        return []
+
+
+def mark_reachable(
+    commits: Iterable[str],
+    blobs: Iterable[str],
+    trees: Iterable[str] = (),
+    jobs: int = 1,
+) -> Set[ObjectKey]:
+    """Все объекты, достижимые из коммитов, блобов и деревьев индекса.
+
+    История обходится по графу коммитов, деревья читаются
+    слоями: все деревья очередного уровня - параллельно в пуле потоков.
+    Чанки достижимых блобов тоже достижимы, поэтому у каждого блоба
+    читается заголовок.
+    """
+    reachable = {("blob", x) for x in blobs}
+    frontier = set(trees)
+    reachable.update(("tree", x) for x in frontier)
+    graph = CommitGraph(config.COMMIT_GRAPH_PATH)
+    try:
+        for head in commits:
+            for record in graph.iter_history(head):
+                if ("commit", record.commit) in reachable:
+                    break
+                reachable.add(("commit", record.commit))
+                if ("tree", record.tree) not in reachable:
+                    reachable.add(("tree", record.tree))
+                    frontier.add(record.tree)
+    finally:
+        graph.close()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while frontier:
+            next_frontier = set()
+            for tree in executor.map(_read_tree, frontier):
+                for obj_type, hashcode in tree.values():
+                    key = (obj_type, hashcode)
+                    if key in reachable:
+                        continue
+                    reachable.add(key)
+                    if obj_type == "tree":
+                        next_frontier.add(hashcode)
+            frontier = next_frontier
+        blobs = [x for kind, x in reachable if kind == "blob"]
+        for chunks in executor.map(_blob_chunks, blobs):
+            reachable.update(("blob", x) for x in chunks)
+    return reachable
+
+
+def prune_loose(reachable: Set[ObjectKey], grace_period: float) -> PruneResult:
+    """Удаление недостижимых свободных объектов старше `grace_period` секунд.
+
+    Вместе с ними удаляются временные файлы прерванных записей.
+    """
+    expire = time.time() - grace_period
+    count = size = 0
+    candidates = [
+        (path, (kind, hashcode) not in reachable)
+        for kind, hashcode, path in storage.store.iter_loose()
+    ]
+    for kind in ("blob", "tree", "commit"):
+        directory = storage.store.loose_storage(kind)
+        candidates += [(x, True) for x in directory.glob("tmp_*")]
+    candidates += [(x, True) for x in config.PACKS_PATH.glob("tmp_*")]
+    for path, is_garbage in candidates:
+        if not is_garbage:
+            continue
+        stat = _stat(path)
+        if stat is None or stat.st_mtime > expire:
+            continue
+        path.unlink()
+        count += 1
+        size += stat.st_size
+    return PruneResult(count, size)
+
+
+def _stat(path: Path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
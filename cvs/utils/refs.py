@@ -0,0 +1,139 @@
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+from cvs import errors
+from cvs.utils.lock import LOCK_SUFFIX, LockFile
+
+PACKED_HEADER = "# cvs packed-refs\n"
+NAME_PART = r"[A-Za-z0-9_-][A-Za-z0-9._-]*"
+NAME_PATTERN = re.compile(rf"{NAME_PART}(/{NAME_PART})*")
+COMMIT_PATTERN = re.compile(r"[0-9a-f]{40}")
+RESERVED_NAMES = ("HEAD", "root")
+
+
+def is_commit_hash(pointer: str) -> bool:
+    """HEAD указывает на коммит, а не на ветку"""
+    return pointer in RESERVED_NAMES or bool(COMMIT_PATTERN.fullmatch(pointer))
+
+
+def check_name(name: str) -> None:
+    if (
+        not NAME_PATTERN.fullmatch(name)
+        or ".." in name
+        or name.endswith(LOCK_SUFFIX)
+        or is_commit_hash(name)
+    ):
+        raise errors.InvalidArgumentError(name)
+
+
+class RefStore:
+    """Ветки: файл packed-refs и перекрывающие его свободные ссылки.
+
+    Свободная ссылка - файл `refs/<имя>` с хэшем коммита, она
+    создаётся при каждом изменении ветки. `pack` переносит свободные
+    ссылки в packed-refs, поэтому список тысяч веток читается одним
+    файлом и обходом почти пустого каталога `refs`. Все изменения
+    идут через файлы блокировки с атомарным переименованием.
+    """
+
+    def __init__(self, loose_path: Path, packed_path: Path):
+        self.loose_path = loose_path
+        self.packed_path = packed_path
+        self._packed: Optional[Dict[str, str]] = None
+
+    @property
+    def packed(self) -> Dict[str, str]:
+        if self._packed is None:
+            self._packed = self._read_packed()
+        return self._packed
+
+    def _read_packed(self) -> Dict[str, str]:
+        try:
+            content = self.packed_path.read_text()
+        except FileNotFoundError:
+            return {}
+        result = {}
+        for line in content.splitlines():
+            if line and not line.startswith("#"):
+                commit, name = line.split(" ", 1)
+                result[name] = commit
+        return result
+
+    def _write_packed(self, lock: LockFile, refs: Dict[str, str]) -> None:
+        lines = [f"{refs[name]} {name}\n" for name in sorted(refs)]
+        lock.write((PACKED_HEADER + "".join(lines)).encode("utf-8"))
+        lock.commit()
+        self._packed = refs
+
+    def read(self, name: str) -> Optional[str]:
+        """Хэш коммита ветки: одно открытие файла, без stat"""
+        try:
+            return (self.loose_path / name).read_text()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return self.packed.get(name)
+
+    def loose(self) -> Dict[str, str]:
+        result = {}
+        for directory, _, files in os.walk(self.loose_path):
+            for file in files:
+                if file.endswith(LOCK_SUFFIX):
+                    continue
+                path = Path(directory, file)
+                name = path.relative_to(self.loose_path).as_posix()
+                result[name] = path.read_text()
+        return result
+
+    def all(self) -> Dict[str, str]:
+        """Все ветки: имя -> хэш коммита"""
+        return {**self.packed, **self.loose()}
+
+    def update(self, name: str, commit: str) -> None:
+        check_name(name)
+        target = self.loose_path / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with LockFile(target) as lock:
+            lock.write(commit.encode("ascii"))
+            lock.commit()
+
+    def delete(self, name: str) -> bool:
+        """Удаление ветки из packed-refs и свободной ссылки"""
+        existed = False
+        with LockFile(self.packed_path) as lock:
+            refs = self._read_packed()
+            if name in refs:
+                del refs[name]
+                self._write_packed(lock, refs)
+                existed = True
+        target = self.loose_path / name
+        if target.is_file():
+            with LockFile(target):
+                target.unlink()
+            existed = True
+            self._remove_empty_parents(target)
+        return existed
+
+    def pack(self) -> int:
+        """Перенос свободных ссылок в packed-refs, число перенесённых"""
+        with LockFile(self.packed_path) as lock:
+            loose = self.loose()
+            if not loose:
+                return 0
+            self._write_packed(lock, {**self._read_packed(), **loose})
+        for name, commit in loose.items():
+            target = self.loose_path / name
+            try:
+                with LockFile(target, timeout=0):
+                    if target.read_text() == commit:
+                        target.unlink()
+            except (errors.LockedError, FileNotFoundError):
+                continue
+            self._remove_empty_parents(target)
+        return len(loose)
+
+    def _remove_empty_parents(self, path: Path) -> None:
+        parent = path.parent
+        while parent != self.loose_path and not any(parent.iterdir()):
+            parent.rmdir()
+            parent = parent.parent
@@ -0,0 +1,55 @@
+import fnmatch
+import os
+from pathlib import Path
+from typing import Iterable, List
+
+
+class SparseMatcher:
+    """Шаблоны частичной рабочей копии.
+
+    Шаблон - путь каталога, компоненты которого могут содержать маски
+    `fnmatch`. Каталог попадает в рабочую копию, если он лежит внутри
+    шаблона или на пути к нему; файлы берутся из всех попавших каталогов.
+    Без шаблонов рабочая копия полная.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[tuple] = []
+        for pattern in patterns:
+            pattern = pattern.strip().strip("/")
+            if pattern:
+                self.patterns.append(tuple(pattern.split("/")))
+
+    @property
+    def is_enabled(self) -> bool:
+        return bool(self.patterns)
+
+    def may_contain(self, directory: str) -> bool:
+        """Каталог нужен в рабочей копии и его дерево надо читать"""
+        if not self.patterns or not directory:
+            return True
+        parts = directory.split(os.sep)
+        for pattern in self.patterns:
+            common = min(len(parts), len(pattern))
+            if all(
+                fnmatch.fnmatchcase(parts[i], pattern[i])
+                for i in range(common)
+            ):
+                return True
+        return False
+
+    def includes(self, path: str) -> bool:
+        return self.may_contain(os.path.dirname(path))
+
+    @classmethod
+    def load(cls, location: Path) -> "SparseMatcher":
+        if not location.exists():
+            return cls([])
+        return cls(location.read_text().splitlines())
+
+    def save(self, location: Path) -> None:
+        if not self.patterns:
+            if location.exists():
+                location.unlink()
+            return
+        location.write_text("\n".join("/".join(x) for x in self.patterns))
@@ -0,0 +1,96 @@
+import contextlib
+import time
+from typing import Dict, Iterator, List
+
+COUNTERS = ("bytes_read", "bytes_written", "objects_created", "files_stated")
+
+
+class Phase:
+    """Накопленные показатели одной фазы выполнения команды"""
+
+    __slots__ = ("calls", "seconds") + COUNTERS
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Recorder:
+    """Сбор времени и счётчиков по фазам.
+
+    Время вложенной фазы не входит во время внешней, счётчики
+    относятся к самой внутренней активной фазе, вне фаз - к "other".
+    Пока запись выключена, вызовы сводятся к одной проверке флага.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.phases: Dict[str, Phase] = {}
+        self._stack: List[Phase] = []
+        self._started = 0.0
+
+    def _get(self, name: str) -> Phase:
+        if name not in self.phases:
+            self.phases[name] = Phase()
+        return self.phases[name]
+
+    def _charge(self, now: float) -> None:
+        if self._stack:
+            self._stack[-1].seconds += now - self._started
+        self._started = now
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        self._charge(time.perf_counter())
+        current = self._get(name)
+        current.calls += 1
+        self._stack.append(current)
+        try:
+            yield
+        finally:
+            self._charge(time.perf_counter())
+            self._stack.pop()
+
+    def count(self, **counters: int) -> None:
+        if not self.enabled:
+            return
+        target = self._stack[-1] if self._stack else self._get("other")
+        for name, value in counters.items():
+            setattr(target, name, getattr(target, name) + value)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {name: x.as_dict() for name, x in self.phases.items()}
+
+    def reset(self) -> None:
+        self.phases.clear()
+        self._stack.clear()
+
+
+recorder = Recorder()
+phase = recorder.phase
+count = recorder.count
+
+
+def format_report(report: Dict[str, Dict[str, float]]) -> str:
+    """Таблица показателей по фазам"""
+    lines = [
+        f"{'phase':<16} {'calls':>6} {'time, ms':>10} {'read, KiB':>10}"
+        f" {'written, KiB':>12} {'objects':>8} {'stats':>8}"
+    ]
+    for name, values in report.items():
+        lines.append(
+            f"{name:<16} {values['calls']:>6}"
+            f" {values['seconds'] * 1e3:>10.2f}"
+            f" {values['bytes_read'] / 1024:>10.1f}"
+            f" {values['bytes_written'] / 1024:>12.1f}"
+            f" {values['objects_created']:>8} {values['files_stated']:>8}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,305 @@
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from cvs import config
+from cvs.utils import chunking, compression, streams
+from cvs.utils.cache import LRUCache
+from cvs.utils.packs import Pack, write_pack
+
+OBJECT_CACHE_SIZE = 1 << 24
+BLOB_CACHE_SIZE = 1 << 25
+BLOB_CACHE_ITEM_SIZE = 1 << 22
+
+
+def parse_tree(content: bytes) -> Dict[str, Tuple[str, str]]:
+    """Разбор содержимого дерева: имя -> (тип объекта, хэш)"""
+    result = {}
+    for line in content.decode("utf-8").splitlines():
+        obj_type, hashcode, name = line.split(" ", 2)
+        result[name] = (obj_type, hashcode)
+    return result
+
+
+class ObjectStore:
+    """Единая точка чтения объектов из пакетов и свободных файлов.
+
+    Разобранные деревья и коммиты хранятся в общем LRU-кэше,
+    распакованные блобы - в отдельном, размер обоих ограничен в байтах.
+    Кэши сбрасываются при смене рабочего каталога. Хранилище читается
+    из нескольких потоков, список пакетов загружается под блокировкой.
+    """
+
+    def __init__(self):
+        self._packs: Optional[List[Pack]] = None
+        self._packs_lock = threading.Lock()
+        self._root = None
+        self.objects = LRUCache(OBJECT_CACHE_SIZE)
+        self.blobs = LRUCache(BLOB_CACHE_SIZE, BLOB_CACHE_ITEM_SIZE)
+
+    @staticmethod
+    def loose_storage(kind: str) -> Path:
+        storages = {
+            "blob": config.BLOBS_PATH,
+            "tree": config.TREES_PATH,
+            "commit": config.COMMITS_PATH,
+        }
+        return storages[kind]
+
+    def loose_path(self, kind: str, hashcode: str) -> Path:
+        return self.loose_storage(kind) / hashcode
+
+    def _check_root(self) -> None:
+        if self._root != os.getcwd():
+            self.objects.clear()
+            self.blobs.clear()
+            self.reload()
+
+    @property
+    def packs(self) -> List[Pack]:
+        self._check_root()
+        packs = self._packs
+        if packs is None:
+            with self._packs_lock:
+                if self._packs is None:
+                    self._packs = [
+                        Pack(x)
+                        for x in sorted(config.PACKS_PATH.glob("*.idx"))
+                    ]
+                packs = self._packs
+        return packs
+
+    def reload(self) -> None:
+        """Сброс списка пакетов, например после переупаковки"""
+        with self._packs_lock:
+            packs, self._packs = self._packs, None
+        for pack in packs or []:
+            pack.close()
+        self._root = os.getcwd()
+
+    def _find_pack(self, kind: str, hashcode: str) -> Optional[Pack]:
+        for pack in self.packs:
+            if (kind, hashcode) in pack:
+                return pack
+        return None
+
+    def exists(self, kind: str, hashcode: str) -> bool:
+        if self._find_pack(kind, hashcode):
+            return True
+        return self.loose_path(kind, hashcode).exists()
+
+    def read(self, kind: str, hashcode: str) -> bytes:
+        """Содержимое объекта (для блобов - сжатые данные)"""
+        pack = self._find_pack(kind, hashcode)
+        if pack:
+            return pack.read(kind, hashcode)
+        try:
+            return self.loose_path(kind, hashcode).read_bytes()
+        except FileNotFoundError:
+            self.reload()
+            pack = self._find_pack(kind, hashcode)
+            if not pack:
+                raise
+            return pack.read(kind, hashcode)
+
+    def read_tree(self, hashcode: str) -> Dict[str, Tuple[str, str]]:
+        """Разобранное дерево через кэш объектов"""
+        self._check_root()
+        key = ("tree", hashcode)
+        tree = self.objects.get(key)
+        if tree is None:
+            content = self.read("tree", hashcode)
+            tree = parse_tree(content)
+            self.objects.put(key, tree, len(content))
+        return tree
+
+    def read_commit(self, hashcode: str) -> str:
+        """Содержимое коммита через кэш объектов"""
+        self._check_root()
+        key = ("commit", hashcode)
+        commit = self.objects.get(key)
+        if commit is None:
+            content = self.read("commit", hashcode)
+            commit = content.decode("utf-8")
+            self.objects.put(key, commit, len(content))
+        return commit
+
+    def read_blob(self, hashcode: str) -> bytes:
+        """Распакованное содержимое блоба через кэш блобов"""
+        self._check_root()
+        content = self.blobs.get(hashcode)
+        if content is None:
+            pack = self._find_pack("blob", hashcode)
+            if pack and pack.is_delta("blob", hashcode):
+                content = pack.read_content(hashcode)
+            else:
+                content = b"".join(
+                    self.iter_content(hashcode, compression.DECODE_STEP)
+                )
+            self.blobs.put(hashcode, content, len(content))
+        return content
+
+    @property
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Попадания, промахи и занятый размер кэшей"""
+        return {
+            name: {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "size": cache.size,
+            }
+            for name, cache in (
+                ("objects", self.objects),
+                ("blobs", self.blobs),
+            )
+        }
+
+    def blob_codec(self, hashcode: str) -> compression.Codec:
+        """Кодек блоба по заголовку, без распаковки"""
+        pack = self._find_pack("blob", hashcode)
+        if pack is None:
+            with open(self.loose_path("blob", hashcode), "rb") as file:
+                head = file.read(compression.HEADER_SIZE)
+        elif pack.is_delta("blob", hashcode):
+            return compression.LEGACY
+        else:
+            offset, length = pack.find("blob", hashcode)
+            end = offset + min(length, compression.HEADER_SIZE)
+            head = pack.data[offset:end]
+        return compression.parse_header(head)[0]
+
+    def blob_chunks(self, hashcode: str) -> List[str]:
+        """Хэши чанков блоба, для обычного блоба - пустой список"""
+        if not self.blob_codec(hashcode).chunked:
+            return []
+        manifest = b"".join(self.iter_blob(hashcode))
+        return [x for x, _ in chunking.parse_manifest(manifest)]
+
+    def iter_content(
+        self, hashcode: str, max_length: int = None
+    ) -> Iterator[bytes]:
+        """Распакованное содержимое блоба по частям, чанки - по порядку"""
+        for chunk in self.blob_chunks(hashcode) or [hashcode]:
+            pack = self._find_pack("blob", chunk)
+            if pack and pack.is_delta("blob", chunk):
+                yield pack.read_content(chunk)
+                continue
+            yield from compression.iter_decoded(
+                self.iter_blob(chunk), max_length
+            )
+
+    def export_blob(self, hashcode: str, target: Path) -> None:
+        """Запись распакованного содержимого блоба в файл"""
+        if hashcode in self.blobs:
+            Path(target).write_bytes(self.read_blob(hashcode))
+            return
+        pack = self._find_pack("blob", hashcode)
+        if pack and pack.is_delta("blob", hashcode):
+            Path(target).write_bytes(pack.read_content(hashcode))
+            return
+        with open(target, "wb") as output:
+            for data in self.iter_content(hashcode):
+                output.write(data)
+
+    def iter_blob(self, hashcode: str) -> Iterator[bytes]:
+        """Сжатые данные блоба блоками по `config.CHUNK_SIZE`"""
+        pack = self._find_pack("blob", hashcode)
+        if not pack:
+            path = self.loose_path("blob", hashcode)
+            if path.exists():
+                yield from streams.iter_chunks(path)
+                return
+            self.reload()
+            pack = self._find_pack("blob", hashcode)
+            if not pack:
+                raise FileNotFoundError(str(path))
+        offset, length = pack.find("blob", hashcode)
+        for start in range(offset, offset + length, config.CHUNK_SIZE):
+            end = min(start + config.CHUNK_SIZE, offset + length)
+            yield pack.data[start:end]
+
+    def iter_loose(self) -> Iterator[Tuple[str, str, Path]]:
+        """Все свободные объекты: (тип, хэш, путь)"""
+        for kind in ("blob", "tree", "commit"):
+            for path in self.loose_storage(kind).iterdir():
+                if len(path.name) == 40:
+                    yield kind, path.name, path
+
+    def repack(
+        self,
+        names: Dict[str, str] = None,
+        reachable: Set[Tuple[str, str]] = None,
+    ) -> int:
+        """Упаковка свободных объектов и существующих пакетов в один пакет.
+
+        С `reachable` упаковываются только достижимые объекты: недостижимые
+        свободные остаются на месте до истечения срока хранения,
+        недостижимые упакованные выносятся в свободные файлы, чтобы их
+        удалил один из следующих gc.
+        Блобы группируются по имени файла и упорядочиваются по времени
+        создания, чтобы новые версии файла хранились дельтой к старым.
+        """
+        loose = [
+            x
+            for x in self.iter_loose()
+            if reachable is None or x[:2] in reachable
+        ]
+        old_packs = list(self.packs)
+        entries = [(k, h, x.stat().st_mtime_ns) for k, h, x in loose]
+        unpacked = 0
+        for pack in old_packs:
+            for kind, hashcode in pack:
+                if reachable is None or (kind, hashcode) in reachable:
+                    entries.append((kind, hashcode, 0))
+                    continue
+                streams.store_bytes(
+                    pack.read(kind, hashcode),
+                    hashcode,
+                    self.loose_storage(kind),
+                )
+                unpacked += 1
+        if not loose and not unpacked and len(old_packs) <= 1:
+            return 0
+        names = {**self._blob_names(entries), **(names or {})}
+        entries.sort(key=lambda x: (x[0] != "blob", names.get(x[1], ""), x[2]))
+        config.PACKS_PATH.mkdir(exist_ok=True)
+        objects = (
+            (kind, hashcode, self.read(kind, hashcode))
+            for kind, hashcode, _ in entries
+        )
+        index_path = write_pack(
+            objects, config.PACKS_PATH, no_delta=self._chunks(entries)
+        )
+        self.reload()
+        for _, _, path in loose:
+            path.unlink()
+        for pack in old_packs:
+            if pack.index_path != index_path:
+                pack.index_path.unlink()
+                pack.data_path.unlink()
+        return len(loose)
+
+    def _chunks(self, entries: List[Tuple[str, str, int]]) -> Set[str]:
+        """Чанки упаковываемых блобов: дельты для них не ищутся"""
+        chunks = set()
+        for kind, hashcode, _ in entries:
+            if kind == "blob":
+                chunks.update(self.blob_chunks(hashcode))
+        return chunks
+
+    def _blob_names(self, entries: List[Tuple[str, str, int]]) -> dict:
+        """Имена файлов блобов по упаковываемым деревьям"""
+        names = {}
+        for kind, hashcode, _ in entries:
+            if kind != "tree":
+                continue
+            for name, (obj_type, blob) in parse_tree(
+                self.read("tree", hashcode)
+            ).items():
+                if obj_type == "blob":
+                    names.setdefault(blob, name)
+        return names
+
+
+store = ObjectStore()
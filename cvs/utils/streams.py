@@ -0,0 +1,151 @@
+import hashlib
+import itertools
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+
+from cvs import config
+from cvs.utils import chunking, compression, stats
+from cvs.utils.compression import Codec
+
+
+def iter_chunks(path: Path, chunk_size: int = None) -> Iterator[bytes]:
+    """Чтение файла блоками фиксированного размера"""
+    chunk_size = chunk_size or config.CHUNK_SIZE
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            stats.count(bytes_read=len(chunk))
+            yield chunk
+
+
+def select_codec(path: Path) -> Tuple[Codec, Iterator[bytes]]:
+    """Кодек файла по политике репозитория и поток его блоков.
+
+    Для пробного сжатия читается начало файла, прочитанные
+    блоки не теряются и идут первыми в возвращаемом потоке.
+    """
+    chunks = iter_chunks(path)
+    head = []
+    for chunk in chunks:
+        head.append(chunk)
+        if sum(map(len, head)) >= compression.PROBE_SIZE:
+            break
+    sample = b"".join(head)
+    end = compression.PROBE_SIZE
+    codec = compression.policy().choose(
+        str(path), os.path.getsize(path), sample[:end]
+    )
+    return codec, itertools.chain(head, chunks)
+
+
+def _open_encoded(
+    path: Path, codec: Optional[Codec]
+) -> Tuple[Codec, Iterator[bytes]]:
+    if codec is None:
+        return select_codec(path)
+    return codec, iter_chunks(path)
+
+
+def iter_compressed(path: Path, codec: Codec = None) -> Iterator[bytes]:
+    """Потоковое сжатие файла, совпадающее по байтам с `compression.encode`.
+
+    Без явного кодека он выбирается политикой репозитория,
+    для файла, делимого на чанки, выдаётся список чанков.
+    """
+    codec, chunks = _open_encoded(path, codec)
+    if codec.chunked:
+        return iter([chunk_manifest(chunks, codec)])
+    return compression.iter_encoded(chunks, codec)
+
+
+def hash_file(path: Path, codec: Codec = None) -> str:
+    """Хэш сжатого содержимого файла без записи объекта"""
+    hash_obj = hashlib.sha1()
+    for compressed in iter_compressed(path, codec):
+        hash_obj.update(compressed)
+    return hash_obj.hexdigest()
+
+
+def chunk_manifest(
+    blocks: Iterable[bytes], codec: Codec, destination: Path = None
+) -> bytes:
+    """Список чанков потока; с `destination` новые чанки записываются"""
+    inner = codec._replace(chunked=False)
+    entries = []
+    for piece in chunking.split(blocks):
+        data = compression.encode(piece, inner)
+        hashcode = hashlib.sha1(data).hexdigest()
+        if destination is not None:
+            store_bytes(data, hashcode, destination)
+        entries.append((hashcode, len(piece)))
+    return chunking.encode_manifest(codec, entries)
+
+
+def store_bytes(data: bytes, hashcode: str, destination: Path) -> None:
+    """Запись объекта через временный файл, если его ещё нет"""
+    target = Path(destination) / hashcode
+    if target.exists():
+        return
+    fd, temp_name = tempfile.mkstemp(dir=destination, prefix="tmp_")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            temp_file.write(data)
+        os.replace(temp_name, target)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+    stats.count(bytes_written=len(data), objects_created=1)
+
+
+def store_file(path: Path, destination: Path, codec: Codec = None) -> str:
+    """Сжатие файла во временный объект с переименованием по его хэшу.
+
+    Память не зависит от размера файла: сжатие и хэширование
+    выполняются одновременно над блоками по `config.CHUNK_SIZE`.
+    Большой файл делится на чанки, записываются только новые.
+    """
+    codec, chunks = _open_encoded(path, codec)
+    if codec.chunked:
+        manifest = chunk_manifest(chunks, codec, Path(destination))
+        hashcode = hashlib.sha1(manifest).hexdigest()
+        store_bytes(manifest, hashcode, destination)
+        return hashcode
+    hash_obj = hashlib.sha1()
+    fd, temp_name = tempfile.mkstemp(dir=destination, prefix="tmp_")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            for compressed in compression.iter_encoded(chunks, codec):
+                hash_obj.update(compressed)
+                temp_file.write(compressed)
+            written = temp_file.tell()
+        hashcode = hash_obj.hexdigest()
+        target = Path(destination) / hashcode
+        if target.exists():
+            os.remove(temp_name)
+        else:
+            os.replace(temp_name, target)
+            stats.count(bytes_written=written, objects_created=1)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+    return hashcode
+
+
+def decompress_file(source: Path, target: Path, chunk_size: int = None):
+    """Потоковая распаковка объекта в файл рабочей копии"""
+    decompress_chunks(iter_chunks(source, chunk_size), target, chunk_size)
+
+
+def decompress_chunks(
+    chunks: Iterable[bytes], target: Path, chunk_size: int = None
+) -> None:
+    """Распаковка потока сжатых блоков объекта любого кодека в файл"""
+    with open(target, "wb") as output:
+        for data in compression.iter_decoded(chunks, chunk_size):
+            output.write(data)
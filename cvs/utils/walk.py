@@ -0,0 +1,28 @@
+import os
+from typing import AbstractSet, Iterator
+
+from cvs.utils.ignore import IgnoreMatcher
+
+
+def walk_files(
+    root: str, matcher: IgnoreMatcher, skip: AbstractSet[str] = frozenset()
+) -> Iterator[str]:
+    """Обход файлов рабочей копии через `os.scandir`.
+
+    Игнорируемые каталоги и каталоги из `skip` отсекаются целиком,
+    без чтения их содержимого. Пути возвращаются относительно
+    текущего каталога.
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                path = entry.name
+                if directory != os.curdir:
+                    path = os.path.join(directory, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if path not in skip and not matcher.is_dir_ignored(path):
+                        stack.append(path)
+                elif entry.is_file() and not matcher.is_ignored(path):
+                    yield path
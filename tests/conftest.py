@@ -4,6 +4,7 @@ from pathlib import Path
 import pytest
 import tempfile
 
+from cvs import commands
 from cvs.view import TestView
 
 
@@ -23,3 +24,11 @@ def test_dir():
         shutil.rmtree(".cvs")
     yield
     shutil.rmtree(".cvs")
+
+
+@pytest.fixture()
+def repo(tmp_path, monkeypatch, test_view):
+    monkeypatch.chdir(tmp_path)
+    commands.InitCommand(test_view)()
+    test_view.buffer.clear()
+    return tmp_path
@@ -1,8 +1,15 @@
+import os
 import pytest
 
 from pathlib import Path
 from unittest import mock
-from cvs import commands, errors
+from cvs import commands, config, errors
+from cvs.models.commit import Commit
+from cvs.models.index import FileIndex
+from cvs.models.tree import TreeNode
+from cvs.utils import stats
+from cvs.utils.ignore import IgnoreMatcher
+from cvs.utils.walk import walk_files
 
 
 @pytest.mark.parametrize("path", ["..", "../../"])
@@ -61,3 +68,341 @@ def test_status_command(test_view, test_dir):
     command = commands.StatusCommand(test_view)
     command()
     assert test_view.buffer[1].startswith("HEAD")
+
+
+def test_parallel_add_matches_serial(tmp_path, monkeypatch, test_view):
+    results = []
+    for jobs in (1, 2):
+        work_tree = tmp_path / str(jobs)
+        (work_tree / "dir").mkdir(parents=True)
+        monkeypatch.chdir(work_tree)
+        commands.InitCommand(test_view)()
+        for i in range(FileIndex.PARALLEL_MIN_FILES + 10):
+            Path(f"dir/file{i}").write_text(str(i) * i)
+        commands.AddCommand(test_view)(".", jobs)
+        index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+        hashes = {x.path: x.hashcode for x in index.entries}
+        objects = {x.name: x.read_bytes() for x in config.BLOBS_PATH.iterdir()}
+        results.append((hashes, objects))
+    assert results[0] == results[1]
+
+
+def test_checkout_missing_commit(repo, test_view):
+    with pytest.raises(errors.CommitNotFoundError):
+        commands.CheckoutCommand(test_view)("unknown")
+
+
+def test_checkout_touches_only_changed_files(repo, test_view):
+    Path("same").mkdir()
+    Path("same/file.txt").write_text("same")
+    Path("changed.txt").write_text("v1")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = config.HEAD_PATH.read_text()
+    first = (config.REFS_PATH / first).read_text()
+    Path("changed.txt").write_text("v2")
+    Path("new").mkdir()
+    Path("new/file.txt").write_text("new")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("second")
+
+    write_blob = commands.CheckoutCommand.write_blob
+    with mock.patch.object(
+        commands.CheckoutCommand, "write_blob", wraps=write_blob
+    ) as write_blob:
+        commands.CheckoutCommand(test_view)(first)
+    written = [call.args[0] for call in write_blob.call_args_list]
+    assert written == ["changed.txt"]
+    assert Path("changed.txt").read_text() == "v1"
+    assert not Path("new").exists()
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == ["changed.txt", "same/file.txt"]
+
+
+def test_commit_writes_only_changed_trees(repo, test_view):
+    for directory in ("changed", "same", os.path.join("same", "deep")):
+        Path(directory).mkdir()
+        Path(directory, "file.txt").write_text(directory)
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    Path("changed/file.txt").write_text("new content")
+    commands.AddCommand(test_view)(".")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    deep = os.path.join("same", "deep")
+    assert set(index.tree_cache) == {"same", deep}
+    blobs, cached = index.tree_sources()
+    assert [x.filename for x in blobs] == [os.path.join("changed", "file.txt")]
+    assert cached == ["same"]
+
+    trees_before = set(config.TREES_PATH.iterdir())
+    commands.CommitCommand(test_view)("second")
+    new_trees = set(config.TREES_PATH.iterdir()) - trees_before
+    assert len(new_trees) == 2
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert set(index.tree_cache) == {"", "changed", "same", deep}
+
+
+def test_log_pagination_matches_object_walk(repo, test_view):
+    for i in range(5):
+        Path("file.txt").write_text(str(i))
+        commands.AddCommand(test_view)("file.txt")
+        commands.CommitCommand(test_view)(f"message {i}\nbody")
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)(2, 1, True)
+    assert [line.split(" ", 1)[1] for line in test_view.buffer] == [
+        "message 3",
+        "message 2",
+    ]
+
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)()
+    from_graph = list(test_view.buffer)
+    config.COMMIT_GRAPH_PATH.unlink()
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)()
+    assert test_view.buffer == from_graph
+    assert len(from_graph) == 10
+
+
+def test_log_paths_and_blame(repo, test_view):
+    Path("src").mkdir()
+    versions = [
+        ("src/f.txt", "one\ntwo\nthree\n"),
+        ("notes.txt", "notes\n"),
+        ("src/f.txt", "one\nTWO\nthree\nfour\n"),
+        ("notes.txt", "more notes\n"),
+    ]
+    for number, (path, content) in enumerate(versions):
+        Path(path).write_text(content)
+        commands.AddCommand(test_view)(path)
+        commands.CommitCommand(test_view)(f"c{number}")
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)(None, 0, True, ("src",))
+    src_log = [line.split(" ", 1)[1] for line in test_view.buffer]
+    assert src_log == ["c2", "c0"]
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)(None, 0, True, ("notes.txt", "missing"))
+    notes_log = [line.split(" ", 1)[1] for line in test_view.buffer]
+    assert notes_log == ["c3", "c1"]
+
+    hashes = {}
+    test_view.buffer.clear()
+    commands.LogCommand(test_view)(None, 0, True)
+    for line in test_view.buffer:
+        short, message = line.split(" ", 1)
+        hashes[message] = short
+    test_view.buffer.clear()
+    commands.BlameCommand(test_view)("src/f.txt")
+    assert [(x[:7], x.rsplit(" ", 1)[1]) for x in test_view.buffer] == [
+        (hashes["c0"], "one"),
+        (hashes["c2"], "TWO"),
+        (hashes["c0"], "three"),
+        (hashes["c2"], "four"),
+    ]
+    with pytest.raises(errors.InvalidPathError):
+        commands.BlameCommand(test_view)("src")
+    with pytest.raises(errors.InvalidPathError):
+        commands.LogCommand(test_view)(None, 0, False, ("../outside",))
+
+
+def test_stats_record_phases(repo, test_view):
+    Path("file.txt").write_text("content")
+    stats.recorder.enabled = True
+    try:
+        commands.AddCommand(test_view)("file.txt")
+        commands.CommitCommand(test_view)("first")
+        report = stats.recorder.report()
+    finally:
+        stats.recorder.enabled = False
+        stats.recorder.reset()
+    assert report["hashing"]["objects_created"] == 1
+    assert report["hashing"]["bytes_read"] == len("content")
+    assert report["object writes"]["objects_created"] == 2
+    assert report["index load"]["calls"] == 2
+    assert all(x["seconds"] >= 0 for x in report.values())
+
+
+def test_sparse_checkout_skips_unmatched_trees(repo, test_view):
+    for directory in ("svc/api", "svc/web", "lib"):
+        Path(directory).mkdir(parents=True)
+        Path(directory, "file.txt").write_text(directory)
+    Path("root.txt").write_text("root")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    Path("lib/file.txt").write_text("lib v2")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("second")
+    second = (config.REFS_PATH / "master").read_text()
+
+    commands.SparseCommand(test_view)(("svc/api",))
+    matcher = IgnoreMatcher(FileIndex.get_ignored_files(config.IGNORE_PATH))
+    assert sorted(walk_files(".", matcher)) == [
+        "root.txt",
+        os.path.join("svc", "api", "file.txt"),
+    ]
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert set(index.sparse_trees) == {"lib", os.path.join("svc", "web")}
+    test_view.buffer.clear()
+    commands.StatusCommand(test_view)()
+    assert not any(x.startswith(("new", "mod")) for x in test_view.buffer)
+
+    Path("svc/api/file.txt").write_text("changed")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("third")
+    third = (config.REFS_PATH / "master").read_text()
+    test_view.buffer.clear()
+    commands.DiffCommand(test_view)((second, third))
+    assert test_view.buffer[0].endswith(os.path.join("api", "file.txt"))
+    assert len(test_view.buffer) == 6
+
+    with mock.patch.object(
+        TreeNode, "parse_file_content", wraps=TreeNode.parse_file_content
+    ) as read_tree:
+        commands.CheckoutCommand(test_view)(first)
+    read = {call.args[0] for call in read_tree.call_args_list}
+    root_tree = TreeNode.parse_file_content(
+        Commit.parse_file_content(first)[0]
+    )
+    assert root_tree["lib"][1] not in read
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert index.sparse_trees["lib"] == root_tree["lib"][1]
+
+    with pytest.raises(errors.InvalidPathError):
+        commands.CheckoutCommand(test_view)(second, ("lib",))
+    commands.SparseCommand(test_view)((), True)
+    assert Path("lib/file.txt").read_text() == "lib"
+    assert Path("svc/web/file.txt").read_text() == "svc/web"
+
+    commands.CheckoutCommand(test_view)(second, ("lib",))
+    assert Path("lib/file.txt").read_text() == "lib v2"
+    assert config.HEAD_PATH.read_text() == first
+
+
+def test_branch_packed_refs(repo, test_view, monkeypatch):
+    Path("file.txt").write_text("v1")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    commands.BranchCommand(test_view)("ci/feature")
+    test_view.buffer.clear()
+    commands.BranchCommand(test_view)()
+    assert test_view.buffer == ["  ci/feature", "* master"]
+
+    commands.CheckoutCommand(test_view)("ci/feature")
+    assert config.HEAD_PATH.read_text() == "ci/feature"
+    Path("file.txt").write_text("v2")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("second")
+    second = (config.REFS_PATH / "ci" / "feature").read_text()
+    assert second != first
+    assert (config.REFS_PATH / "master").read_text() == first
+
+    commands.GcCommand(test_view)()
+    assert not any(config.REFS_PATH.iterdir())
+    assert f"{second} ci/feature" in config.PACKED_REFS_PATH.read_text()
+    commands.CheckoutCommand(test_view)("master")
+    assert Path("file.txt").read_text() == "v1"
+    Path("file.txt").write_text("v3")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("third")
+    assert (config.REFS_PATH / "master").read_text() != first
+
+    with pytest.raises(errors.InvalidArgumentError):
+        commands.BranchCommand(test_view)("master", None, True)
+    for name in ("bad..name", "x.lock", first):
+        with pytest.raises(errors.InvalidArgumentError):
+            commands.BranchCommand(test_view)(name)
+    monkeypatch.setattr(config, "LOCK_TIMEOUT", 0)
+    Path(f"{config.PACKED_REFS_PATH}.lock").touch()
+    with pytest.raises(errors.LockedError):
+        commands.BranchCommand(test_view)("ci/feature", None, True)
+    Path(f"{config.PACKED_REFS_PATH}.lock").unlink()
+    commands.BranchCommand(test_view)("ci/feature", None, True)
+    assert not config.PACKED_REFS_PATH.read_text().count("ci/feature")
+
+
+def test_add_skips_excluded_sparse_trees(repo, test_view):
+    for path in ("a/f", "c/g", "c/h"):
+        Path(path).parent.mkdir(exist_ok=True)
+        Path(path).write_text(path)
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    commands.SparseCommand(test_view)(("a",))
+    Path("c").mkdir()
+    Path("c/new").write_text("new")
+
+    commands.AddCommand(test_view)(".")
+    with pytest.raises(errors.InvalidPathError):
+        commands.AddCommand(test_view)(os.path.join("c", "new"))
+    test_view.buffer.clear()
+    commands.StatusCommand(test_view)()
+    assert not any(x.startswith("new file") for x in test_view.buffer)
+    test_view.buffer.clear()
+    commands.CommitCommand(test_view)("second")
+    assert test_view.buffer == ["Нечего коммитить - нет изменений"]
+    assert (config.REFS_PATH / "master").read_text() == first
+
+    commands.SparseCommand(test_view)((), True)
+    assert Path("c/g").read_text() == "c/g"
+    assert Path("c/h").read_text() == "c/h"
+
+
+def test_single_file_add_checks_only_that_entry(repo, test_view):
+    for name in ("a.txt", "b.txt", "c.log"):
+        Path(name).write_text(name)
+    commands.AddCommand(test_view)(".")
+    Path("b.txt").unlink()
+    Path("a.txt").write_text("changed")
+    with mock.patch.object(
+        FileIndex,
+        "is_ignored",
+        autospec=True,
+        side_effect=FileIndex.is_ignored,
+    ) as is_ignored:
+        commands.AddCommand(test_view)("a.txt")
+    assert {call.args[1] for call in is_ignored.call_args_list} == {"a.txt"}
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == ["a.txt", "b.txt", "c.log"]
+
+    config.IGNORE_PATH.write_text("*.log")
+    commands.AddCommand(test_view)("c.log")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == ["a.txt", "b.txt"]
+    commands.AddCommand(test_view)(".")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == [".ignore", "a.txt"]
+
+
+def test_checkout_refuses_to_discard_local_changes(repo, test_view):
+    Path("a.txt").write_text("a")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    Path("new.txt").write_text("new")
+    commands.AddCommand(test_view)("new.txt")
+    commands.CommitCommand(test_view)("second")
+    second = (config.REFS_PATH / "master").read_text()
+
+    Path("new.txt").write_text("local edit")
+    with pytest.raises(errors.UncommittedChangesError):
+        commands.CheckoutCommand(test_view)(first)
+    assert Path("new.txt").read_text() == "local edit"
+    assert config.HEAD_PATH.read_text() == "master"
+
+    commands.AddCommand(test_view)("new.txt")
+    with pytest.raises(errors.UncommittedChangesError):
+        commands.CheckoutCommand(test_view)(first)
+    Path("new.txt").write_text("new")
+    commands.AddCommand(test_view)("new.txt")
+    commands.CheckoutCommand(test_view)(first)
+    assert not Path("new.txt").exists()
+
+    Path("new.txt").write_text("untracked")
+    with pytest.raises(errors.UncommittedChangesError):
+        commands.CheckoutCommand(test_view)(second)
+    assert Path("new.txt").read_text() == "untracked"
+    Path("new.txt").unlink()
+    commands.CheckoutCommand(test_view)(second)
+    assert Path("new.txt").read_text() == "new"
@@ -0,0 +1,84 @@
+import difflib
+import os
+import random
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from cvs import commands, config
+from cvs.utils import diff, streams
+
+
+def lcs_length(a: list, b: list) -> int:
+    previous = [0] * (len(b) + 1)
+    for x in a:
+        current = [0]
+        for j, y in enumerate(b):
+            best = (
+                previous[j] + 1 if x == y else max(previous[j + 1], current[j])
+            )
+            current.append(best)
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matching_blocks_are_minimal(seed: int):
+    rng = random.Random(seed)
+    a = [rng.randrange(5) for _ in range(rng.randrange(40))]
+    b = [rng.randrange(5) for _ in range(rng.randrange(40))]
+    blocks = diff.matching_blocks(a, b)
+    for a_start, b_start, length in blocks:
+        a_end, b_end = a_start + length, b_start + length
+        assert a[a_start:a_end] == b[b_start:b_end]
+    assert sum(length for *_, length in blocks) == lcs_length(a, b)
+
+
+def test_unified_diff_matches_difflib():
+    old = "".join(f"line {i}\n" for i in range(40))
+    new = old.replace("line 5\n", "five\n").replace("line 30\n", "") + "end\n"
+    expected = difflib.unified_diff(
+        old.splitlines(True), new.splitlines(True), "a/f", "b/f"
+    )
+    result = diff.unified_diff("f", old.encode(), new.encode())
+    assert list(result)[1:] == [line.rstrip("\n") for line in expected]
+
+
+def test_binary_files_are_not_compared():
+    result = list(diff.unified_diff("f", b"a\0b", b"a\0c"))
+    assert len(result) == 2 and "различаются" in result[1]
+
+
+def test_diff_modes(repo, test_view):
+    Path("dir").mkdir()
+    Path("dir/file.txt").write_text("one\ntwo\n")
+    Path("same.txt").write_text("same\n")
+    os.utime("same.txt", ns=(0, 0))
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    Path("dir/file.txt").write_text("one\n2\n")
+
+    test_view.buffer.clear()
+    with mock.patch.object(
+        streams, "hash_file", wraps=streams.hash_file
+    ) as content_check:
+        commands.DiffCommand(test_view)()
+    checked = [call.args[0] for call in content_check.call_args_list]
+    assert Path("same.txt") not in checked
+    assert test_view.buffer[-2:] == ["-two", "+2"]
+
+    commands.AddCommand(test_view)(".")
+    test_view.buffer.clear()
+    commands.DiffCommand(test_view)((), True)
+    assert test_view.buffer[0] == "diff --cvs a/dir/file.txt b/dir/file.txt"
+
+    commands.CommitCommand(test_view)("second")
+    second = (config.REFS_PATH / "master").read_text()
+    test_view.buffer.clear()
+    commands.DiffCommand(test_view)((first, second))
+    assert test_view.buffer[-2:] == ["-two", "+2"]
+    test_view.buffer.clear()
+    commands.DiffCommand(test_view)((), True)
+    assert test_view.buffer == []
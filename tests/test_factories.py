@@ -1,8 +1,10 @@
+import os
 import pytest
 import hashlib
 import zlib
 
-from cvs.utils import factories
+from cvs import commands, config
+from cvs.utils import chunking, compression, factories, storage, streams
 from cvs.models.blob import Blob
 from pathlib import Path
 
@@ -22,13 +24,155 @@ def test_creating_blob(temp_dir, filename: str, data: bytes):
 @pytest.mark.parametrize(
     "blobs",
     [
-        [Blob("1", b"456"), Blob("", b"")],
+        [Blob("1", b"456"), Blob(os.path.join("dir", "2"), b"")],
     ],
 )
 def test_creating_tree(blobs: list):
     actual_tree = factories.TreeFactory.create_new_tree(blobs)
-    hashcode = hashlib.sha1()
-    for blob in blobs:
-        hashcode.update(blob.compressed_data)
-    assert hashcode.hexdigest() == actual_tree.content_hash
+    dir_content = f"blob {blobs[1].content_hash} 2".encode()
+    dir_hash = hashlib.sha1(dir_content).hexdigest()
+    root_content = f"blob {blobs[0].content_hash} 1\ntree {dir_hash} dir"
+    assert hashlib.sha1(root_content.encode()).hexdigest() == (
+        actual_tree.content_hash
+    )
     assert actual_tree.parent is None
+
+
+def test_tree_reuses_cached_subtrees():
+    blobs = [
+        Blob(os.path.join("changed", "file"), b"new"),
+        Blob(os.path.join("same", "file"), b"old"),
+    ]
+    tree_cache = {"same": "ab" * 20}
+    tree = factories.TreeFactory.create_new_tree(blobs, tree_cache)
+    same = tree.entries["same"]
+    assert same.is_stored and not same.entries
+    assert same.content_hash == "ab" * 20
+    assert not tree.entries["changed"].is_stored
+
+
+def test_streaming_blob_matches_one_shot_compression(temp_dir, monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 1024)
+    data = os.urandom(10000) + b"abc" * 10000
+    source = Path(temp_dir.name) / "source"
+    source.write_bytes(data)
+    blob = factories.BlobFactory.create_new_blob(str(source), temp_dir.name)
+    stored = Path(temp_dir.name) / blob.content_hash
+    assert stored.read_bytes() == zlib.compress(data)
+    assert blob.content_hash == hashlib.sha1(zlib.compress(data)).hexdigest()
+
+    restored = Path(temp_dir.name) / "restored"
+    streams.decompress_file(stored, restored)
+    assert restored.read_bytes() == data
+
+
+@pytest.mark.parametrize(
+    "codec",
+    [
+        compression.LEGACY,
+        compression.STORED,
+        compression.Codec("stored", 3),
+        compression.Codec("zlib", 1),
+        compression.Codec("lzma", 0),
+    ],
+)
+def test_blob_codecs_roundtrip(temp_dir, monkeypatch, codec):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 1024)
+    data = os.urandom(3000) + b"abc" * 10000
+    source = Path(temp_dir.name) / "source"
+    source.write_bytes(data)
+    hashcode = streams.store_file(source, Path(temp_dir.name), codec)
+    stored = Path(temp_dir.name) / hashcode
+    assert stored.read_bytes() == compression.encode(data, codec)
+    assert compression.parse_header(stored.read_bytes()[:3])[0] == codec
+    restored = Path(temp_dir.name) / "restored"
+    streams.decompress_file(stored, restored)
+    assert restored.read_bytes() == data
+
+
+def test_compression_policy_from_config(repo):
+    config.CONFIG_PATH.write_text(
+        "[compression]\ncodec = zlib:1\n[extensions]\ntxt = lzma:9\n"
+    )
+    Path("photo.JPG").write_bytes(b"jpeg" * 100)
+    Path("noise.bin").write_bytes(os.urandom(10000))
+    Path("notes.txt").write_text("text " * 1000)
+    Path("code.py").write_text("x = 1\n" * 1000)
+    expected = {
+        "photo.JPG": compression.STORED,
+        "noise.bin": compression.STORED,
+        "notes.txt": compression.Codec("lzma", 9),
+        "code.py": compression.Codec("zlib", 1),
+    }
+    blobs = [
+        factories.BlobFactory.create_new_blob(name, config.BLOBS_PATH)
+        for name in expected
+    ]
+    config.CONFIG_PATH.write_text("[compression]\ncodec = lzma\n")
+    for blob in blobs:
+        hashcode = blob.content_hash
+        assert storage.store.blob_codec(hashcode) == expected[blob.filename]
+        assert storage.store.read_blob(hashcode) == (
+            Path(blob.filename).read_bytes()
+        )
+        assert blob.is_same_with_file(Path(blob.filename))
+
+
+def test_stored_level_is_ignored(repo, test_view):
+    assert compression.Codec.parse("stored:3") == compression.STORED
+    with pytest.raises(ValueError):
+        compression.Codec("unknown", 0).decoder()
+    config.CONFIG_PATH.write_text("[extensions]\ntxt = stored:1\n")
+    Path("a.txt").write_text("first")
+    commands.AddCommand(test_view)("a.txt")
+    commands.CommitCommand(test_view)("first")
+    first = (config.REFS_PATH / "master").read_text()
+    Path("a.txt").write_text("second")
+    commands.AddCommand(test_view)("a.txt")
+    commands.CommitCommand(test_view)("second")
+    commands.CheckoutCommand(test_view)(first)
+    assert Path("a.txt").read_text() == "first"
+
+
+def test_chunked_blob_stores_only_changed_chunks(repo):
+    config.CONFIG_PATH.write_text("[compression]\nchunk_threshold = 65536\n")
+    lines = [f"row {i} {os.urandom(8).hex()}\n" for i in range(40000)]
+    Path("dump.sql").write_text("".join(lines))
+    first = factories.BlobFactory.create_new_blob(
+        "dump.sql", config.BLOBS_PATH
+    )
+    chunks = storage.store.blob_chunks(first.content_hash)
+    assert len(chunks) > 1
+    assert storage.store.blob_codec(first.content_hash).chunked
+
+    lines.insert(20000, "inserted row\n")
+    Path("dump.sql").write_text("".join(lines))
+    before = set(os.listdir(config.BLOBS_PATH))
+    second = factories.BlobFactory.create_new_blob(
+        "dump.sql", config.BLOBS_PATH
+    )
+    added = set(os.listdir(config.BLOBS_PATH)) - before
+    assert second.content_hash in added
+    assert len(added) <= 3
+    assert storage.store.read_blob(second.content_hash) == (
+        Path("dump.sql").read_bytes()
+    )
+    assert second.is_same_with_file(Path("dump.sql"))
+
+    storage.store.repack()
+    storage.store.export_blob(first.content_hash, Path("old.sql"))
+    assert (
+        Path("old.sql").read_bytes()
+        == "".join(lines[:20000] + lines[20001:]).encode()
+    )
+
+
+def test_chunking_cuts_binary_data_without_newlines():
+    data = os.urandom(1 << 22).replace(b"\n", b"")
+    middle = len(data) // 2
+    edited = data[:middle] + b"inserted" + data[middle:]
+    first = list(chunking.split([data]))
+    second = list(chunking.split([edited]))
+    assert b"".join(second) == edited
+    assert max(len(x) for x in first) < chunking.MAX_SIZE
+    assert len(set(second) - set(first)) == 1
@@ -1,10 +1,18 @@
+import fnmatch
+import os
 from pathlib import Path
+from unittest import mock
 
 import pytest
+from cvs import commands, config, errors
 from cvs.models.blob import Blob
 from cvs.models.commit import Commit
-from cvs.models.index import FileIndex
+from cvs.models.index import FileIndex, FileStat
 from cvs.models.tree import TreeNode
+from cvs.utils.factories import BlobFactory
+from cvs.utils.ignore import IgnoreMatcher
+from cvs.utils.index_file import HEADER, IndexFile, write_index
+from cvs.utils.walk import walk_files
 
 
 @pytest.mark.parametrize(
@@ -40,3 +48,163 @@ def test_adding_to_index(temp_dir, path: str, file_content: str):
     index.BLOB_STORAGE = temp_dir.name
     index.add_file(str(file_to_add))
     assert str(file_to_add) in index.indexed_files
+
+
+def test_index_stat_cache_skips_reading(repo):
+    Path("a.txt").write_text("content")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    index.add_file("a.txt")
+    index.save()
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    index._timestamp = os.stat("a.txt").st_mtime_ns + 1
+    with mock.patch.object(Blob, "is_same_with_file") as is_same:
+        assert not index.is_modified("a.txt")
+        is_same.assert_not_called()
+
+
+def test_index_racily_clean_entry_is_rehashed(repo):
+    Path("a.txt").write_text("content")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    index.add_file("a.txt")
+    Path("a.txt").write_text("CONTENT")
+    stat = FileStat.from_path("a.txt")
+    index.indexed_files["a.txt"].stat = stat
+    index._timestamp = stat.mtime_ns
+    assert index.is_modified("a.txt")
+
+
+def test_index_racily_clean_entry_is_rewritten(repo):
+    Path("a.txt").write_text("content")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    index.add_file("a.txt")
+    index.save()
+    stat = FileStat.from_path("a.txt")
+    os.utime(config.INDEX_PATH, ns=(stat.mtime_ns, stat.mtime_ns))
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert not index.is_modified("a.txt")
+    assert index.has_stale_stats
+
+    index.write()
+    assert not index.is_racily_clean(stat)
+    with mock.patch.object(Blob, "is_same_with_file") as is_same:
+        assert not index.is_modified("a.txt")
+        is_same.assert_not_called()
+
+
+def test_index_loading_does_not_read_blobs(repo):
+    Path("a.txt").write_text("content")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    index.add_file("a.txt")
+    index.save()
+    blob_hash = index.indexed_files["a.txt"].hashcode
+    (config.BLOBS_PATH / blob_hash).unlink()
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    blob = index.indexed_files["a.txt"].blob
+    assert not blob.is_loaded
+    assert blob.content_hash == blob_hash
+
+
+def test_text_index_is_migrated(repo):
+    Path("a b.txt").write_text("content")
+    blob = BlobFactory.create_new_blob("a b.txt", str(config.BLOBS_PATH))
+    config.INDEX_PATH.write_text(f"a b.txt {blob.content_hash}")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert index.indexed_files["a b.txt"].hashcode == blob.content_hash
+    assert IndexFile.is_binary(config.INDEX_PATH)
+    assert not index.is_modified("a b.txt")
+
+
+def test_binary_index_lookup(temp_dir):
+    location = Path(temp_dir.name) / "index"
+    entries = [
+        (f"dir/file{i}", f"{i:040x}", (i, i + 1, i + 2, i + 3), 0)
+        for i in range(100)
+    ]
+    write_index(location, entries, {b"TEST": b"payload"})
+    index_file = IndexFile(location)
+    assert index_file.verify()
+    assert index_file.find("dir/file42") == entries[42]
+    assert index_file.find("dir/missing") is None
+    assert index_file.extensions == {b"TEST": b"payload"}
+    index_file.close()
+
+
+def test_corrupted_index_is_rejected(repo, test_view):
+    Path("file.txt").write_text("content")
+    commands.AddCommand(test_view)("file.txt")
+    content = bytearray(config.INDEX_PATH.read_bytes())
+    content[HEADER.size + 25] ^= 1
+    config.INDEX_PATH.write_bytes(bytes(content))
+    with pytest.raises(errors.IndexCorruptedError):
+        commands.StatusCommand(test_view)()
+    config.INDEX_PATH.write_bytes(bytes(content[: HEADER.size + 10]))
+    with pytest.raises(errors.IndexCorruptedError):
+        FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+
+
+def test_single_path_commands_do_not_decode_index(repo, test_view):
+    for i in range(50):
+        Path(f"file{i}.txt").write_text(str(i))
+        os.utime(f"file{i}.txt", (1, 1))
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    head = (config.REFS_PATH / "master").read_text()
+    with mock.patch.object(
+        FileIndex, "get_indexed_files", side_effect=AssertionError
+    ):
+        commands.AddCommand(test_view)("file7.txt")
+        commands.CheckoutCommand(test_view)(head, ("file7.txt",))
+        index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+        assert not index.is_modified("file7.txt")
+        assert index.get_entry("missing.txt") is None
+        entry = index.get_entry("file7.txt")
+
+    Path("file7.txt").write_text("changed")
+    commands.AddCommand(test_view)("file7.txt")
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert index.get_entry("file7.txt").hashcode != entry.hashcode
+    found = index.get_entry("file8.txt")
+    assert index.indexed_files["file8.txt"] is found
+    assert len(index.indexed_files) == 50
+
+
+IGNORE_PATTERNS = FileIndex.get_ignored_files(Path("missing")) + [
+    "node_modules/**/*",
+    "node_modules/*",
+    "*.log",
+    "build/*/cache/*",
+    "notes.txt",
+]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        ".cvs/index",
+        ".cvs/objects/blobs/abc",
+        "node_modules/pkg/index.js",
+        "node_modules",
+        "src/app.log",
+        "build/x/cache/file",
+        "build/x/file",
+        "notes.txt",
+        "src/notes.txt",
+    ],
+)
+def test_ignore_matcher_matches_fnmatch(path: str):
+    expected = any(fnmatch.fnmatch(path, x) for x in IGNORE_PATTERNS)
+    assert IgnoreMatcher(IGNORE_PATTERNS).is_ignored(path) == expected
+
+
+def test_walk_skips_ignored_directories(repo):
+    Path("node_modules/pkg").mkdir(parents=True)
+    Path("node_modules/pkg/index.js").write_text("")
+    Path("src").mkdir()
+    Path("src/app.py").write_text("")
+    Path("src/app.log").write_text("")
+    matcher = IgnoreMatcher(IGNORE_PATTERNS)
+    with mock.patch("os.scandir", wraps=os.scandir) as scandir:
+        files = sorted(walk_files(os.curdir, matcher))
+    assert files == [os.path.join("src", "app.py")]
+    scanned = {call.args[0] for call in scandir.call_args_list}
+    assert scanned == {os.curdir, "src"}
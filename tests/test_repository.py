@@ -0,0 +1,122 @@
+import os
+import subprocess
+import threading
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from cvs import commands, config, errors
+from cvs.commands import CvsCommand
+from cvs.models.index import FileIndex
+from cvs.repository import Repository
+
+
+def test_repository_shares_state_and_defers_index(repo, test_view):
+    Path("a.txt").write_text("a")
+    Path("b.txt").write_text("b")
+    with mock.patch.object(
+        FileIndex, "write", autospec=True, side_effect=FileIndex.write
+    ) as write:
+        with Repository(test_view, defer_index_writes=True) as repository:
+            repository.run("add", "a.txt")
+            repository.run("add", "b.txt")
+            index = repository.index
+            repository.run("commit", "first")
+            assert repository.index is index
+            assert write.call_count == 0
+        assert write.call_count == 1
+    head = repository.head_commit
+    assert head == (config.REFS_PATH / "master").read_text()
+    reloaded = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(reloaded.indexed_files) == ["a.txt", "b.txt"]
+    assert reloaded.tree_cache
+
+
+def test_batch_mode_runs_commands_from_stdin(tmp_path):
+    Path(tmp_path, "a.txt").write_text("a")
+    script = 'init\nadd a.txt\nunknown\ncommit "first commit"\nlog --oneline\n'
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    result = subprocess.run(
+        [sys.executable, "-m", "cvs", "batch"],
+        input=script,
+        capture_output=True,
+        text=True,
+        cwd=tmp_path,
+        env=env,
+    )
+    lines = result.stdout.splitlines()
+    assert lines[0].startswith("Инициализирован")
+    assert lines[1].startswith("Новый коммит")
+    assert lines[2].endswith("first commit")
+    assert "invalid choice" in result.stderr
+
+
+def test_status_does_not_import_tree_machinery(tmp_path):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    for argv in (["init"], ["status"]):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "cvs", *argv],
+            capture_output=True,
+            text=True,
+            cwd=tmp_path,
+            env=env,
+        )
+    modules = {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "cvs.models.index" in modules
+    assert not modules & {"anytree", "cvs.models.tree", "cvs.models.commit"}
+    for alias in CvsCommand.REGISTRY:
+        assert issubclass(CvsCommand.resolve(alias), CvsCommand)
+
+
+def test_index_lock_serializes_writers(repo, test_view, monkeypatch):
+    Path("a.txt").write_text("a")
+    Path("b.txt").write_text("b")
+    commands.AddCommand(test_view)("a.txt")
+    os.utime("a.txt", ns=(1, 1))
+    lock_path = Path(f"{config.INDEX_PATH}.lock")
+    lock_path.touch()
+    monkeypatch.setattr(config, "LOCK_TIMEOUT", 0.05)
+    with pytest.raises(errors.LockedError):
+        commands.AddCommand(test_view)("b.txt")
+
+    before = config.INDEX_PATH.read_bytes()
+    commands.StatusCommand(test_view)()
+    assert config.INDEX_PATH.read_bytes() == before
+
+    timer = threading.Timer(0.1, lock_path.unlink)
+    timer.start()
+    monkeypatch.setattr(config, "LOCK_TIMEOUT", 5)
+    commands.AddCommand(test_view)("b.txt")
+    timer.join()
+    assert not lock_path.exists()
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == ["a.txt", "b.txt"]
+    assert index.indexed_files["a.txt"].stat.mtime_ns != 1
+    commands.StatusCommand(test_view)()
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert index.indexed_files["a.txt"].stat.mtime_ns == 1
+
+
+def test_parallel_adds_keep_all_entries(repo):
+    env = dict(
+        os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(__file__))
+    )
+    names = [f"file{i}.txt" for i in range(6)]
+    for name in names:
+        Path(name).write_text(name)
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "cvs", "add", name], env=env)
+        for name in names
+    ]
+    assert all(x.wait() == 0 for x in processes)
+    index = FileIndex(config.INDEX_PATH, config.IGNORE_PATH)
+    assert sorted(index.indexed_files) == names
+    assert not any(
+        x.name.endswith(".lock") for x in config.MAIN_PATH.iterdir()
+    )
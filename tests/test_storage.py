@@ -0,0 +1,264 @@
+import hashlib
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from cvs import commands, config
+from cvs.models.commit import Commit
+from cvs.utils import delta, packs, storage
+from cvs.utils.factories import BlobFactory
+from cvs.utils.cache import LRUCache
+
+
+def test_pack_lookup(temp_dir):
+    objects = [
+        ("blob", "ab" * 20, zlib.compress(b"data")),
+        ("tree", "ab" * 20, b"blob " + b"cd" * 20 + b" file"),
+        ("commit", "01" * 20, b"tree ..."),
+    ]
+    index_path = packs.write_pack(objects, Path(temp_dir.name))
+    pack = packs.Pack(index_path)
+    for kind, hashcode, content in objects:
+        assert pack.read(kind, hashcode) == content
+    assert pack.find("commit", "ab" * 20) is None
+    assert pack.find("blob", "ff" * 20) is None
+    assert sorted(pack) == sorted((x[0], x[1]) for x in objects)
+    pack.close()
+
+
+def test_repack_keeps_objects_readable(repo, test_view):
+    Path("dir").mkdir()
+    Path("dir/file.txt").write_text("packed")
+    Path("dir/other.txt").write_text("other")
+    Path("top.txt").write_text("top")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("packed commit")
+    head = (config.REFS_PATH / "master").read_text()
+    commands.RepackCommand(test_view)()
+
+    assert not list(storage.store.iter_loose())
+    assert Commit.read_file_content(head).endswith("packed commit")
+    Path("dir/file.txt").unlink()
+    config.HEAD_PATH.write_text("root")
+    commands.CheckoutCommand(test_view)(head)
+    assert Path("dir/file.txt").read_text() == "packed"
+
+
+@pytest.mark.parametrize(
+    "base, target",
+    [
+        (b"", b"new content"),
+        (b"a" * 100, b""),
+        (b"header " * 50 + b"body", b"header " * 50 + b"changed body"),
+    ],
+)
+def test_delta_roundtrip(base: bytes, target: bytes):
+    diff = delta.create_delta(base, target, limit=len(target) + 64)
+    assert delta.apply_delta(base, diff) == target
+
+
+def test_pack_stores_versions_as_deltas(temp_dir):
+    lines = [b"line %d\n" % i for i in range(2000)]
+    versions = []
+    for version in range(5):
+        lines[version * 100] = b"changed in version %d\n" % version
+        versions.append(b"".join(lines))
+    objects = []
+    for content in versions:
+        stored = zlib.compress(content)
+        objects.append(("blob", hashlib.sha1(stored).hexdigest(), stored))
+    pack = packs.Pack(packs.write_pack(objects, Path(temp_dir.name)))
+    for _, hashcode, stored in objects:
+        assert pack.read("blob", hashcode) == stored
+    assert not pack.is_delta("blob", objects[0][1])
+    assert all(pack.is_delta("blob", x[1]) for x in objects[1:])
+    full_size = sum(len(x[2]) for x in objects)
+    assert pack.data_path.stat().st_size < full_size / 2
+    pack.close()
+
+
+def test_lru_cache_is_bounded_by_size():
+    cache = LRUCache(10, max_item_size=6)
+    cache.put("a", b"aaaa", 4)
+    cache.put("b", b"bbbb", 4)
+    cache.put("huge", b"x" * 7, 7)
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc", 4)
+    assert "b" not in cache and "huge" not in cache
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses, cache.size) == (1, 1, 8)
+
+
+def test_lru_cache_is_thread_safe():
+    class SlowDict(OrderedDict):
+        def get(self, key, default=None):
+            item = super().get(key, default)
+            time.sleep(0)
+            return item
+
+    cache = LRUCache(16)
+    cache._items = SlowDict()
+
+    def work(offset):
+        for i in range(500):
+            key = (i * 7 + offset) % 32
+            if cache.get(key) is None:
+                cache.put(key, key, 1)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+    assert cache.size == len(cache) <= 16
+    assert cache.hits + cache.misses == 8 * 500
+
+
+def test_store_caches_parsed_objects(repo, test_view):
+    Path("dir").mkdir()
+    Path("dir/file.txt").write_text("content")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    head = (config.REFS_PATH / "master").read_text()
+    store = storage.store
+    store.objects.clear()
+    store.blobs.clear()
+
+    tree_hash = Commit.parse_file_content(head)[0]
+    assert store.read_commit(head) == Commit.read_file_content(head)
+    assert store.objects.hits == 2 and store.objects.misses == 1
+    dir_hash = store.read_tree(tree_hash)["dir"][1]
+    blob_hash = store.read_tree(dir_hash)["file.txt"][1]
+    assert store.read_blob(blob_hash) == b"content"
+    assert store.read_blob(blob_hash) == b"content"
+    assert store.cache_stats["blobs"]["hits"] == 1
+
+
+def test_gc_prunes_unreachable_loose_objects(repo, test_view):
+    Path("kept.txt").write_text("kept")
+    commands.AddCommand(test_view)("kept.txt")
+    commands.CommitCommand(test_view)("first")
+    Path("kept.txt").write_text("never committed")
+    commands.AddCommand(test_view)("kept.txt")
+    Path("kept.txt").write_text("staged")
+    commands.AddCommand(test_view)("kept.txt")
+    loose = {hashcode for _, hashcode, _ in storage.store.iter_loose()}
+
+    commands.GcCommand(test_view)(3600, False)
+    assert {x for _, x, _ in storage.store.iter_loose()} == loose
+    commands.GcCommand(test_view)(0, False)
+    remaining = {x for _, x, _ in storage.store.iter_loose()}
+    assert len(loose - remaining) == 1
+    assert "Удалено недостижимых объектов: 1" in test_view.buffer[-2]
+
+    commands.GcCommand(test_view)(0)
+    assert not list(storage.store.iter_loose())
+    test_view.buffer.clear()
+    commands.DiffCommand(test_view)((), True)
+    assert test_view.buffer[-1] == "+staged"
+
+
+def test_gc_keeps_unreachable_objects_loose(repo, test_view):
+    Path("a.txt").write_text("first")
+    commands.AddCommand(test_view)("a.txt")
+    commands.CommitCommand(test_view)("first")
+    Path("a.txt").write_text("aborted")
+    commands.AddCommand(test_view)("a.txt")
+    Path("a.txt").write_text("first")
+    commands.AddCommand(test_view)("a.txt")
+
+    commands.GcCommand(test_view)()
+    assert len(list(storage.store.iter_loose())) == 1
+    commands.GcCommand(test_view)(0)
+    assert not list(storage.store.iter_loose())
+    test_view.buffer.clear()
+    commands.FsckCommand(test_view)()
+    assert not [x for x in test_view.buffer if x.startswith("висячий")]
+
+    Path("b.txt").write_text("second")
+    commands.AddCommand(test_view)("b.txt")
+    commands.CommitCommand(test_view)("second")
+    commands.GcCommand(test_view)()
+    assert len(list(config.PACKS_PATH.glob("*.idx"))) == 1
+    (pack,) = storage.store.packs
+    assert pack.count == 6
+
+    Path("b.txt").write_text("aborted")
+    commands.AddCommand(test_view)("b.txt")
+    Path("b.txt").write_text("second")
+    commands.AddCommand(test_view)("b.txt")
+    commands.RepackCommand(test_view)()
+    commands.GcCommand(test_view)()
+    assert len(list(storage.store.iter_loose())) == 1
+    commands.GcCommand(test_view)(0)
+    assert not list(storage.store.iter_loose())
+    assert storage.store.packs[0].count == 6
+
+
+def test_fsck_reports_corrupt_and_missing_objects(repo, test_view):
+    Path("dir").mkdir()
+    Path("dir/a.txt").write_text("a")
+    Path("b.txt").write_text("b")
+    commands.AddCommand(test_view)(".")
+    commands.CommitCommand(test_view)("first")
+    commands.RepackCommand(test_view)()
+    commands.FsckCommand(test_view)()
+    assert test_view.buffer[-2] == "Проверено объектов: 5"
+
+    Path("c.txt").write_text("c")
+    commands.AddCommand(test_view)("c.txt")
+    test_view.buffer.clear()
+    commands.FsckCommand(test_view)(True)
+    assert test_view.buffer[0] == "Проверено объектов: 1"
+
+    (_, hashcode, path), *_ = storage.store.iter_loose()
+    path.write_bytes(b"garbage")
+    test_view.buffer.clear()
+    commands.FsckCommand(test_view)(True)
+    assert test_view.buffer[0].startswith(f"повреждён blob {hashcode}")
+
+    path.unlink()
+    test_view.buffer.clear()
+    commands.FsckCommand(test_view)(True)
+    assert test_view.buffer[:2] == [
+        f"отсутствует blob {hashcode} (ссылка из index)",
+        "Проверено объектов: 0",
+    ]
+
+
+def test_fsck_verifies_legacy_trees(repo, test_view):
+    blobs = {}
+    for name in ("a.txt", "b.txt"):
+        Path(name).write_text(name)
+        blob = BlobFactory.create_new_blob(name, str(config.BLOBS_PATH))
+        blobs[name] = blob.content_hash
+    data = {x: (config.BLOBS_PATH / x).read_bytes() for x in blobs.values()}
+    sub_hash = hashlib.sha1(data[blobs["b.txt"]]).hexdigest()
+    (config.TREES_PATH / sub_hash).write_text(f"blob {blobs['b.txt']} b.txt")
+    root = f"tree {sub_hash} src\nblob {blobs['a.txt']} a.txt"
+    root_hash = hashlib.sha1(
+        data[blobs["a.txt"]] + data[blobs["b.txt"]]
+    ).hexdigest()
+    (config.TREES_PATH / root_hash).write_text(root)
+    commit = f"tree {root_hash} .\nparent root\ndate 2020-01-01\n\nold"
+    commit_hash = hashlib.sha1(commit.encode()).hexdigest()
+    (config.COMMITS_PATH / commit_hash).write_text(commit)
+    (config.REFS_PATH / "master").write_text(commit_hash)
+
+    commands.FsckCommand(test_view)()
+    assert test_view.buffer[:2] == [
+        "Деревьев старого формата: 2 (хэш проверен по схеме первых версий)",
+        "Проверено объектов: 5",
+    ]
+    assert config.FSCK_STATE_PATH.exists()
+
+    config.FSCK_STATE_PATH.unlink()
+    swapped = root.replace(blobs["a.txt"], blobs["b.txt"])
+    (config.TREES_PATH / root_hash).write_text(swapped)
+    test_view.buffer.clear()
+    commands.FsckCommand(test_view)()
+    assert test_view.buffer[0] == (
+        f"повреждён tree {root_hash}: хэш не совпадает"
+    )
+    assert not config.FSCK_STATE_PATH.exists()